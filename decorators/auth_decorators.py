@@ -2,7 +2,7 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.urls import resolve
 from constants.enums import Role
-from django.contrib.auth import get_user_model
+from user.utils.auth_status import get_session_user
 
 
 
@@ -61,15 +61,10 @@ def inject_authenticated_user(view_func):
     def wrapper(view_self, request, *args, **kwargs):
         if not request.session.get('is_authenticated'):
             return redirect('user_login')
-        user_id = request.session.get('user_id')
-        if user_id:
-            try:
-                user_model = get_user_model()
-                request.user = user_model.objects.get(id=user_id)
-            except user_model.DoesNotExist:
-                return redirect('user_login')
-        else:
+        user = get_session_user(request)
+        if not user:
             return redirect('user_login')
+        request.user = user
         return view_func(view_self, request, *args, **kwargs)
     return wrapper
 
@@ -84,12 +79,10 @@ def login_admin_required_with_user(view_func):
         if user_role != Role.ADMIN:
             return redirect('user_login')
 
-        user_id = request.session.get('user_id')
-        user_model = get_user_model()
-        try:
-            request.user = user_model.objects.get(id=user_id)
-        except user_model.DoesNotExist:
+        user = get_session_user(request)
+        if not user:
             return redirect('user_login')
+        request.user = user
         return view_func(view_self, request, *args, **kwargs)
     return wrapper
 
@@ -102,14 +95,9 @@ def staff_view_required(view_func):
             return redirect('user_login')
         if request.session.get('user_role') != Role.ENDUSER_STAFF:
             return redirect('user_login')
-        user_id = request.session.get('user_id')
-        if user_id:
-            try:
-                user_model = get_user_model()
-                request.user = user_model.objects.get(id=user_id)
-            except user_model.DoesNotExist:
-                return redirect('user_login')
-        else:
+        user = get_session_user(request)
+        if not user:
             return redirect('user_login')
+        request.user = user
         return view_func(request, *args, **kwargs)
     return wrapper
\ No newline at end of file
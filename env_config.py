@@ -15,6 +15,23 @@ env = environ.Env(
     PGSQL_HOST=(str, ''),              
     PGSQL_PORT=(str, ''),              
 
+    # Cache settings
+    CACHE_URL=(str, 'locmemcache://'),
+
+    # Cart storage ("database" writes every change, "cache" writes behind and needs a shared CACHE_URL)
+    CART_STORE=(str, 'database'),
+
+    # Minutes an unpaid order holds its stock
+    STOCK_RESERVATION_MINUTES=(int, 15),
+
+    # Pagination settings
+    PRODUCT_PAGE_SIZE=(int, 24),
+    ORDER_PAGE_SIZE=(int, 10),
+
+    # Image derivative worker processes inside each web process
+    # (0 leaves new images to the generate_image_variants command)
+    IMAGE_WORKERS=(int, 0),
+
     # Session cookie settings
     SESSION_COOKIE_NAME=(str, ''), 
     SESSION_COOKIE_SECURE=(bool, True),
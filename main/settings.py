@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party apps
     'rest_framework',
@@ -93,6 +94,24 @@ DATABASES = {
     }
 }
 
+# Cache
+CACHES = {
+    'default': env.cache('CACHE_URL'),
+}
+
+# Cart storage
+CART_STORE = env('CART_STORE')
+
+# Stock reservations
+STOCK_RESERVATION_MINUTES = env('STOCK_RESERVATION_MINUTES')
+
+# Pagination
+PRODUCT_PAGE_SIZE = env('PRODUCT_PAGE_SIZE')
+ORDER_PAGE_SIZE = env('ORDER_PAGE_SIZE')
+
+# Image derivatives
+IMAGE_WORKERS = env('IMAGE_WORKERS')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
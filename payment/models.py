@@ -34,6 +34,11 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='payment_user_created_idx'),
+        ]
+
     def mark_success(self, txn_id=None, meta=None):
         self.status = PaymentStatus.SUCCESS.value
         if txn_id:
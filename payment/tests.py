@@ -1,3 +1,19 @@
 from django.test import TestCase
+from django.urls import reverse
+from shop.tests import QueryBudgetMixin, seed_store
 
-# Create your tests here.
+
+# Query budgets of every payment page
+class PaymentQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = seed_store()
+
+    def test_payment_pages(self):
+        customer = self.store["customer"]
+        unpaid_order = self.store["orders"][1]
+        self.assertBudgets([
+            (3, reverse("payment:choose_method", args=[unpaid_order.id]), customer, 200),
+            (7, reverse("payment:zpay_payment", args=[unpaid_order.id]), customer, 200),
+            (3, reverse("payment:payment_history"), customer, 200),
+        ])
@@ -6,7 +6,7 @@ from django.contrib import messages
 from payment.models import Payment, PaymentMethod
 from decorators import inject_authenticated_user, customer_required 
 from payment import services
-from shop.services import cart_service
+from shop.services import checkout_service
 
 
 
@@ -56,27 +56,27 @@ class ZPayPaymentView(View):
     @customer_required
     @inject_authenticated_user
     def post(self, request, order_id):
-        Order = apps.get_model('shop', 'Order')
         try:
-            order = Order.objects.get(id=order_id, user=request.user)
-        except Order.DoesNotExist:
-            messages.error(request, "Order not found.")
+            result = checkout_service.complete_zpay_checkout(
+                user=request.user,
+                order_id=order_id,
+                request=request
+            )
+        except checkout_service.CheckoutError as e:
+            messages.error(request, str(e))
             return redirect("cart_detail")
-        if order.is_paid:
+        print(f"[ZPayPaymentView] Order {order_id} checkout timings (ms): {result['timings']}")
+        if result["already_paid"]:
             messages.warning(request, "Order already paid.")
             return redirect("order_list")
-        payment = services.create_payment(user=request.user, order=order)
-        success = services.process_zpay_payment(
-            payment=payment,
-            order=order,
-            request=request
-        )
-        if success:
+        if result["refunding"]:
+            messages.error(request, "Sorry, an item in this order sold out before the payment completed. Your payment will be refunded.")
+            return redirect("order_list")
+        if result["paid"]:
             messages.success(request, "Payment successful 🎉")
-            cart_service.remove_order_items_from_cart(user=request.user,order=order)
             return redirect("order_list")
         messages.error(request, "Payment failed. Please try again.")
-        return redirect("payment:zpay_payment", order_id=order.id)
+        return redirect("payment:zpay_payment", order_id=order_id)
 
 
 # Payment History 
@@ -1,6 +1,32 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate, post_save
+
+
+# Enable the Postgres extensions required by the shop indexes
+def create_postgres_extensions(sender, using, **kwargs):
+    from django.db import connections
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
 
 
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        pre_migrate.connect(create_postgres_extensions, sender=self)
+        from django.core import checks
+        from shop.services import cart_store_service
+        from shop.utils import cache_util
+        checks.register(cache_util.check_shared_cache)
+        checks.register(cart_store_service.check_cart_store)
+        from shop.services import image_service
+        for label in image_service.IMAGE_TARGETS:
+            post_save.connect(
+                image_service.queue_image_variants,
+                sender=label,
+                dispatch_uid=f"image_variants:{label}",
+            )
@@ -0,0 +1,72 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from shop.models import Product, Order, Wishlist, Coupon, Shipment, ShipmentStatus
+from shop.services import product_service, order_service, review_service, search_service, facet_service
+from payment.models import Payment
+from user.models import User
+
+
+SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+# Representative querysets of the hot service paths, bound to sample rows
+def audited_querysets():
+    user = User.objects.order_by("id").first()
+    product = Product.objects.order_by("id").first()
+    user_id = user.id if user else 0
+    product_id = product.id if product else 0
+    active_products = Product.objects.filter(is_active=True)
+    return [
+        ("product listing (newest)", active_products.order_by("-created_at", "-id")[:25]),
+        ("product listing (price facet)", facet_service.apply_filters(active_products, {"price": "500-1000"})[:25]),
+        ("product listing (tag facet)", facet_service.apply_filters(active_products, {"tag": "smart"})[:25]),
+        ("product search", search_service.rank_products("phone")[:25]),
+        ("product by sku", Product.objects.filter(sku=product.sku if product else "")),
+        ("pending order lookup", Order.objects.filter(user_id=user_id, is_paid=False, payment_status="pending").order_by("-created_at")[:1]),
+        ("customer orders", order_service.get_orders_for_user(user=user_id)[:25]),
+        ("admin orders by status", order_service.apply_admin_filters(Order.objects.all(), {"status": "pending"}).order_by("-created_at", "-id")[:50]),
+        ("customer payments", Payment.objects.filter(user_id=user_id).order_by("-created_at")[:25]),
+        ("open shipments", Shipment.objects.filter(status__in=[ShipmentStatus.PENDING_ASSIGNMENT.value, ShipmentStatus.ASSIGNED.value])[:50]),
+        ("product reviews", review_service.get_product_reviews(product_id)[:25]),
+        ("customer wishlist", Wishlist.objects.filter(user_id=user_id).order_by("-added_at")[:25]),
+        ("valid coupons", Coupon.objects.filter(active=True, valid_to__gte=timezone.now())[:25]),
+        ("product detail", Product.objects.filter(id=product_id).select_related("category")),
+        ("admin product page", product_service.get_all_products(active_only=False)[:25]),
+    ]
+
+
+# Estimated row counts of the given tables from the planner statistics
+def table_sizes(tables):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s)", [list(tables)])
+        return {name: int(rows) for name, rows in cursor.fetchall()}
+
+
+# EXPLAIN each hot queryset and fail on sequential scans of large tables
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the hot service querysets and fail if a large table is scanned sequentially."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-rows", type=int, default=10000, help="Tables smaller than this may be scanned.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The query plan audit needs PostgreSQL.")
+        problems = []
+        for name, queryset in audited_querysets():
+            plan = queryset.explain()
+            if options["verbose_plans"]:
+                self.stdout.write(f"-- {name}\n{plan}\n")
+            scanned = set(SEQ_SCAN.findall(plan))
+            if not scanned:
+                continue
+            sizes = table_sizes(scanned)
+            large = sorted(table for table in scanned if sizes.get(table, 0) >= options["min_rows"])
+            if large:
+                problems.append(f"{name}: sequential scan on {', '.join(large)}")
+        if problems:
+            raise CommandError("Query plan audit failed:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Every audited query uses an index on the large tables."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from shop.services import order_service
+
+
+# Fill the denormalized item summary of existing orders
+class Command(BaseCommand):
+    help = "Write item_count, first_item_name and first_item_image of every order from its items in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Orders updated per batch.")
+
+    def handle(self, *args, **options):
+        updated = order_service.backfill_order_summaries(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled the item summary of {updated} orders."))
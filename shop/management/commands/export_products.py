@@ -0,0 +1,27 @@
+import sys
+from django.core.management.base import BaseCommand
+from shop.services import product_io_service
+
+
+# Stream the catalog to a CSV or JSONL file
+class Command(BaseCommand):
+    help = "Export every product as CSV or JSONL, streaming rows in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file, or - for standard output.")
+        parser.add_argument("--format", choices=product_io_service.IMPORT_FORMATS, default="csv")
+        parser.add_argument("--active-only", action="store_true", help="Skip inactive products.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        chunks = product_io_service.export_products(
+            options["format"], chunk_size=options["chunk_size"], active_only=options["active_only"]
+        )
+        if options["path"] == "-":
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+        with open(options["path"], "w", encoding="utf-8", newline="") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported products to {options['path']}."))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from shop.services import cart_store_service
+from shop.utils import cache_util
+
+
+# Write the carts held by the write-behind cart store back to the database
+class Command(BaseCommand):
+    help = "Flush cached cart changes to Cart and CartItem in batches, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=cart_store_service.CART_STORE_FLUSH_BATCH_SIZE, help="Carts written per transaction.")
+        parser.add_argument("--interval", type=int, default=0, help="Keep flushing every N seconds (0 flushes once).")
+
+    def handle(self, *args, **options):
+        if not cart_store_service.is_requested():
+            raise CommandError('The write-behind cart store is disabled (set CART_STORE to "cache").')
+        if not cache_util.is_cache_shared():
+            raise CommandError("The write-behind cart store needs a cache shared with the web processes (set CACHE_URL).")
+        while True:
+            flushed = cart_store_service.flush_carts(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} carts."))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import as_completed
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from shop.services import image_service
+from shop.utils import cache_util
+
+
+# Build the thumbnail/card/detail derivatives of new and existing media
+class Command(BaseCommand):
+    help = "Generate WebP and JPEG image derivatives for products, categories and profile photos, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=sorted(image_service.IMAGE_TARGETS), action="append",
+            help="Limit the backfill to one model label (repeatable).",
+        )
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that are already current.")
+        parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 runs inline).")
+        parser.add_argument("--interval", type=int, default=0, help="Keep building new images every N seconds (0 runs once).")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        while True:
+            self._run(options["model"], force, options["workers"])
+            if not options["interval"]:
+                break
+            # Later passes only pick up images uploaded or replaced since
+            force = False
+            time.sleep(options["interval"])
+
+    def _run(self, labels, force, workers):
+        jobs = []
+        for label in labels or sorted(image_service.IMAGE_TARGETS):
+            image_field, variants_field = image_service.IMAGE_TARGETS[label]
+            rows = (
+                apps.get_model(label).objects
+                .exclude(**{f"{image_field}__isnull": True})
+                .exclude(**{image_field: ""})
+                .values_list("pk", image_field, variants_field)
+            )
+            for pk, name, variants in rows.iterator(chunk_size=1000):
+                if force or (variants or {}).get("source") != name:
+                    jobs.append((label, pk))
+
+        built = failed = 0
+        for label, pk, error in self._build(jobs, workers):
+            if error:
+                failed += 1
+                self.stderr.write(f"{label} {pk}: {error}")
+            else:
+                built += 1
+                image_service.invalidate_cached_images(label, pk)
+        # One catalog version bump for the whole batch instead of one per image
+        if built:
+            cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(f"Built image variants for {built} of {len(jobs)} images ({failed} failed)."))
+
+    def _build(self, jobs, workers):
+        if workers <= 0:
+            for label, pk in jobs:
+                try:
+                    image_service.build_variants(label, pk)
+                    yield label, pk, None
+                except Exception as e:
+                    yield label, pk, e
+            return
+        with image_service.create_executor(workers) as executor:
+            futures = {executor.submit(image_service.build_variants, label, pk): (label, pk) for label, pk in jobs}
+            for future in as_completed(futures):
+                label, pk = futures[future]
+                error = future.exception()
+                yield label, pk, error
@@ -0,0 +1,40 @@
+import io
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from shop.services import product_io_service
+from user.models import User
+
+
+# Bulk create or update products from a CSV or JSONL file
+class Command(BaseCommand):
+    help = "Stream products from a CSV or JSONL file into the catalog, matching existing rows by SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument("--format", choices=product_io_service.IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--user", required=True, help="Email of the admin recorded as creator.")
+        parser.add_argument("--batch-size", type=int, default=product_io_service.IMPORT_BATCH_SIZE, help="Rows written per transaction.")
+        parser.add_argument("--overwrite-stock", action="store_true", help="Replace the live stock of existing SKUs with the file's values.")
+
+    def handle(self, *args, **options):
+        fmt = product_io_service.detect_format(options["path"], options["format"])
+        if not fmt:
+            raise CommandError("Unknown file format, pass --format csv or --format jsonl.")
+        try:
+            created_by = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+
+        def on_error(line_no, message):
+            self.stderr.write(f"line {line_no}: {message}")
+
+        if options["path"] == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig")
+            result = product_io_service.import_products(stream, fmt, created_by, options["batch_size"], on_error, options["overwrite_stock"])
+        else:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                result = product_io_service.import_products(stream, fmt, created_by, options["batch_size"], on_error, options["overwrite_stock"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported products: {result['created']} created, {result['updated']} updated, "
+            f"{result['error_count']} rows rejected."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from shop.services import review_service
+
+
+# Recompute Product rating aggregates from the Review table
+class Command(BaseCommand):
+    help = "Rebuild avg_rating, review_count and the star histogram of all products in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Products updated per batch.")
+
+    def handle(self, *args, **options):
+        updated = review_service.rebuild_rating_aggregates(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} products."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from shop.services import search_service
+
+
+# Backfill Product.search_vector for existing rows
+class Command(BaseCommand):
+    help = "Rebuild the full-text search vectors of all products in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows updated per transaction.")
+
+    def handle(self, *args, **options):
+        updated = search_service.rebuild_search_vectors(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {updated} products."))
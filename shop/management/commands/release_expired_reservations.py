@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from shop.services import reservation_service
+
+
+# Sweeper that returns the stock of unpaid orders whose reservation expired
+class Command(BaseCommand):
+    help = "Release expired stock reservations in batches, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=reservation_service.RELEASE_BATCH_SIZE, help="Reservations released per transaction.")
+        parser.add_argument("--interval", type=int, default=0, help="Keep sweeping every N seconds (0 sweeps once).")
+
+    def handle(self, *args, **options):
+        while True:
+            released = reservation_service.release_expired_reservations(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
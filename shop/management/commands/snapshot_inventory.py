@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from shop.services import inventory_service
+
+
+# Periodic per-product snapshots of the stock ledger
+class Command(BaseCommand):
+    help = "Snapshot the stock of every product with new inventory movements, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=inventory_service.SNAPSHOT_BATCH_SIZE, help="Products snapshotted per batch.")
+        parser.add_argument("--interval", type=int, default=0, help="Keep snapshotting every N seconds (0 runs once).")
+        parser.add_argument("--backfill", action="store_true", help="First open the ledger of products without movements.")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            opened = inventory_service.backfill_movements()
+            self.stdout.write(self.style.SUCCESS(f"Opened the ledger of {opened} products."))
+        while True:
+            taken = inventory_service.take_snapshots(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Took {taken} inventory snapshots."))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
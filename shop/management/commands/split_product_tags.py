@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from shop.services import tag_service
+
+
+# Backfill the Tag table and product links from the legacy tags strings
+class Command(BaseCommand):
+    help = "Split every product's comma separated tags into normalized Tag rows in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Products linked per transaction.")
+
+    def handle(self, *args, **options):
+        linked = tag_service.rebuild_product_tags(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Linked {linked} product tags."))
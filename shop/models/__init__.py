@@ -1,5 +1,6 @@
 from .product_model import Product
 from .category_model import Category
+from .tag_model import Tag,ProductTag
 from .order_model import Order
 from .order_item_models import OrderItem
 from .cart_model import Cart
@@ -8,3 +9,5 @@ from .review_model import Review
 from .wishlist_model import Wishlist
 from .coupon_model import Coupon,CouponAssignment,CouponUsage
 from .shipment_model import Shipment,ShipmentStatus
+from .stock_reservation_model import StockReservation,ReservationStatus
+from .inventory_model import InventoryMovement,InventorySnapshot,MovementReason
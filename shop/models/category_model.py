@@ -1,11 +1,18 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     slug = models.SlugField(unique=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['name'], name='category_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
     def __str__(self):
         return self.name
     
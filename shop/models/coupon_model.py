@@ -12,6 +12,11 @@ class Coupon(models.Model):
     used_count = models.PositiveIntegerField(default=0)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,null=True,blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['active', 'valid_to'], name='coupon_active_valid_to_idx'),
+        ]
+
     def __str__(self):
         return self.code
 
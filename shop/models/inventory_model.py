@@ -0,0 +1,54 @@
+from django.db import models
+from django.conf import settings
+from enum import IntEnum
+from .order_model import Order
+from .product_model import Product
+
+
+class MovementReason(IntEnum):
+    CREATED = 1
+    ADJUSTMENT = 2
+    RESERVATION = 3
+    RELEASE = 4
+    CANCELLATION = 5
+    IMPORT = 6
+
+    @classmethod
+    def choices(cls):
+        return [(s.value, s.name.title()) for s in cls]
+
+
+# Append-only stock ledger: every change of Product.stock adds one row
+class InventoryMovement(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_movements')
+    delta = models.IntegerField()
+    reason = models.IntegerField(choices=MovementReason.choices())
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'id'], name='movement_product_id_idx'),
+            models.Index(fields=['product', 'created_at'], name='movement_product_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.delta:+d} x Product #{self.product_id} ({MovementReason(self.reason).name.title()})"
+
+
+# Stock of a product after all movements up to last_movement_id
+class InventorySnapshot(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    stock = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='snapshot_product_taken_idx'),
+            models.Index(fields=['product', 'last_movement_id'], name='snapshot_product_movement_idx'),
+        ]
+
+    def __str__(self):
+        return f"Product #{self.product_id}: {self.stock} at {self.taken_at}"
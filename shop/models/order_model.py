@@ -12,6 +12,28 @@ class Order(models.Model):
     payment = models.OneToOneField('payment.Payment',on_delete=models.SET_NULL,null=True,blank=True,
         related_name='order_ref'
     )
+    # Token of the order form that created the order; a resubmitted form finds it again
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    # Hash of the cart lines, coupon and total the order was built from
+    cart_fingerprint = models.CharField(max_length=64, blank=True, default='')
+    # Summary of the items written at creation, so order lists never read OrderItem
+    item_count = models.PositiveIntegerField(default=0)
+    first_item_name = models.CharField(max_length=255, blank=True, default='')
+    first_item_image = models.ImageField(upload_to='products/', blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_paid', 'payment_status', 'created_at'], name='order_user_status_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            # Admin console: newest first, alone or behind one equality filter
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['payment_status', '-created_at', '-id'], name='order_status_created_idx'),
+            models.Index(fields=['is_paid', '-created_at', '-id'], name='order_paid_created_idx'),
+            models.Index(fields=['coupon', '-created_at', '-id'], name='order_coupon_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='order_user_idempotency_key_uniq'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} by {self.user}"
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from .category_model import Category
 
 class Product(models.Model):
@@ -12,8 +14,34 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     sku = models.CharField(max_length=100, unique=True)
     tags = models.CharField(max_length=255, blank=True)
+    tag_items = models.ManyToManyField('Tag', through='ProductTag', related_name='products', blank=True)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['avg_rating', 'id'], name='product_rating_id_idx'),
+            models.Index(fields=['is_active', 'created_at', 'id'], name='product_active_created_idx'),
+            models.Index(fields=['is_active', 'price'], name='product_active_price_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['sku'], name='product_sku_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.name
+
+    # Star histogram as (stars, count) pairs, highest first
+    @property
+    def rating_histogram(self):
+        return [(stars, getattr(self, f'rating_count_{stars}')) for stars in range(5, 0, -1)]
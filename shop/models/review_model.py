@@ -13,6 +13,9 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='review_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.rating}★ by {self.user}"
@@ -35,6 +35,9 @@ class Shipment(models.Model):
 
     class Meta:
         db_table = "shipments"
+        indexes = [
+            models.Index(fields=['status'], name='shipment_status_idx'),
+        ]
 
     def __str__(self):
         return f"Shipment #{self.id} | Order #{self.order.id}"
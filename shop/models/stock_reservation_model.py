@@ -0,0 +1,30 @@
+from django.db import models
+from enum import IntEnum
+from .order_model import Order
+
+
+class ReservationStatus(IntEnum):
+    HELD = 1
+    COMMITTED = 2
+    RELEASED = 3
+
+    @classmethod
+    def choices(cls):
+        return [(s.value, s.name.title()) for s in cls]
+
+
+# Stock taken off the shelf for an unpaid order; the lines are the order items
+class StockReservation(models.Model):
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="reservation")
+    status = models.IntegerField(choices=ReservationStatus.choices(), default=ReservationStatus.HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reservation for Order #{self.order_id} ({ReservationStatus(self.status).name.title()})"
@@ -0,0 +1,30 @@
+from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from .product_model import Product
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=60, unique=True)
+
+    class Meta:
+        # Spelling suggestions look tags up by trigram similarity
+        indexes = [
+            GinIndex(fields=['name'], name='tag_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ProductTag(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='product_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='product_tags')
+
+    class Meta:
+        # Tag first, so an exact tag lookup is answered from the index alone
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'product'], name='product_tag_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} tagged {self.tag_id}"
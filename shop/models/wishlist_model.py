@@ -9,6 +9,9 @@ class Wishlist(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['user', 'added_at'], name='wishlist_user_added_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} wishlisted {self.product.name}"
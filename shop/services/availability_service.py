@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db.models import Q
+from shop.models import Product
+
+
+# Stock at or below this shows an "Only N left" label
+LOW_STOCK_THRESHOLD = 5
+
+# Availability moves with every order, so entries only live for a few seconds
+AVAILABILITY_CACHE_TIMEOUT = 15
+
+# Largest number of SKUs and ids answered per request
+MAX_AVAILABILITY_LOOKUPS = 100
+
+
+# Stock status of one product
+def describe(stock, is_active=True):
+    if not is_active:
+        return {"status": "unavailable", "stock": 0, "label": "Unavailable"}
+    if stock <= 0:
+        return {"status": "out_of_stock", "stock": 0, "label": "Out of stock"}
+    if stock <= LOW_STOCK_THRESHOLD:
+        return {"status": "low_stock", "stock": stock, "label": f"Only {stock} left"}
+    return {"status": "in_stock", "stock": stock, "label": ""}
+
+
+# Attach the status of already loaded products to cart, wishlist or order lines (no queries)
+def annotate_items(items):
+    for item in items:
+        item.availability = describe(item.product.stock, item.product.is_active)
+    return items
+
+
+def _cache_key(field, value):
+    return f"availability:{field}:{value}"
+
+
+# Availability entry of a product row
+def _entry(row):
+    return {"product_id": row["id"], "sku": row["sku"], **describe(row["stock"], row["is_active"])}
+
+
+# Entry of a SKU or id that matches no product
+def _not_found(field, value):
+    return {"sku" if field == "sku" else "product_id": value, "status": "not_found"}
+
+
+# Availability of many products by SKU and/or id, in request order; unknown ones have status "not_found".
+# Cached entries are reused and every miss is loaded in a single query.
+def get_availability(skus=(), product_ids=()):
+    skus = list(dict.fromkeys(sku.strip() for sku in skus if sku and sku.strip()))
+    product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+    keys = {("sku", sku): _cache_key("sku", sku) for sku in skus}
+    keys.update({("id", product_id): _cache_key("id", product_id) for product_id in product_ids})
+    cached = cache.get_many(keys.values())
+    found = {lookup: cached[key] for lookup, key in keys.items() if key in cached}
+    missing = [lookup for lookup in keys if lookup not in found]
+    if missing:
+        rows = Product.objects.filter(
+            Q(sku__in=[value for field, value in missing if field == "sku"])
+            | Q(id__in=[value for field, value in missing if field == "id"])
+        ).values("id", "sku", "stock", "is_active")
+        loaded = {}
+        for row in rows:
+            entry = _entry(row)
+            for lookup in (("sku", row["sku"]), ("id", row["id"])):
+                if lookup in keys:
+                    loaded[lookup] = entry
+        # Unknown SKUs and ids are cached too, so repeated lookups of them stay off the database
+        for field, value in missing:
+            loaded.setdefault((field, value), _not_found(field, value))
+        cache.set_many({keys[lookup]: entry for lookup, entry in loaded.items()}, AVAILABILITY_CACHE_TIMEOUT)
+        found.update(loaded)
+    return [found[("sku", sku)] for sku in skus] + [found[("id", product_id)] for product_id in product_ids]
@@ -1,8 +1,16 @@
 from shop.models import Cart, CartItem, Product
-from django.core.exceptions import ObjectDoesNotExist
 from decimal import Decimal
-from shop.models import Coupon
-from shop.services import coupon_service
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Window
+from shop.services import coupon_service, product_service, cart_store_service, availability_service
+from shop.utils import guest_cart_util
+
+
+# Price of one cart line, computed by the database
+LINE_TOTAL = ExpressionWrapper(
+    F("product__price") * F("quantity"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
 
 
 # User Validation
@@ -41,6 +49,8 @@ def get_cart(user):
 
 # Get Cart Items
 def get_cart_items(user):
+    if cart_store_service.is_enabled():
+        return get_cart_summary(user)["items"] if is_valid_user(user) else []
     cart = get_cart(user)
     if not cart:
         return []
@@ -51,27 +61,83 @@ def get_cart_items(user):
         return []
 
 
+# Add quantity to a cart line in one statement, capped by the product stock
+def _upsert_item(cart_id, product_id, quantity):
+    items = connection.ops.quote_name(CartItem._meta.db_table)
+    products = connection.ops.quote_name(Product._meta.db_table)
+    sql = f"""
+        INSERT INTO {items} (cart_id, product_id, quantity)
+        SELECT %s, id, %s FROM {products}
+        WHERE id = %s AND is_active AND stock >= %s
+        ON CONFLICT (cart_id, product_id) DO UPDATE
+        SET quantity = {items}.quantity + EXCLUDED.quantity
+        WHERE {items}.quantity + EXCLUDED.quantity <= (
+            SELECT stock FROM {products} WHERE id = EXCLUDED.product_id
+        )
+        RETURNING id, quantity
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [cart_id, quantity, product_id, quantity])
+        return cursor.fetchone()
+
+
 # Add Item to Cart
 def add_item(user, product_id, quantity=1):
     if not is_valid_user(user) or not is_valid_id(product_id) or not is_valid_quantity(quantity):
         print("Invalid input for adding item.")
         return None
     try:
+        if cart_store_service.is_enabled():
+            return _add_stored_item(user, int(product_id), int(quantity))
         cart = get_cart(user)
-        product = Product.objects.get(id=int(product_id))
-
-        item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        item.quantity = item.quantity + int(quantity) if not created else int(quantity)
-        item.save()
-        return item
-    except ObjectDoesNotExist:
-        print(f"Product with ID {product_id} not found.")
-        return None
+        row = _upsert_item(cart.id, int(product_id), int(quantity))
+        if not row:
+            print(f"Product with ID {product_id} is unavailable or has too little stock.")
+            return None
+        item_id, item_quantity = row
+        return CartItem(id=item_id, cart=cart, product_id=int(product_id), quantity=item_quantity)
     except Exception as e:
         print(f"Error adding item to cart: {e}")
         return None
 
 
+# Add quantity to a cart line in the write-behind store, capped by the product stock
+def _add_stored_item(user, product_id, quantity):
+    product = product_service.get_product_by_id(product_id)
+    if not product or not product.is_active:
+        print(f"Product with ID {product_id} is unavailable.")
+        return None
+
+    def add(lines):
+        lines[product_id] = lines.get(product_id, 0) + quantity
+        return lines if lines[product_id] <= product.stock else None
+
+    lines = cart_store_service.update_lines(user.id, add)
+    if lines is None:
+        print(f"Product with ID {product_id} has too little stock.")
+        return None
+    return CartItem(product=product, quantity=lines[product_id])
+
+
+# Set or drop (quantity 0) lines of a cart in the write-behind store; returns the product ids changed
+def _set_stored_quantities(user, quantities):
+    changed = []
+
+    def apply(lines):
+        for product_id, quantity in quantities.items():
+            if product_id not in lines:
+                continue
+            if quantity:
+                lines[product_id] = quantity
+            else:
+                del lines[product_id]
+            changed.append(product_id)
+        return lines if changed else None
+
+    cart_store_service.update_lines(user.id, apply)
+    return changed
+
+
 # SKU Validation
 def is_valid_sku(sku):
     if not sku:
@@ -81,31 +147,15 @@ def is_valid_sku(sku):
     return bool(sku.strip())
 
 
-# Check_Avaliabilty
+# Check_Avaliabilty: stock of one SKU, or False when it cannot be sold
 def check_avaliabilty(value):
     if not is_valid_sku(value):
         print(f"check_avaliabilty: Invalid SKU provided: {value!r}")
         return False
-    sku = value.strip()
-    try:
-        product = Product.objects.get(sku=sku, is_active=True)
-    except Product.DoesNotExist:
-        print(f"check_avaliabilty: Product not found for SKU: {sku}")
-        return False
-    except Exception as e:
-        print(f"check_avaliabilty: Unexpected error fetching product for SKU {sku}: {e}")
-        return False
-    stock = product.stock
-    if stock is None:
-        print(f"check_avaliabilty: SKU {sku} => stock = unlimited (None)")
-        return None
-    try:
-        stock_int = int(stock)
-    except (TypeError, ValueError):
-        print(f"check_avaliabilty: SKU {sku} => invalid stock value: {stock!r}")
+    entry = availability_service.get_availability(skus=[value])[0]
+    if entry["status"] in ("not_found", "unavailable"):
         return False
-    print(f"check_avaliabilty: SKU {sku} => stock = {stock_int}")
-    return stock_int
+    return entry["stock"]
 
 
 # Update  Item to the Cart 
@@ -136,37 +186,108 @@ def update_item(user, product_sku, quantity, expected_sku=None):
         print(f"update_item: Quantity is not an integer: {quantity!r}")
         return None
     try:
-        cart = get_cart(user)
-        if not cart:
-            print("update_item: Could not fetch cart for user.")
-            return None
-        try:
-            product = Product.objects.get(sku=sku, is_active=True)
-        except Product.DoesNotExist:
+        product = product_service.get_product_by_sku(sku)
+        if not product:
             print(f"update_item: Product not found for SKU: {sku}")
             return None
-        stock_info = check_avaliabilty(sku)
-        if stock_info is False:
-            print(f"update_item: check_avaliabilty failed for SKU {sku}")
+        if qty_int > product.stock:
+            print(f"update_item: Requested qty {qty_int} exceeds available stock {product.stock} for SKU {sku}")
             return None
-        if stock_info is not None:
-            if qty_int > stock_info:
-                print(f"update_item: Requested qty {qty_int} exceeds available stock {stock_info} for SKU {sku}")
-                return None
-        try:
-            item = CartItem.objects.get(cart=cart, product=product)
-        except CartItem.DoesNotExist:
-            print(f"update_item: Cart item not found for product SKU: {sku}")
+        if cart_store_service.is_enabled():
+            updated = len(_set_stored_quantities(user, {product.id: qty_int}))
+        else:
+            updated = CartItem.objects.filter(
+                cart__user_id=user.id, product=product, product__stock__gte=qty_int
+            ).update(quantity=qty_int)
+        if not updated:
+            print(f"update_item: Cart item not found or out of stock for product SKU: {sku}")
             return None
-        item.quantity = qty_int
-        item.save()
         print(f"update_item: Updated SKU {sku} to quantity {qty_int} for user_id={user.id}")
-        return item
+        return updated
     except Exception as e:
         print(f"update_item: Unexpected error updating cart item: {e}")
         return None
 
 
+# Update many cart lines at once; a zero quantity removes the line
+def update_items(user, changes):
+    if not is_valid_user(user):
+        print("update_items: Invalid user.")
+        return None
+    result = {"updated": [], "removed": [], "errors": []}
+    quantities = {}
+    for sku, quantity in changes:
+        if not is_valid_sku(sku):
+            result["errors"].append((sku, "Invalid SKU."))
+            continue
+        try:
+            qty_int = int(quantity)
+            if qty_int < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            result["errors"].append((sku, "Invalid quantity."))
+            continue
+        quantities[sku.strip()] = qty_int
+    if not quantities:
+        return result
+    try:
+        if cart_store_service.is_enabled():
+            return _update_stored_items(user, quantities, result)
+        with transaction.atomic():
+            items = (
+                CartItem.objects
+                .select_for_update(of=("self",))
+                .select_related("product")
+                .filter(cart__user_id=user.id, product__sku__in=list(quantities))
+            )
+            changed, removed = [], []
+            for item in items:
+                sku = item.product.sku
+                qty_int = quantities.pop(sku)
+                if qty_int == 0:
+                    removed.append(item.id)
+                    result["removed"].append(sku)
+                elif qty_int > item.product.stock:
+                    result["errors"].append((sku, f"Only {item.product.stock} in stock."))
+                elif qty_int != item.quantity:
+                    item.quantity = qty_int
+                    changed.append(item)
+                    result["updated"].append(sku)
+            if changed:
+                CartItem.objects.bulk_update(changed, ["quantity"])
+            if removed:
+                CartItem.objects.filter(id__in=removed).delete()
+        for sku in quantities:
+            result["errors"].append((sku, "Item is not in the cart."))
+        return result
+    except Exception as e:
+        print(f"update_items: Unexpected error updating cart items: {e}")
+        return None
+
+
+# Batch update of a cart in the write-behind store, reporting like update_items
+def _update_stored_items(user, quantities, result):
+    products = {
+        product.sku: product
+        for product in Product.objects.filter(sku__in=list(quantities)).only("id", "sku", "stock")
+    }
+    accepted = {}
+    for sku, qty_int in quantities.items():
+        product = products.get(sku)
+        if product and qty_int > product.stock:
+            result["errors"].append((sku, f"Only {product.stock} in stock."))
+        elif product:
+            accepted[product.id] = qty_int
+    changed = set(_set_stored_quantities(user, accepted))
+    for sku, qty_int in quantities.items():
+        product = products.get(sku)
+        if product and product.id in changed:
+            result["removed" if qty_int == 0 else "updated"].append(sku)
+        elif product is None or product.id in accepted:
+            result["errors"].append((sku, "Item is not in the cart."))
+    return result
+
+
 # Remove Item from the Cart
 def remove_item(user, product_sku, expected_sku=None):
     if not is_valid_user(user) or not is_valid_sku(product_sku):
@@ -181,21 +302,17 @@ def remove_item(user, product_sku, expected_sku=None):
             return False
     sku = product_sku.strip()
     try:
-        cart = get_cart(user)
-        if not cart:
-            print("Could not fetch cart for user.")
-            return False
-        try:
-            product = Product.objects.get(sku=sku, is_active=True)
-        except Product.DoesNotExist:
+        product = product_service.get_product_by_sku(sku)
+        if not product:
             print(f"Product not found for SKU: {sku}")
             return False
-        try:
-            item = CartItem.objects.get(cart=cart, product=product)
-        except CartItem.DoesNotExist:
+        if cart_store_service.is_enabled():
+            deleted = len(_set_stored_quantities(user, {product.id: 0}))
+        else:
+            deleted, _ = CartItem.objects.filter(cart__user_id=user.id, product=product).delete()
+        if not deleted:
             print(f"Cart item not found for product SKU: {sku}")
             return False
-        item.delete()
         return True
     except Exception as e:
         print(f"Error removing item from cart: {e}")
@@ -208,37 +325,62 @@ def clear_cart(user):
         print("Invalid user for clearing cart.")
         return False
     try:
-        cart = get_cart(user)
-        cart.items.all().delete()
+        if cart_store_service.is_enabled():
+            cart_store_service.update_lines(user.id, lambda lines: {})
+            return True
+        CartItem.objects.filter(cart__user_id=user.id).delete()
         return True
     except Exception as e:
         print(f"Error clearing cart: {e}")
         return False
 
 
-# Calculate the total price in Grand Cart
-def calculate_cart_total(cart, request=None):
-    items = cart.items.select_related("product")
-    subtotal = sum(
-        item.product.price * item.quantity
-        for item in items
-    )
+# Cart Summary: line items, subtotal, item count and coupon in one or two queries
+def get_cart_summary(user, request=None):
+    if not is_valid_user(user):
+        print("Invalid user object.")
+        return None
+    if cart_store_service.is_enabled():
+        cart, items = None, _stored_items(user)
+        subtotal = sum((item.line_total for item in items), Decimal("0.00"))
+        item_count = sum(item.quantity for item in items)
+    else:
+        items = list(
+            CartItem.objects
+            .filter(cart__user_id=user.id)
+            .select_related("product", "cart")
+            .annotate(
+                line_total=LINE_TOTAL,
+                cart_subtotal=Window(Sum(LINE_TOTAL)),
+                cart_quantity=Window(Sum("quantity")),
+            )
+            .order_by("id")
+        )
+        cart = items[0].cart if items else None
+        subtotal = items[0].cart_subtotal if items else Decimal("0.00")
+        item_count = items[0].cart_quantity if items else 0
     discount_amount = Decimal("0.00")
     coupon = None
     if request:
         session_coupon = request.session.get("applied_coupon")
         if session_coupon:
             try:
-                coupon_id = int(session_coupon.get("coupon_id"))
-                coupon = Coupon.objects.get(id=coupon_id)
-                coupon_service.validate_coupon_for_user(request.user, coupon)
+                coupon = coupon_service.get_coupon_for_user(user, int(session_coupon.get("coupon_id")))
+                if coupon is None:
+                    raise coupon_service.CouponValidationError("Invalid coupon.")
+                coupon_service.validate_coupon_for_user(user, coupon)
                 discount_amount = (
                     subtotal * coupon.discount_percent
                 ) / Decimal("100")
             except Exception:
+                coupon = None
                 coupon_service.remove_coupon_from_session(request)
     grand_total = subtotal - discount_amount
+    availability_service.annotate_items(items)
     return {
+        "cart": cart,
+        "items": items,
+        "item_count": item_count,
         "subtotal": subtotal,
         "discount": discount_amount,
         "grand_total": max(grand_total, Decimal("0.00")),
@@ -246,11 +388,36 @@ def calculate_cart_total(cart, request=None):
     }
 
 
+# Cart lines of the write-behind store with their products, loaded in one query
+def _stored_items(user):
+    lines = cart_store_service.load_lines(user.id)
+    products = Product.objects.in_bulk(list(lines))
+    items = []
+    for product_id, quantity in lines.items():
+        product = products.get(product_id)
+        if product is None:
+            continue
+        item = CartItem(product=product, quantity=quantity)
+        item.line_total = product.price * quantity
+        items.append(item)
+    return items
+
+
+# Calculate the total price in Grand Cart
+def calculate_cart_total(cart, request=None):
+    summary = get_cart_summary(cart.user, request)
+    return {key: summary[key] for key in ("subtotal", "discount", "grand_total", "coupon")}
+
+
 # Remove Item After Payment
 def remove_order_items_from_cart(*, user, order):
     if not is_valid_user(user):
         return False
     try:
+        if cart_store_service.is_enabled():
+            order_product_ids = order.items.values_list("product_id", flat=True)
+            _set_stored_quantities(user, dict.fromkeys(order_product_ids, 0))
+            return True
         cart = get_cart(user)
         if not cart:
             return False
@@ -265,3 +432,153 @@ def remove_order_items_from_cart(*, user, order):
     except Exception as e:
         print(f"Error removing paid items from cart: {e}")
         return False
+
+
+# Check a provided SKU against the SKU the customer confirmed
+def _matches_expected_sku(product_sku, expected_sku):
+    if not expected_sku:
+        return True
+    return is_valid_sku(expected_sku) and product_sku.strip().lower() == expected_sku.strip().lower()
+
+
+# Add Item to a Guest Cart; returns the new lines, or None when the product cannot be added
+def add_guest_item(lines, product_id, quantity=1):
+    if not is_valid_id(product_id) or not is_valid_quantity(quantity):
+        print("Invalid input for adding guest item.")
+        return None
+    product_id = int(product_id)
+    if product_id not in lines and len(lines) >= guest_cart_util.GUEST_CART_MAX_LINES:
+        print("Guest cart is full.")
+        return None
+    product = product_service.get_product_by_id(product_id)
+    if not product or not product.is_active:
+        print(f"Product with ID {product_id} is unavailable.")
+        return None
+    new_quantity = lines.get(product_id, 0) + int(quantity)
+    if new_quantity > min(product.stock, guest_cart_util.GUEST_CART_MAX_QUANTITY):
+        print(f"Product with ID {product_id} has too little stock.")
+        return None
+    return {**lines, product_id: new_quantity}
+
+
+# Update many Guest Cart lines at once; a zero quantity removes the line
+def update_guest_items(lines, changes):
+    lines = dict(lines)
+    result = {"updated": [], "removed": [], "errors": []}
+    for sku, quantity in changes:
+        if not is_valid_sku(sku):
+            result["errors"].append((sku, "Invalid SKU."))
+            continue
+        try:
+            qty_int = int(quantity)
+            if qty_int < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            result["errors"].append((sku, "Invalid quantity."))
+            continue
+        sku = sku.strip()
+        product = product_service.get_product_by_sku(sku)
+        if not product or product.id not in lines:
+            result["errors"].append((sku, "Item is not in the cart."))
+        elif qty_int == 0:
+            del lines[product.id]
+            result["removed"].append(sku)
+        elif qty_int > min(product.stock, guest_cart_util.GUEST_CART_MAX_QUANTITY):
+            result["errors"].append((sku, f"Only {product.stock} in stock."))
+        elif qty_int != lines[product.id]:
+            lines[product.id] = qty_int
+            result["updated"].append(sku)
+    return lines, result
+
+
+# Update one Guest Cart line; returns the new lines, or None when nothing changed
+def update_guest_item(lines, product_sku, quantity, expected_sku=None):
+    if not is_valid_sku(product_sku) or not is_valid_quantity(quantity):
+        print("update_guest_item: Invalid SKU or quantity.")
+        return None
+    if not _matches_expected_sku(product_sku, expected_sku):
+        print(f"update_guest_item: SKU mismatch between expected ({expected_sku}) and provided ({product_sku}).")
+        return None
+    lines, result = update_guest_items(lines, [(product_sku, quantity)])
+    return None if result["errors"] else lines
+
+
+# Remove one Guest Cart line; returns the new lines, or None when it was not in the cart
+def remove_guest_item(lines, product_sku, expected_sku=None):
+    if not is_valid_sku(product_sku):
+        print("Invalid input for removing guest item.")
+        return None
+    if not _matches_expected_sku(product_sku, expected_sku):
+        print("SKU mismatch between expected and provided SKU.")
+        return None
+    lines, result = update_guest_items(lines, [(product_sku, 0)])
+    return lines if result["removed"] else None
+
+
+# Guest Cart Summary, shaped like get_cart_summary; products come from the product cache
+def get_guest_cart_summary(lines):
+    items = []
+    for product_id, quantity in lines.items():
+        product = product_service.get_product_by_id(product_id)
+        if not product or not product.is_active:
+            continue
+        item = CartItem(product=product, quantity=min(quantity, product.stock))
+        item.line_total = product.price * item.quantity
+        items.append(item)
+    subtotal = sum((item.line_total for item in items), Decimal("0.00"))
+    availability_service.annotate_items(items)
+    return {
+        "cart": None,
+        "items": items,
+        "item_count": sum(item.quantity for item in items),
+        "subtotal": subtotal,
+        "discount": Decimal("0.00"),
+        "grand_total": subtotal,
+        "coupon": None,
+    }
+
+
+# Merge a Guest Cart into the customer's cart with one upsert, capped by the product stock
+def merge_guest_cart(user, lines):
+    if not is_valid_user(user):
+        print("Invalid user for merging guest cart.")
+        return 0
+    lines = {
+        int(product_id): int(quantity)
+        for product_id, quantity in lines.items()
+        if is_valid_id(product_id) and is_valid_quantity(quantity)
+    }
+    if not lines:
+        return 0
+    try:
+        # Pending cached writes go first; the merged rows are then read back on demand
+        store = cart_store_service.is_enabled()
+        if store:
+            cart_store_service.flush_cart(user.id)
+        cart = get_cart(user)
+        items = connection.ops.quote_name(CartItem._meta.db_table)
+        products = connection.ops.quote_name(Product._meta.db_table)
+        values = ", ".join(["(%s, %s)"] * len(lines))
+        sql = f"""
+            WITH guest (product_id, quantity) AS (VALUES {values})
+            INSERT INTO {items} (cart_id, product_id, quantity)
+            SELECT %s, p.id, CASE WHEN guest.quantity < p.stock THEN guest.quantity ELSE p.stock END
+            FROM guest JOIN {products} p ON p.id = guest.product_id
+            WHERE p.is_active AND p.stock > 0
+            ON CONFLICT (cart_id, product_id) DO UPDATE
+            SET quantity = (
+                SELECT CASE WHEN {items}.quantity + EXCLUDED.quantity < stock
+                    THEN {items}.quantity + EXCLUDED.quantity ELSE stock END
+                FROM {products} WHERE id = EXCLUDED.product_id
+            )
+        """
+        params = [value for line in lines.items() for value in line] + [cart.id]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            merged = cursor.rowcount
+        if store:
+            cart_store_service.forget_cart(user.id)
+        return merged
+    except Exception as e:
+        print(f"Error merging guest cart: {e}")
+        return 0
@@ -0,0 +1,181 @@
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from shop.models import Cart, CartItem, Product
+from shop.utils import cache_util
+
+
+# Write-behind cart store: with CART_STORE = "cache" the cart lines of each
+# customer live in the cache and are written back to Cart and CartItem in
+# batches by flush_carts (periodically) and flush_cart (at checkout).
+# A cart missing from the cache is rebuilt from its last flushed rows.
+CART_STORE_TIMEOUT = 60 * 60 * 24 * 7
+CART_STORE_FLUSH_BATCH_SIZE = 500
+CART_STORE_LOCK_TIMEOUT = 5
+
+DIRTY_SET_KEY = "cartstore:dirty"
+
+
+# Whether CART_STORE asks for the write-behind store
+def is_requested():
+    return getattr(settings, "CART_STORE", "database") == "cache"
+
+
+# Whether cart writes go through the cache. Never with a process-local cache: the web
+# processes and flush_cart_store would each see their own dirty set, and unflushed
+# carts would die with the process.
+def is_enabled():
+    return is_requested() and cache_util.is_cache_shared()
+
+
+# System check: CART_STORE = "cache" on a process-local cache falls back to the database
+def check_cart_store(app_configs=None, **kwargs):
+    if not is_requested() or cache_util.is_cache_shared():
+        return []
+    return [checks.Warning(
+        'CART_STORE is "cache" but the default cache is local to each process.',
+        hint="Point CACHE_URL at a shared cache (Redis, Memcached, database). Carts are written to the database until then.",
+        id="shop.W001",
+    )]
+
+
+# Cache keys of a customer's cart
+def _lines_key(user_id):
+    return f"cartstore:lines:{user_id}"
+
+
+def _dirty_key(user_id):
+    return f"cartstore:dirty:{user_id}"
+
+
+# Short lock held in the cache, shared by every process using it
+@contextmanager
+def _cache_lock(key):
+    lock_key = f"cartstore:lock:{key}"
+    deadline = time.monotonic() + CART_STORE_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, CART_STORE_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Cart store lock {key} is busy.")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+# Cart lines of a customer ({product_id: quantity}), rebuilt from the database on a miss
+def load_lines(user_id):
+    lines = cache.get(_lines_key(user_id))
+    if lines is None:
+        lines = dict(
+            CartItem.objects
+            .filter(cart__user_id=user_id)
+            .order_by("id")
+            .values_list("product_id", "quantity")
+        )
+        cache.add(_lines_key(user_id), lines, CART_STORE_TIMEOUT)
+    return lines
+
+
+# Apply change(lines) under the customer's lock; the change returns the new lines or None to abort
+def update_lines(user_id, change):
+    with _cache_lock(user_id):
+        lines = change(dict(load_lines(user_id)))
+        if lines is None:
+            return None
+        cache.set(_lines_key(user_id), lines, CART_STORE_TIMEOUT)
+    _mark_dirty(user_id)
+    return lines
+
+
+# Queue a customer's cart for the next flush
+def _mark_dirty(user_id):
+    if not cache.add(_dirty_key(user_id), 1, CART_STORE_TIMEOUT):
+        return
+    with _cache_lock(DIRTY_SET_KEY):
+        dirty = cache.get(DIRTY_SET_KEY) or set()
+        dirty.add(user_id)
+        cache.set(DIRTY_SET_KEY, dirty, None)
+
+
+# Take the queued carts; a write after this point queues its cart again
+def _take_dirty():
+    with _cache_lock(DIRTY_SET_KEY):
+        dirty = cache.get(DIRTY_SET_KEY) or set()
+        cache.delete(DIRTY_SET_KEY)
+    cache.delete_many([_dirty_key(user_id) for user_id in dirty])
+    return sorted(dirty)
+
+
+# Write many carts back in one transaction: one upsert for the lines, one delete for the rest
+def write_back(entries):
+    if not entries:
+        return 0
+    product_ids = {product_id for lines in entries.values() for product_id in lines}
+    existing = set(Product.objects.filter(id__in=product_ids).values_list("id", flat=True))
+    with transaction.atomic():
+        Cart.objects.bulk_create([Cart(user_id=user_id) for user_id in entries], ignore_conflicts=True)
+        carts = dict(Cart.objects.filter(user_id__in=entries).values_list("user_id", "id"))
+        stale = Q()
+        rows = []
+        for user_id, lines in entries.items():
+            kept = [product_id for product_id in lines if product_id in existing]
+            stale |= Q(cart_id=carts[user_id]) & ~Q(product_id__in=kept)
+            rows.extend(
+                CartItem(cart_id=carts[user_id], product_id=product_id, quantity=lines[product_id])
+                for product_id in kept
+            )
+        CartItem.objects.filter(stale).delete()
+        CartItem.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["cart", "product"],
+            update_fields=["quantity"],
+        )
+    return len(entries)
+
+
+# Flush every queued cart in batches; returns the number of carts written
+def flush_carts(batch_size=CART_STORE_FLUSH_BATCH_SIZE):
+    user_ids = _take_dirty()
+    flushed = 0
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        cached = cache.get_many([_lines_key(user_id) for user_id in chunk])
+        # A cart evicted from the cache keeps its last flushed rows
+        entries = {
+            user_id: cached[_lines_key(user_id)]
+            for user_id in chunk
+            if _lines_key(user_id) in cached
+        }
+        try:
+            flushed += write_back(entries)
+        except Exception as e:
+            print(f"Error flushing carts: {e}")
+            for user_id in entries:
+                _mark_dirty(user_id)
+    return flushed
+
+
+# Flush one customer's cart now (before checkout)
+def flush_cart(user_id):
+    cache.delete(_dirty_key(user_id))
+    lines = cache.get(_lines_key(user_id))
+    if lines is None:
+        return False
+    try:
+        write_back({user_id: lines})
+        return True
+    except Exception as e:
+        print(f"Error flushing cart of user {user_id}: {e}")
+        _mark_dirty(user_id)
+        return False
+
+
+# Drop a customer's cached cart so the next read rebuilds it from the database
+def forget_cart(user_id):
+    cache.delete_many([_lines_key(user_id), _dirty_key(user_id)])
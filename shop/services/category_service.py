@@ -1,6 +1,7 @@
 from shop.models import Category
 from django.core.exceptions import ObjectDoesNotExist
-from shop.utils import slug_util
+from shop.utils import slug_util, cache_util
+from shop.services import search_service
 
 
 # Fetch all Categories
@@ -29,13 +30,13 @@ def create_category(data):
     try:
         name = data.get('name')
         provided_slug = data.get('slug')
-        slug = slug_util.generate_unique_slug(Category, name, provided_slug)
-        category = Category.objects.create(
+        category = slug_util.create_unique(
+            Category, 'slug', name, provided_slug,
             name=name,
             description=data.get('description', ''),
             image=data.get('image'),
-            slug=slug
         )
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         return category
     except Exception as e:
         print(f"Error creating category: {e}")
@@ -45,6 +46,7 @@ def create_category(data):
 def update_category(category_id, data):
     try:
         category = Category.objects.get(id=category_id)
+        old_name = category.name
         category.name = data.get('name', category.name)
         category.description = data.get('description', category.description)
         new_image = data.get('image')
@@ -52,10 +54,13 @@ def update_category(category_id, data):
             category.image = new_image
         new_slug = data.get('slug')
         if new_slug:
-            category.slug = slug_util.generate_unique_slug(Category, category.name, new_slug)
-        elif category.slug != slug_util.generate_unique_slug(Category, category.name, category.slug):
-            category.slug = slug_util.generate_unique_slug(Category, category.name)
+            category.slug = slug_util.generate_unique_slug(Category, category.name, new_slug, exclude_pk=category.pk)
+        elif category.slug != slug_util.generate_unique_slug(Category, category.name, category.slug, exclude_pk=category.pk):
+            category.slug = slug_util.generate_unique_slug(Category, category.name, exclude_pk=category.pk)
         category.save()
+        if category.name != old_name:
+            search_service.refresh_category_search_vectors(category)
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         return category
     except ObjectDoesNotExist:
         print(f"Category with ID {category_id} not found.")
@@ -71,6 +76,7 @@ def delete_category(category_id):
     try:
         category = Category.objects.get(id=category_id)
         category.delete()
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         return True
     except ObjectDoesNotExist:
         print(f"Category with ID {category_id} not found.")
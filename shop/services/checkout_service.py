@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+from django.db import transaction
+from payment import utils
+from payment.models import Payment, PaymentMethod, PaymentStatus
+from shop.models import CartItem, Order, OrderItem, StockReservation
+from shop.services import cart_service, cart_store_service, coupon_service, reservation_service, shipment_service
+
+
+# Checkout completes a paid order in one transaction with a fixed number of queries.
+# Rows are locked in the order the reservation sweeper and cancellation already use,
+# so concurrent checkouts, cancellations and sweeps queue instead of deadlocking:
+#   stock reservation -> products (by id) -> order -> payment -> coupon -> cart items
+
+
+# Status of an order charged after its stock was sold to someone else
+REFUNDING = "refunding"
+
+
+# Checkout Error Handle
+class CheckoutError(Exception):
+    pass
+
+
+# Time one stage of a checkout in milliseconds
+@contextmanager
+def _stage(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+# Pay an order with Z-Pay and complete it: payment, stock, coupon, shipment and cart in one transaction.
+# Returns {"paid": bool, "already_paid": bool, "refunding": bool, "order": Order, "timings": {stage: ms}};
+# "refunding" means the charge went through but the stock was gone, so the order was not completed.
+def complete_zpay_checkout(*, user, order_id, request):
+    timings = {}
+    with _stage(timings, "total"):
+        with _stage(timings, "validate"):
+            order = Order.objects.select_related("coupon", "user").filter(id=order_id, user=user).first()
+            if order is None:
+                raise CheckoutError("Order not found.")
+            if order.is_paid:
+                return {"paid": True, "already_paid": True, "refunding": False, "order": order, "timings": timings}
+            if order.payment_status == "cancelled":
+                raise CheckoutError("This order was cancelled.")
+            if order.payment_status == REFUNDING:
+                raise CheckoutError("This order was already charged and is being refunded.")
+            # Checked before charging so a paid order never waits for an address
+            address = user.addresses.filter(is_default=True).first()
+            if address is None:
+                raise CheckoutError("Default address not found. Cannot create shipment.")
+
+        with _stage(timings, "reserve"):
+            try:
+                reservation_service.ensure_reservation(order)
+            except reservation_service.StockReservationError as e:
+                raise CheckoutError(f"{e} Please update your cart and order again.")
+
+        # The gateway is called without holding any lock
+        with _stage(timings, "gateway"):
+            utils.simulate_gateway_delay()
+            result = utils.simulate_payment_result()
+            txn_id = utils.generate_txn_id()
+            meta = utils.build_transaction_meta(order.id, "ZPAY")
+
+        if result != "success":
+            # select_for_update needs a transaction; the order stays unpaid and keeps its reservation
+            with _stage(timings, "commit"), transaction.atomic():
+                _record_payment(user, order, PaymentStatus.FAILED, txn_id, meta)
+            coupon_service.flush_coupon_session(request)
+            return {"paid": False, "already_paid": False, "refunding": False, "order": order, "timings": timings}
+
+        with _stage(timings, "commit"):
+            outcome = _commit_checkout(user, order, address, txn_id, meta)
+        if outcome == REFUNDING:
+            return {"paid": False, "already_paid": False, "refunding": True, "order": order, "timings": timings}
+        if order.coupon:
+            coupon_service.flush_coupon_session(request)
+        if cart_store_service.is_enabled():
+            cart_service.remove_order_items_from_cart(user=user, order=order)
+    return {"paid": True, "already_paid": outcome == "already_paid", "refunding": False, "order": order, "timings": timings}
+
+
+# Create or update the order's payment row
+def _record_payment(user, order, status, txn_id, meta):
+    payment = Payment.objects.select_for_update().filter(order_id=order.id).order_by("id").first()
+    if payment is None:
+        return Payment.objects.create(
+            user=user, order_id=order.id, amount=order.total_amount,
+            method=PaymentMethod.ZPAY.value, status=status.value,
+            transaction_id=txn_id, meta=meta,
+        )
+    if status == PaymentStatus.SUCCESS:
+        payment.mark_success(txn_id=txn_id, meta=meta)
+    else:
+        payment.mark_failed(txn_id=txn_id, meta=meta)
+    return payment
+
+
+# Every write of a successful payment, in lock order. Returns "paid", "already_paid" when another
+# checkout paid the order first, or REFUNDING when the released stock could not be taken again
+def _commit_checkout(user, order, address, txn_id, meta):
+    with transaction.atomic():
+        list(StockReservation.objects.select_for_update().filter(order_id=order.id))
+        in_stock = reservation_service.commit_reservation(order)
+        if not Order.objects.select_for_update().filter(id=order.id, is_paid=False).exists():
+            order.is_paid = True
+            return "already_paid"
+        payment = _record_payment(user, order, PaymentStatus.SUCCESS, txn_id, meta)
+        if not in_stock:
+            # The charge is kept on the order for the refund; nothing is shipped or used up
+            order.payment_status = REFUNDING
+            order.payment = payment
+            order.save(update_fields=["payment_status", "payment"])
+            return REFUNDING
+        if order.coupon:
+            coupon_service.mark_coupon_used(user, order.coupon)
+        order.is_paid = True
+        order.payment_status = "paid"
+        order.payment = payment
+        order.save(update_fields=["is_paid", "payment_status", "payment"])
+        shipment_service.create_shipment_after_payment(order=order, address=address)
+        # A cache-backed cart is trimmed after the commit instead
+        if not cart_store_service.is_enabled():
+            CartItem.objects.filter(
+                cart__user_id=user.id,
+                product_id__in=OrderItem.objects.filter(order_id=order.id).values("product_id"),
+            ).delete()
+        return "paid"
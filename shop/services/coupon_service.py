@@ -2,6 +2,7 @@ import re
 from datetime import datetime
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
 from decimal import Decimal
 from shop.models import Coupon,CouponUsage,CouponAssignment
 
@@ -123,18 +124,36 @@ def validate_coupon_for_user(user, coupon: Coupon):
         raise CouponValidationError("Coupon expired.")
     if coupon.used_count >= coupon.usage_limit:
         raise CouponValidationError("Coupon usage limit reached.")
-    if not CouponAssignment.objects.filter(coupon=coupon,user=user).exists():
+    is_assigned = getattr(coupon, "is_assigned", None)
+    if is_assigned is None:
+        is_assigned = CouponAssignment.objects.filter(coupon=coupon,user=user).exists()
+    if not is_assigned:
         raise CouponValidationError("Coupon not assigned to user.")
-    if CouponUsage.objects.filter(coupon=coupon,user=user).exists():
+    is_used = getattr(coupon, "is_used", None)
+    if is_used is None:
+        is_used = CouponUsage.objects.filter(coupon=coupon,user=user).exists()
+    if is_used:
         raise CouponValidationError("Coupon already used.")
     return coupon
 
 
+# Coupon with the user's assignment and usage flags, fetched in one query
+def get_coupon_for_user(user, coupon_id):
+    return (
+        Coupon.objects
+        .annotate(
+            is_assigned=Exists(CouponAssignment.objects.filter(coupon=OuterRef("pk"), user=user)),
+            is_used=Exists(CouponUsage.objects.filter(coupon=OuterRef("pk"), user=user)),
+        )
+        .filter(id=coupon_id)
+        .first()
+    )
+
+
 # Apply Coupon by ID
 def apply_coupon_by_id(user, coupon_id):
-    try:
-        coupon = Coupon.objects.get(id=coupon_id,active=True)
-    except Coupon.DoesNotExist:
+    coupon = get_coupon_for_user(user, coupon_id)
+    if coupon is None or not coupon.active:
         raise CouponValidationError("Invalid coupon.")
     return validate_coupon_for_user(user, coupon)
 
@@ -156,13 +175,17 @@ def remove_coupon_from_session(request):
 
 
 # Mark as Coupon was used or not
+# One insert that skips an existing usage, one update that recounts under the coupon's row lock
 def mark_coupon_used(user, coupon):
-    with transaction.atomic():
-        if CouponUsage.objects.select_for_update().filter(coupon=coupon,user=user).exists():
-            return
-        CouponUsage.objects.create(coupon=coupon,user=user)
-        coupon.used_count = CouponUsage.objects.filter(coupon=coupon).count()
-        coupon.save(update_fields=["used_count"])
+    with transaction.atomic(savepoint=False):
+        CouponUsage.objects.bulk_create([CouponUsage(coupon=coupon, user=user)], ignore_conflicts=True)
+        Coupon.objects.filter(id=coupon.id).update(used_count=Subquery(
+            CouponUsage.objects
+            .filter(coupon=OuterRef("pk"))
+            .values("coupon")
+            .annotate(total=Count("id"))
+            .values("total")
+        ))
 
 
 # Flush Coupon after use or Cancel Order
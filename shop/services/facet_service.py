@@ -0,0 +1,131 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Q
+from shop.models import ProductTag
+from shop.services import tag_service
+from shop.utils import cache_util, validation_utils
+
+
+# Price buckets offered as a facet: (key, label, lower bound, upper bound)
+PRICE_BUCKETS = [
+    ("0-500", "Under ₹500", Decimal("0"), Decimal("500")),
+    ("500-1000", "₹500 – ₹1,000", Decimal("500"), Decimal("1000")),
+    ("1000-5000", "₹1,000 – ₹5,000", Decimal("1000"), Decimal("5000")),
+    ("5000-20000", "₹5,000 – ₹20,000", Decimal("5000"), Decimal("20000")),
+    ("20000+", "Over ₹20,000", Decimal("20000"), None),
+]
+
+FACET_TAG_LIMIT = 15
+FACET_CACHE_TIMEOUT = 600
+# Stock changes on every reservation without touching the catalog version, so the
+# in-stock count is cached apart, no longer than availability entries
+FACET_STOCK_CACHE_TIMEOUT = 15
+
+
+# Read the facet filters from the query string
+def parse_filters(params):
+    filters = {}
+    try:
+        category_id = int(params.get("category", ""))
+        if category_id > 0:
+            filters["category"] = category_id
+    except (TypeError, ValueError):
+        pass
+    price = params.get("price")
+    if price in {bucket[0] for bucket in PRICE_BUCKETS}:
+        filters["price"] = price
+    tag = tag_service.normalize_tag(params.get("tag"))
+    if tag:
+        filters["tag"] = tag
+    if validation_utils.parse_boolean(params.get("in_stock")):
+        filters["in_stock"] = True
+    return filters
+
+
+# Narrow a product queryset by the selected facets
+def apply_filters(queryset, filters):
+    if "category" in filters:
+        queryset = queryset.filter(category_id=filters["category"])
+    if "price" in filters:
+        for key, _, low, high in PRICE_BUCKETS:
+            if key == filters["price"]:
+                queryset = queryset.filter(price__gte=low)
+                if high is not None:
+                    queryset = queryset.filter(price__lt=high)
+    if "tag" in filters:
+        tagged = ProductTag.objects.filter(tag__name=filters["tag"]).values("product_id")
+        queryset = queryset.filter(id__in=tagged)
+    if filters.get("in_stock"):
+        queryset = queryset.filter(stock__gt=0)
+    return queryset
+
+
+# Filters without those of the given facets
+def _without(filters, *facets):
+    return {key: value for key, value in filters.items() if key not in facets}
+
+
+# Condition of one price bucket
+def _price_condition(low, high):
+    return Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+
+
+# Disjunctive facet counts: each facet is counted with every selected filter except its own,
+# so the other options of a selected facet stay visible. Three aggregate queries.
+def compute_facet_counts(queryset, filters=None):
+    filters = filters or {}
+    queryset = queryset.order_by()
+    # Price and availability share one aggregate: each applies the other's selection as a FILTER clause
+    in_stock_condition = Q(stock__gt=0) if filters.get("in_stock") else Q()
+    price_condition = Q()
+    price_counts = {}
+    for index, (key, _, low, high) in enumerate(PRICE_BUCKETS):
+        bucket = _price_condition(low, high)
+        if filters.get("price") == key:
+            price_condition = bucket
+        price_counts[f"price_{index}"] = Count("id", filter=bucket & in_stock_condition)
+    totals = apply_filters(queryset, _without(filters, "price", "in_stock")).aggregate(
+        total=Count("id", filter=price_condition & in_stock_condition),
+        in_stock=Count("id", filter=price_condition & Q(stock__gt=0)),
+        **price_counts,
+    )
+    categories = list(
+        apply_filters(queryset, _without(filters, "category"))
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("category__name")
+    )
+    return {
+        "total": totals["total"],
+        "in_stock": totals["in_stock"],
+        "price": [
+            {"key": key, "label": label, "count": totals[f"price_{index}"]}
+            for index, (key, label, _, _) in enumerate(PRICE_BUCKETS)
+        ],
+        "categories": [
+            {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+            for row in categories
+        ],
+        "tags": tag_service.count_tags(apply_filters(queryset, _without(filters, "tag")), FACET_TAG_LIMIT),
+    }
+
+
+# Facet counts of the unfiltered products, served from the catalog cache for unfiltered browsing.
+# The in-stock count has its own short-lived entry and is recounted alone when only it expired.
+def get_facet_counts(queryset, filters=None, cache_scope=None):
+    if filters or not cache_scope:
+        return compute_facet_counts(queryset, filters)
+    key = cache_util.versioned_key(cache_util.CATALOG_NAMESPACE, "facets", cache_scope)
+    stock_key = f"{key}:in_stock"
+    cached = cache.get_many([key, stock_key])
+    counts = cached.get(key)
+    if counts is None:
+        counts = compute_facet_counts(queryset)
+        cache.set(key, {**counts, "in_stock": None}, cache_util.shared_timeout(FACET_CACHE_TIMEOUT))
+    elif stock_key in cached:
+        counts = {**counts, "in_stock": cached[stock_key]}
+    else:
+        counts = {**counts, "in_stock": queryset.filter(stock__gt=0).count()}
+    if stock_key not in cached:
+        cache.set(stock_key, counts["in_stock"], FACET_STOCK_CACHE_TIMEOUT)
+    return counts
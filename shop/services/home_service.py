@@ -1,7 +1,55 @@
+from django.core.cache import cache
 from shop.models.product_model import Product
 from shop.models.category_model import Category
+from shop.models.wishlist_model import Wishlist
+from shop.utils import cache_util
+from shop.services import image_service
 
-def get_homepage_context(user=None):
+
+# Cache lifetime of the shared homepage data (invalidated early by catalog writes)
+HOMEPAGE_CACHE_TIMEOUT = 900
+
+
+def _image_url(image):
+    return image.url if image else None
+
+
+def _build_catalog_context():
+    """
+    Build the user-independent part of the homepage as plain data.
+    """
+    products = (
+        Product.objects
+        .filter(is_active=True)
+        .select_related("category")
+        .order_by("-created_at", "-id")[:6]
+    )
+    categories = Category.objects.all().order_by("name")
+    return {
+        "products": [
+            {
+                "id": product.id,
+                "name": product.name,
+                "price": product.price,
+                "image_url": _image_url(product.image),
+                "image_variants": image_service.current_variants(product.image, product.image_variants),
+                "category_name": product.category.name,
+            }
+            for product in products
+        ],
+        "categories": [
+            {
+                "id": category.id,
+                "name": category.name,
+                "image_url": _image_url(category.image),
+                "image_variants": image_service.current_variants(category.image, category.image_variants),
+            }
+            for category in categories
+        ],
+    }
+
+
+def get_homepage_context(user_id=None):
     """
     Build homepage context for both guests and logged-in users.
     """
@@ -13,16 +61,18 @@ def get_homepage_context(user=None):
     }
 
     try:
-        # Latest 6 active products
-        context["products"] = Product.objects.filter(is_active=True).order_by("-created_at")[:6]
-
-        # All categories
-        context["categories"] = Category.objects.all().order_by("name")
+        # Latest products and all categories, cached per catalog version
+        key = cache_util.versioned_key(cache_util.CATALOG_NAMESPACE, "homepage")
+        catalog = cache.get(key)
+        if catalog is None:
+            catalog = _build_catalog_context()
+            cache.set(key, catalog, cache_util.shared_timeout(HOMEPAGE_CACHE_TIMEOUT))
+        context.update(catalog)
 
         # If logged-in, show wishlist count
-        if user and user.is_authenticated:
+        if user_id:
             context["user_logged_in"] = True
-            context["wishlist_count"] = user.wishlists.count()
+            context["wishlist_count"] = Wishlist.objects.filter(user_id=user_id).count()
 
     except Exception as e:
         print(f"[HomeService] Error fetching homepage data: {e}")
@@ -0,0 +1,179 @@
+import os
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+
+# Derivative widths generated for every uploaded image
+IMAGE_VARIANTS = {
+    "thumb": 160,
+    "card": 480,
+    "detail": 1200,
+}
+
+# Output formats: (Pillow format, save options)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Models with derivatives: label -> (image field, variants field)
+IMAGE_TARGETS = {
+    "shop.Product": ("image", "image_variants"),
+    "shop.Category": ("image", "image_variants"),
+    "user.User": ("profile_photo", "photo_variants"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Storage path of one derivative, next to the original upload
+def variant_path(name, size, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "variants", f"{stem}-{size}.{extension}")
+
+
+# Render every size and format of a stored image and save them to storage
+def render_variants(name):
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name, "rb") as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    rgb = original.convert("RGB")
+    variants = {"source": name}
+    for size, width in IMAGE_VARIANTS.items():
+        image = rgb
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        variants[size] = {"width": image.width}
+        for extension, (image_format, options) in IMAGE_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            path = variant_path(name, size, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            variants[size][extension] = default_storage.save(path, ContentFile(buffer.getvalue()))
+    return variants
+
+
+# Worker entry point: build the derivatives of one row and store their paths
+def build_variants(label, pk):
+    model = apps.get_model(label)
+    image_field, variants_field = IMAGE_TARGETS[label]
+    name = model.objects.filter(pk=pk).values_list(image_field, flat=True).first()
+    if not name:
+        return label, pk, 0
+    variants = render_variants(name)
+    # Skip the write when a newer upload replaced the image meanwhile
+    updated = model.objects.filter(pk=pk, **{image_field: name}).update(**{variants_field: variants})
+    return label, pk, updated
+
+
+# Prepare Django inside a spawned worker process
+def _init_worker():
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
+    django.setup()
+
+
+# New process pool of Django-ready workers
+def create_executor(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+# Shared process pool of the web process, created on first use
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_executor(settings.IMAGE_WORKERS)
+        return _executor
+
+
+# Drop the cached product entry that still points at the old derivatives.
+# Catalog pages (homepage, facets) pick new derivatives up on their next rebuild;
+# the backfill command bumps the catalog version once per run.
+def invalidate_cached_images(label, pk):
+    from shop.services import product_service
+    if label == "shop.Product":
+        product_service.invalidate_product_cache(pk)
+
+
+# Pool callback, runs in the web process once a worker finished
+def _on_variants_built(future):
+    try:
+        label, pk, updated = future.result()
+    except Exception as e:
+        print(f"[image_service] Error building image variants: {e}")
+        return
+    if updated:
+        invalidate_cached_images(label, pk)
+
+
+# Build the derivatives of a row in the web process's worker pool
+def schedule_variants(label, pk):
+    future = get_executor().submit(build_variants, label, pk)
+    future.add_done_callback(_on_variants_built)
+
+
+# post_save receiver: queue derivatives when the stored image changed.
+# With IMAGE_WORKERS = 0 (the default) the web process starts no pool and
+# generate_image_variants builds them; pages serve the original until then.
+def queue_image_variants(sender, instance, update_fields=None, **kwargs):
+    label = sender._meta.label
+    image_field, variants_field = IMAGE_TARGETS[label]
+    if update_fields is not None and image_field not in update_fields:
+        return
+    if image_field in instance.get_deferred_fields():
+        return
+    image = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    if not image:
+        if variants:
+            sender.objects.filter(pk=instance.pk).update(**{variants_field: {}})
+        return
+    if variants.get("source") == image.name or settings.IMAGE_WORKERS <= 0:
+        return
+    transaction.on_commit(lambda: schedule_variants(label, instance.pk))
+
+
+# Variants that still belong to the current image (a new upload is rendered later)
+def current_variants(image, variants):
+    if not image or not variants:
+        return {}
+    name = image if isinstance(image, str) else image.name
+    return variants if isinstance(image, str) or variants.get("source") == name else {}
+
+
+# URL of one derivative, falling back to the original image
+def variant_url(image, variants, size="card", extension="jpeg"):
+    path = (current_variants(image, variants).get(size) or {}).get(extension)
+    if path:
+        return default_storage.url(path)
+    if not image:
+        return None
+    return image if isinstance(image, str) else image.url
+
+
+# "url width" candidates of one format for a srcset attribute
+def build_srcset(variants, extension):
+    candidates = {}
+    for size in IMAGE_VARIANTS:
+        entry = (variants or {}).get(size) or {}
+        if entry.get(extension):
+            candidates.setdefault(entry["width"], default_storage.url(entry[extension]))
+    return ", ".join(f"{url} {width}w" for width, url in candidates.items())
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery, Sum
+from shop.models import InventoryMovement, InventorySnapshot, MovementReason, Product
+
+
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+# Append ledger rows: (product_id, delta, reason, order_id) tuples, zero deltas skipped
+def record_movements(movements, user_id=None):
+    rows = [
+        InventoryMovement(
+            product_id=product_id, delta=delta, reason=reason,
+            order_id=order_id, created_by_id=user_id,
+        )
+        for product_id, delta, reason, order_id in movements
+        if delta
+    ]
+    return InventoryMovement.objects.bulk_create(rows)
+
+
+# Append one ledger row
+def record_movement(product_id, delta, reason, order_id=None, user_id=None):
+    return record_movements([(product_id, delta, reason, order_id)], user_id=user_id)
+
+
+# Latest snapshot of a product, optionally the latest taken at or before a time
+def _latest_snapshot(product_id, at=None):
+    snapshots = InventorySnapshot.objects.filter(product_id=product_id)
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    return snapshots.order_by("-last_movement_id").first()
+
+
+# Ledger stock of a product now or at a past time: one snapshot plus the movements after it
+def stock_at(product_id, at=None):
+    snapshot = _latest_snapshot(product_id, at)
+    movements = InventoryMovement.objects.filter(product_id=product_id)
+    if snapshot:
+        movements = movements.filter(id__gt=snapshot.last_movement_id)
+    if at is not None:
+        movements = movements.filter(created_at__lte=at)
+    since = movements.aggregate(total=Sum("delta"))["total"] or 0
+    return (snapshot.stock if snapshot else 0) + since
+
+
+# Snapshot every product with movements after its latest snapshot, in product id batches
+def take_snapshots(batch_size=SNAPSHOT_BATCH_SIZE):
+    taken = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not batch:
+            return taken
+        last_id = batch[-1]
+        latest_ids = (
+            Product.objects
+            .filter(id__in=batch)
+            .annotate(snapshot_id=Subquery(
+                InventorySnapshot.objects
+                .filter(product=OuterRef("pk"))
+                .order_by("-last_movement_id")
+                .values("id")[:1]
+            ))
+            .values_list("snapshot_id", flat=True)
+        )
+        latest = {
+            snapshot.product_id: snapshot
+            for snapshot in InventorySnapshot.objects.filter(id__in=[i for i in latest_ids if i])
+        }
+        floor = min((snapshot.last_movement_id for snapshot in latest.values()), default=0)
+        if len(latest) < len(batch):
+            floor = 0
+        pending = defaultdict(list)
+        for movement_id, product_id, delta, created_at in (
+            InventoryMovement.objects
+            .filter(product_id__in=batch, id__gt=floor)
+            .order_by("id")
+            .values_list("id", "product_id", "delta", "created_at")
+        ):
+            snapshot = latest.get(product_id)
+            if snapshot is None or movement_id > snapshot.last_movement_id:
+                pending[product_id].append((movement_id, delta, created_at))
+        snapshots = []
+        for product_id, movements in pending.items():
+            snapshot = latest.get(product_id)
+            last_movement_id, _, taken_at = movements[-1]
+            snapshots.append(InventorySnapshot(
+                product_id=product_id,
+                stock=(snapshot.stock if snapshot else 0) + sum(delta for _, delta, _ in movements),
+                last_movement_id=last_movement_id,
+                taken_at=taken_at,
+            ))
+        InventorySnapshot.objects.bulk_create(snapshots)
+        taken += len(snapshots)
+
+
+# Open the ledger of products that have none yet with their current stock
+def backfill_movements():
+    with transaction.atomic():
+        products = (
+            Product.objects
+            .filter(~Exists(InventoryMovement.objects.filter(product=OuterRef("pk"))), stock__gt=0)
+            .values_list("id", "stock")
+        )
+        rows = record_movements(
+            (product_id, stock, MovementReason.CREATED, None) for product_id, stock in products
+        )
+    return len(rows)
@@ -1,9 +1,14 @@
+import hashlib
+import uuid
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from urllib import request
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
 from shop.models import Order, OrderItem, Cart
-from django.db.models import Prefetch
-from shop.services import coupon_service
+from shop.services import coupon_service, cart_store_service, reservation_service
+from shop.utils import export_util, pagination_util
 
 
 
@@ -18,63 +23,205 @@ class OrderCancelError(Exception):
     pass
 
 
+# Fresh idempotency key rendered into the order form
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+# Idempotency key posted by the order form, None when missing or malformed
+def clean_idempotency_key(value):
+    value = (value or "").strip()
+    if not value or len(value) > 64 or not value.replace("-", "").isalnum():
+        return None
+    return value
+
+
+# Order a customer already created with an idempotency key
+def get_order_for_key(*, user, idempotency_key):
+    if not idempotency_key:
+        return None
+    return Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+
+
+# Hash of what an order would be built from: cart lines with prices, coupon and total
+def cart_fingerprint(items, cart_totals):
+    coupon = cart_totals.get("coupon")
+    lines = sorted(
+        (item.product.id, item.quantity, str(item.product.price))
+        for item in items
+    )
+    payload = "|".join(
+        [f"{product_id}:{quantity}:{price}" for product_id, quantity, price in lines]
+        + [f"coupon:{coupon.id if coupon else ''}", f"total:{cart_totals['grand_total']}"]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Item count and first item of an order, stored on the order row
+def _item_summary(items):
+    first = items[0].product
+    return {
+        "item_count": sum(item.quantity for item in items),
+        "first_item_name": first.name,
+        "first_item_image": first.image.name if first.image else None,
+    }
+
+
 # Order creation from Cart
-def create_order_from_cart(*, user, cart: Cart, cart_totals: dict):
-    if not cart.items.exists():
+def create_order_from_cart(*, user, cart: Cart, cart_totals: dict, idempotency_key=None):
+    items = cart_totals.get("items")
+    if items is None:
+        items = list(cart.items.select_related("product")) if cart else []
+    if not items:
         raise OrderCreationError("Cart is empty.")
     if cart_totals["grand_total"] <= Decimal("0.00"):
         raise OrderCreationError("Invalid order amount.")
 
-    # Reuse existing pending order
-    recent_order = (
+    # Reuse a pending order only when it was built from this exact cart
+    fingerprint = cart_fingerprint(items, cart_totals)
+    pending_order = (
         Order.objects
-        .filter(user=user, is_paid=False, payment_status="pending")
+        .filter(user=user, is_paid=False, payment_status="pending", cart_fingerprint=fingerprint)
         .order_by("-created_at")
         .first()
     )
-    if recent_order:
-        coupon_service.flush_coupon_session(request)
-        return recent_order
-    with transaction.atomic():
-        order = Order.objects.create(
-            user=user,
-            total_amount=cart_totals["grand_total"],
-            coupon=cart_totals.get("coupon"),
-            payment_status="pending",
-            is_paid=False,
-        )
-        OrderItem.objects.bulk_create([
-            OrderItem(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price,
+    if pending_order:
+        return pending_order
+    # Checkout persists the cached cart before the order is built from it
+    if cart_store_service.is_enabled():
+        cart_store_service.flush_cart(user.id)
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(
+                user=user,
+                total_amount=cart_totals["grand_total"],
+                coupon=cart_totals.get("coupon"),
+                payment_status="pending",
+                is_paid=False,
+                idempotency_key=idempotency_key,
+                cart_fingerprint=fingerprint,
+                **_item_summary(items),
             )
-            for item in cart.items.select_related("product")
-        ])
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    quantity=item.quantity,
+                    price=item.product.price,
+                )
+                for item in items
+            ])
+            try:
+                reservation_service.reserve_stock(order)
+            except reservation_service.StockReservationError as e:
+                raise OrderCreationError(str(e))
+            return order
+    except IntegrityError:
+        # A concurrent submission of the same form created the order first
+        order = get_order_for_key(user=user, idempotency_key=idempotency_key)
+        if order is None:
+            raise
         return order
 
 
-# Fetch all order for admin
-def get_all_orders_for_admin():
-    return (
-        Order.objects
-        .select_related("user", "coupon")
-        .prefetch_related(
-            Prefetch(
-                "items",
-                queryset=OrderItem.objects.select_related("product")
-            )
+# Payment statuses an order can have
+ORDER_STATUSES = ("pending", "paid", "cancelled", "expired", "refunding")
+
+# Columns of the admin order export
+ORDER_EXPORT_FIELDS = [
+    "id", "created_at", "customer_email", "customer_first_name", "customer_last_name", "payment_status", "is_paid",
+    "total_amount", "coupon", "item_count", "first_item_name",
+]
+
+ADMIN_ORDER_PAGE_SIZE = 50
+
+
+# Day from a YYYY-MM-DD query value, None when missing or invalid
+def _parse_day(value):
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+
+# Read the admin order filters from the query string
+def parse_admin_filters(params):
+    filters = {}
+    status = params.get("status")
+    if status in ORDER_STATUSES:
+        filters["status"] = status
+    paid = (params.get("paid") or "").lower()
+    if paid in ("yes", "no"):
+        filters["paid"] = paid == "yes"
+    for key in ("date_from", "date_to"):
+        day = _parse_day(params.get(key))
+        if day:
+            filters[key] = day
+    customer = (params.get("customer") or "").strip()
+    if customer:
+        filters["customer"] = customer
+    coupon = (params.get("coupon") or "").strip()
+    if coupon:
+        filters["coupon"] = coupon
+    return filters
+
+
+# Start of a day in the current time zone
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# Narrow an order queryset by the admin filters; each filter has a (column, created_at, id) index
+def apply_admin_filters(queryset, filters):
+    if "status" in filters:
+        queryset = queryset.filter(payment_status=filters["status"])
+    if "paid" in filters:
+        queryset = queryset.filter(is_paid=filters["paid"])
+    if "date_from" in filters:
+        queryset = queryset.filter(created_at__gte=_day_start(filters["date_from"]))
+    if "date_to" in filters:
+        queryset = queryset.filter(created_at__lt=_day_start(filters["date_to"] + timedelta(days=1)))
+    if "customer" in filters:
+        # A customer id or an exact email, so the unique email index finds the user
+        customer = filters["customer"]
+        if customer.isdigit():
+            queryset = queryset.filter(user_id=int(customer))
+        else:
+            queryset = queryset.filter(user__email=customer)
+    if "coupon" in filters:
+        queryset = queryset.filter(coupon__code__iexact=filters["coupon"])
+    return queryset
+
+
+# Fetch one keyset page of all orders for the admin console
+def get_admin_order_page(filters=None, after=None, before=None, page_size=None):
+    page_size = pagination_util.clamp_page_size(page_size, ADMIN_ORDER_PAGE_SIZE)
+    orders = apply_admin_filters(Order.objects.select_related("user", "coupon"), filters or {})
+    return pagination_util.keyset_paginate(orders, after=after, before=before, page_size=page_size)
+
+
+# Stream the filtered orders as CSV text chunks, newest first, reading rows in chunks
+def export_orders(filters=None, chunk_size=2000):
+    rows = (
+        apply_admin_filters(Order.objects.all(), filters or {})
+        .order_by("-created_at", "-id")
+        .values_list(
+            "id", "created_at", "user__email", "user__first_name", "user__last_name", "payment_status", "is_paid",
+            "total_amount", "coupon__code", "item_count", "first_item_name",
         )
-        .order_by("-created_at")
+        .iterator(chunk_size=chunk_size)
     )
+    return export_util.csv_lines(ORDER_EXPORT_FIELDS, rows)
 
 
 # Cancel the Order
 def cancel_order(*, order: Order, request):
     if order.is_paid:
         raise OrderCancelError("Paid orders cannot be cancelled.")
+    if order.payment_status == "refunding":
+        raise OrderCancelError("This order was charged and is being refunded.")
     with transaction.atomic():
+        reservation_service.release_reservation(order)
         order.payment_status = "cancelled"
         order.is_paid = False
         order.save(update_fields=["payment_status", "is_paid"])
@@ -82,17 +229,67 @@ def cancel_order(*, order: Order, request):
         request.session.modified = True
 
 
-# Get Order List 
+# Orders of a customer, newest first, read from the Order table alone
 def get_orders_for_user(*, user):
     return (
         Order.objects
         .filter(user=user)
-        .select_related("coupon", "payment")
-        .prefetch_related(
-            Prefetch(
-                "items",
-                queryset=OrderItem.objects.select_related("product")
-            )
-        )
-        .order_by("-created_at")
+        .select_related("coupon")
+        .order_by("-created_at", "-id")
+    )
+
+
+# Fetch one keyset page of a customer's orders
+def get_order_page(*, user, after=None, before=None, page_size=None):
+    page_size = pagination_util.clamp_page_size(page_size, settings.ORDER_PAGE_SIZE)
+    return pagination_util.keyset_paginate(
+        get_orders_for_user(user=user), after=after, before=before, page_size=page_size
     )
+
+
+# Items of one of a customer's orders, loaded when the order is expanded
+def get_order_items(*, user, order_id):
+    return list(
+        OrderItem.objects
+        .filter(order_id=order_id, order__user=user)
+        .select_related("product")
+        .order_by("id")
+    )
+
+
+# Fill the item summary of orders created before it existed, in order id batches
+def backfill_order_summaries(chunk_size=1000):
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Order.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return updated
+        last_id = ids[-1]
+        rows = (
+            OrderItem.objects
+            .filter(order_id__in=ids)
+            .values("order_id")
+            .annotate(item_count=Sum("quantity"), first_item_id=Min("id"))
+        )
+        counts = {row["order_id"]: row for row in rows}
+        first_items = {
+            item.order_id: item.product
+            for item in OrderItem.objects
+            .filter(id__in=[row["first_item_id"] for row in counts.values()])
+            .select_related("product")
+        }
+        orders = []
+        for order_id, row in counts.items():
+            product = first_items[order_id]
+            orders.append(Order(
+                id=order_id,
+                item_count=row["item_count"],
+                first_item_name=product.name,
+                first_item_image=product.image.name if product.image else None,
+            ))
+        with transaction.atomic():
+            Order.objects.bulk_update(orders, ["item_count", "first_item_name", "first_item_image"])
+        updated += len(orders)
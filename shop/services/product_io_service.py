@@ -0,0 +1,217 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from shop.models import Product, Category, MovementReason
+from shop.services import search_service, tag_service, product_service, inventory_service
+from shop.utils import slug_util, validation_utils, cache_util, export_util
+
+
+# Columns read by the importer and written by the exporter
+IMPORT_FIELDS = ["sku", "name", "description", "price", "stock", "category", "tags", "is_active"]
+EXPORT_FIELDS = ["id", "sku", "name", "description", "price", "stock", "category", "tags", "is_active", "created_at"]
+
+# Product columns overwritten when an imported SKU already exists. Stock is left out:
+# a file exported earlier would put back units reserved since, unless the admin asks
+# for overwrite_stock (e.g. after a stock count).
+UPDATE_FIELDS = ["name", "description", "price", "category", "tags", "is_active"]
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+# File format from an explicit choice or the file extension
+def detect_format(filename, explicit=None):
+    if explicit:
+        return explicit if explicit in IMPORT_FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return None
+
+
+# Yield (line number, raw row) pairs from a text stream without loading it
+def iter_rows(stream, fmt):
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {field: export_util.csv_import_value(value) for field, value in row.items()}
+        return
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+            continue
+        yield line_no, row if isinstance(row, dict) else ValueError("Expected a JSON object.")
+
+
+# Category lookup by lower-cased name and by id, loaded once per import
+def load_category_map():
+    categories = {}
+    for category_id, name in Category.objects.values_list("id", "name"):
+        categories[name.strip().lower()] = category_id
+        categories[str(category_id)] = category_id
+    return categories
+
+
+# Clean one raw row, returning (values, error message)
+def clean_row(raw, categories):
+    if isinstance(raw, Exception):
+        return None, f"Unreadable row: {raw}"
+    value = {field: raw.get(field) for field in IMPORT_FIELDS}
+    name = str(value["name"] or "").strip()
+    if not name:
+        return None, "Name is required."
+    if len(name) > 150:
+        return None, "Name is longer than 150 characters."
+    try:
+        price = Decimal(str(value["price"]).strip())
+        if price < 0 or price.as_tuple().exponent < -2 or price >= Decimal("100000000"):
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        return None, f"Invalid price {value['price']!r}."
+    try:
+        stock = int(str(value["stock"]).strip())
+        if stock < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return None, f"Invalid stock {value['stock']!r}."
+    category_id = categories.get(str(value["category"] or "").strip().lower())
+    if category_id is None:
+        return None, f"Unknown category {value['category']!r}."
+    tags = str(value["tags"] or "").strip()
+    if len(tags) > 255:
+        return None, "Tags are longer than 255 characters."
+    sku = str(value["sku"] or "").strip()
+    if len(sku) > 100:
+        return None, "SKU is longer than 100 characters."
+    is_active = value["is_active"]
+    return {
+        "sku": sku,
+        "name": name,
+        "description": str(value["description"] or ""),
+        "price": price,
+        "stock": stock,
+        "category_id": category_id,
+        "tags": tags,
+        "is_active": True if is_active in (None, "") else validation_utils.parse_boolean(is_active),
+    }, None
+
+
+# Write one validated batch as a single upsert keyed by SKU
+def _write_batch(rows, created_by, overwrite_stock=False):
+    keyed = [Product(created_by=created_by, **row) for _, row in rows if row["sku"]]
+    unkeyed = [Product(created_by=created_by, **row) for _, row in rows if not row["sku"]]
+    with transaction.atomic():
+        # Locked so the stock ledger sees the exact stock each row keeps or replaces
+        existing = {
+            sku: (product_id, stock)
+            for sku, product_id, stock in (
+                Product.objects
+                .select_for_update()
+                .filter(sku__in=[product.sku for product in keyed])
+                .order_by("id")
+                .values_list("sku", "id", "stock")
+            )
+        }
+        Product.objects.bulk_create(
+            keyed,
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=UPDATE_FIELDS + ["stock"] if overwrite_stock else UPDATE_FIELDS,
+        )
+        # Generated SKUs are plain inserts, so a racing writer can never be overwritten
+        slug_util.bulk_create_unique(
+            Product, unkeyed, "sku", [product.name for product in unkeyed]
+        )
+        products = keyed + unkeyed
+        for product in products:
+            if product.pk is None:
+                product.pk = existing[product.sku][0]
+            if product.sku in existing and not overwrite_stock:
+                product.stock = existing[product.sku][1]
+        search_service.refresh_search_vectors([product.pk for product in products])
+        tag_service.link_product_tags(products)
+        inventory_service.record_movements(
+            [
+                (
+                    product.pk,
+                    product.stock - (existing[product.sku][1] if product.sku in existing else 0),
+                    MovementReason.IMPORT,
+                    None,
+                )
+                for product in products
+            ],
+            user_id=created_by.id if created_by else None,
+        )
+    for sku, (product_id, _) in existing.items():
+        product_service.invalidate_product_cache(product_id, sku)
+    return len(products) - len(existing), len(existing)
+
+
+# Stream rows from a CSV or JSONL text stream into the catalog in batches
+def import_products(stream, fmt, created_by, batch_size=IMPORT_BATCH_SIZE, on_error=None, overwrite_stock=False):
+    result = {"created": 0, "updated": 0, "error_count": 0, "errors": []}
+    categories = load_category_map()
+
+    def report(line_no, message):
+        result["error_count"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append((line_no, message))
+        if on_error:
+            on_error(line_no, message)
+
+    def flush(batch):
+        try:
+            created, updated = _write_batch(batch, created_by, overwrite_stock)
+            result["created"] += created
+            result["updated"] += updated
+        except Exception as e:
+            for line_no, _ in batch:
+                report(line_no, f"Batch rejected: {e}")
+
+    batch = []
+    seen_skus = {}
+    for line_no, raw in iter_rows(stream, fmt):
+        row, error = clean_row(raw, categories)
+        if error:
+            report(line_no, error)
+            continue
+        if row["sku"]:
+            if row["sku"] in seen_skus:
+                report(line_no, f"Duplicate SKU {row['sku']!r} (first seen on line {seen_skus[row['sku']]}).")
+                continue
+            seen_skus[row["sku"]] = line_no
+        batch.append((line_no, row))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    if result["created"] or result["updated"]:
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
+    return result
+
+
+# Stream the catalog as CSV or JSONL text chunks, reading rows in primary-key chunks
+def export_products(fmt, chunk_size=2000, active_only=False):
+    products = Product.objects.order_by("id")
+    if active_only:
+        products = products.filter(is_active=True)
+    rows = products.values_list(
+        "id", "sku", "name", "description", "price", "stock",
+        "category__name", "tags", "is_active", "created_at",
+    ).iterator(chunk_size=chunk_size)
+
+    if fmt == "csv":
+        yield from export_util.csv_lines(EXPORT_FIELDS, rows)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, (export_util.export_value(value) for value in row)))) + "\n"
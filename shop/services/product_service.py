@@ -1,20 +1,25 @@
-from shop.models import Product
-from django.db.models import Q
+import copy
+import time
+import threading
+from collections import OrderedDict
+from shop.models import Product, MovementReason
+from django.core.cache import cache
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from shop.models import Category
 from user.models import User
-from shop.utils import slug_util,validation_utils
+from django.conf import settings
+from shop.utils import slug_util,validation_utils,pagination_util,cache_util
+from shop.services import search_service,facet_service,tag_service,inventory_service
 
 
 # Fetch all Products
 def get_all_products(active_only=True):
     try:
         if active_only:
-            products = Product.objects.filter(is_active=True).order_by('-created_at')
+            products = Product.objects.filter(is_active=True).order_by('-created_at', '-id')
         else:
-            products = Product.objects.all().order_by('-created_at')
-
-        print(f"[get_all_products] Retrieved {products.count()} products")
+            products = Product.objects.all().order_by('-created_at', '-id')
         return products
 
     except Exception as e:
@@ -22,13 +27,110 @@ def get_all_products(active_only=True):
         return []
 
 
+# Keyset ordering of each listing sort (both descending)
+PRODUCT_SORT_KEYS = {
+    "newest": ("created_at", "id"),
+    "rating": ("avg_rating", "id"),
+}
+
+
+# Fetch one keyset page of Products (newest or best rated first)
+def get_product_page(active_only=True, after=None, before=None, page_size=None, filters=None, sort="newest"):
+    page_size = pagination_util.clamp_page_size(page_size, settings.PRODUCT_PAGE_SIZE)
+    fields = PRODUCT_SORT_KEYS.get(sort, PRODUCT_SORT_KEYS["newest"])
+    products = Product.objects.select_related('category', 'created_by')
+    if active_only:
+        products = products.filter(is_active=True)
+    if filters:
+        products = facet_service.apply_filters(products, filters)
+    return pagination_util.keyset_paginate(products, after=after, before=before, page_size=page_size, fields=fields)
+
+
+# Facet counts for catalog browsing or a search
+def get_product_facets(filters=None, query=None):
+    if query:
+        products = search_service.rank_products(query)
+        cache_scope = None
+    else:
+        products = Product.objects.filter(is_active=True)
+        cache_scope = "active"
+    return facet_service.get_facet_counts(products, filters, cache_scope=cache_scope)
+
+
+# Product cache tuning: a small per-process LRU in front of the shared cache.
+# The local tier cannot be invalidated across processes, so it keeps a short TTL.
+# The second tier is only shared when CACHE_URL points at a shared cache; on the
+# default locmem cache its entries are capped by cache_util.shared_timeout too.
+PRODUCT_LOCAL_CACHE_SIZE = 512
+PRODUCT_LOCAL_CACHE_TIMEOUT = 30
+PRODUCT_CACHE_TIMEOUT = 300
+
+_local_products = OrderedDict()
+_local_lock = threading.Lock()
+
+
+# Shared cache keys of a product entry
+def _product_key(product_id):
+    return f"product:id:{product_id}"
+
+
+def _sku_key(sku):
+    return f"product:sku:{sku}"
+
+
+# Read an entry of the in-process LRU
+def _local_get(key):
+    with _local_lock:
+        entry = _local_products.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _local_products[key]
+            return None
+        _local_products.move_to_end(key)
+        return value
+
+
+# Store an entry in the in-process LRU, evicting the least recently used
+def _local_set(key, value):
+    with _local_lock:
+        _local_products[key] = (time.monotonic() + PRODUCT_LOCAL_CACHE_TIMEOUT, value)
+        _local_products.move_to_end(key)
+        while len(_local_products) > PRODUCT_LOCAL_CACHE_SIZE:
+            _local_products.popitem(last=False)
+
+
+# Load a product through the local and shared tiers, falling back to the database
+def _load_product(product_id):
+    key = _product_key(product_id)
+    product = _local_get(key)
+    if product is None:
+        product = cache.get(key)
+        if product is None:
+            product = Product.objects.select_related('category').get(id=product_id)
+            cache.set(key, product, cache_util.shared_timeout(PRODUCT_CACHE_TIMEOUT))
+        _local_set(key, product)
+    # Callers get their own copy so the cached instance is never mutated
+    return copy.copy(product)
+
+
+# Drop the cached entries of a product (after edits, deletes and stock changes)
+def invalidate_product_cache(product_id, sku=None):
+    keys = [_product_key(product_id)]
+    if sku:
+        keys.append(_sku_key(sku))
+    cache.delete_many(keys)
+    with _local_lock:
+        for key in keys:
+            _local_products.pop(key, None)
+
+
 # Fetch Products By ID
 def get_product_by_id(product_id):
     try:
-        product = Product.objects.get(id=product_id)
-        print(f"[get_product_by_id] Found product {product.id} - {product.name}")
-        return product
-    except ObjectDoesNotExist:
+        return _load_product(int(product_id))
+    except (ObjectDoesNotExist, TypeError, ValueError):
         print(f"[get_product_by_id] Product with ID {product_id} not found.")
         return None
     except Exception as e:
@@ -36,6 +138,31 @@ def get_product_by_id(product_id):
         return None
 
 
+# Fetch Products By SKU
+def get_product_by_sku(sku, active_only=True):
+    try:
+        key = _sku_key(sku)
+        product_id = _local_get(key) or cache.get(key)
+        if product_id is None:
+            product_id = Product.objects.values_list('id', flat=True).get(sku=sku)
+            cache.set(key, product_id, cache_util.shared_timeout(PRODUCT_CACHE_TIMEOUT))
+        _local_set(key, product_id)
+        product = _load_product(product_id)
+        # A renamed product keeps its old SKU entry until it expires
+        if product.sku != sku:
+            invalidate_product_cache(product_id, sku)
+            return get_product_by_sku(sku, active_only)
+        if active_only and not product.is_active:
+            return None
+        return product
+    except ObjectDoesNotExist:
+        print(f"[get_product_by_sku] Product with SKU {sku} not found.")
+        return None
+    except Exception as e:
+        print(f"[get_product_by_sku] Error retrieving product {sku}: {e}")
+        return None
+
+
 
 # Create a new Product
 def create_product(data, request, files=None):
@@ -48,20 +175,25 @@ def create_product(data, request, files=None):
         created_by = User.objects.get(id=user_id)
         provided_sku = data.get('sku')
         name = data.get('name')
-        sku = slug_util.generate_unique_skg(Product, name, provided_sku)
         is_active = validation_utils.parse_boolean(data.get('is_active'))
-        product = Product.objects.create(
+        product = slug_util.create_unique(
+            Product, 'sku', name, provided_sku,
             category=category,
             name=name,
             description=data.get('description'),
             price=data.get('price'),
             stock=data.get('stock'),
             image=files.get('image') if files else None,
-            sku=sku,
             tags=data.get('tags', ''),
             is_active=is_active, 
             created_by=created_by
         )
+        inventory_service.record_movement(
+            product.id, int(product.stock), MovementReason.CREATED, user_id=created_by.id
+        )
+        search_service.refresh_product_search_vector(product)
+        tag_service.sync_product_tags(product)
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         print(f"[create_product] Created product {product.id} with is_active={product.is_active}")
         return product
         
@@ -75,35 +207,59 @@ def create_product(data, request, files=None):
         print(f"Error creating product: {e}")
         return None
 
+# Stock after an admin edit. The form posts the stock it showed as original_stock,
+# so the edit is applied as a change on top of the locked row: units reserved or
+# released since the form was rendered are kept instead of being written back.
+def _edited_stock(current, new, original=None):
+    if new in (None, ""):
+        return current
+    if original in (None, ""):
+        return int(new)
+    stock = current + int(new) - int(original)
+    if stock < 0:
+        raise ValueError(f"Stock changed to {current} since the form was opened; {new} would leave {stock}.")
+    return stock
+
+
 # Update the existing Product
 def update_product(product_id, data, request, files=None):
     try:
-        product = Product.objects.get(id=product_id)
-        product.name = data.get('name', product.name)
-        product.description = data.get('description', product.description)
-        product.price = data.get('price', product.price)
-        product.stock = data.get('stock', product.stock)
-        product.tags = data.get('tags', product.tags)
-        product.is_active = validation_utils.parse_boolean(data.get('is_active'))
-        print(f"[update_product] Setting is_active to {product.is_active} (raw value: {data.get('is_active')})")
-        new_sku_input = data.get('sku')
-        new_name_input = data.get('name')
-        if new_sku_input or (new_name_input and new_name_input != product.name):
-            product.sku = slug_util.generate_unique_skg(Product, new_name_input or product.name, new_sku_input)
-        if 'category' in data:
-            try:
-                product.category = Category.objects.get(id=data.get('category'))
-            except Category.DoesNotExist:
-                print(f"Category with ID {data.get('category')} not found. Keeping existing category.")
-        if files and files.get('image'):
-            product.image = files.get('image')
-        user_id = request.session.get('user_id')
-        if user_id:
-            try:
-                product.updated_by = User.objects.get(id=user_id)
-            except User.DoesNotExist:
-                print(f"User with ID {user_id} not found. Skipping updated_by.")
-        product.save()
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(id=product_id)
+            old_sku = product.sku
+            old_stock = product.stock
+            product.name = data.get('name', product.name)
+            product.description = data.get('description', product.description)
+            product.price = data.get('price', product.price)
+            product.stock = _edited_stock(old_stock, data.get('stock'), data.get('original_stock'))
+            product.tags = data.get('tags', product.tags)
+            product.is_active = validation_utils.parse_boolean(data.get('is_active'))
+            print(f"[update_product] Setting is_active to {product.is_active} (raw value: {data.get('is_active')})")
+            new_sku_input = data.get('sku')
+            new_name_input = data.get('name')
+            if new_sku_input or (new_name_input and new_name_input != product.name):
+                product.sku = slug_util.generate_unique_skg(Product, new_name_input or product.name, new_sku_input, exclude_pk=product.pk)
+            if 'category' in data:
+                try:
+                    product.category = Category.objects.get(id=data.get('category'))
+                except Category.DoesNotExist:
+                    print(f"Category with ID {data.get('category')} not found. Keeping existing category.")
+            if files and files.get('image'):
+                product.image = files.get('image')
+            user_id = request.session.get('user_id')
+            if user_id:
+                try:
+                    product.updated_by = User.objects.get(id=user_id)
+                except User.DoesNotExist:
+                    print(f"User with ID {user_id} not found. Skipping updated_by.")
+            product.save()
+            inventory_service.record_movement(
+                product.id, int(product.stock) - old_stock, MovementReason.ADJUSTMENT, user_id=user_id
+            )
+        search_service.refresh_product_search_vector(product)
+        tag_service.sync_product_tags(product)
+        invalidate_product_cache(product.id, old_sku)
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         print(f"[update_product] Updated product {product.id}, is_active={product.is_active}")
         return product
     except Product.DoesNotExist:
@@ -118,6 +274,8 @@ def delete_product(product_id):
     try:
         product = Product.objects.get(id=product_id)
         product.delete()
+        invalidate_product_cache(product_id, product.sku)
+        cache_util.bump_cache_version(cache_util.CATALOG_NAMESPACE)
         return True
     except ObjectDoesNotExist:
         print(f"Product with ID {product_id} not found.")
@@ -128,28 +286,16 @@ def delete_product(product_id):
 
 
 # Search for Products
-def search_products(query):
+def search_products(query, sort="manual", filters=None):
     try:
         if not query or query.strip() == "":
             return Product.objects.none()
-        products = (
-            Product.objects.filter(
-                Q(name__icontains=query)
-                | Q(description__icontains=query)
-                | Q(tags__icontains=query)
-                | Q(category__name__icontains=query)
-                | Q(sku__icontains=query)
-            )
-            .filter(is_active=True)
-            .select_related("category", "created_by")
-            .order_by("-created_at")
-        )
-        print(f"[search_products] Found {products.count()} results for '{query}'")
+        products = search_service.rank_products(query.strip(), sort=sort)
+        if filters:
+            products = facet_service.apply_filters(products, filters)
+        print(f"[search_products] Searching '{query}' (sort={sort})")
         return products
 
     except Exception as e:
         print(f"[search_products] Error: {e}")
         return Product.objects.none()
-
-
-
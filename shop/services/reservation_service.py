@@ -0,0 +1,165 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from shop.models import MovementReason, Order, OrderItem, Product, StockReservation, ReservationStatus
+from shop.services import inventory_service, product_service
+
+
+RELEASE_BATCH_SIZE = 500
+
+
+# Reservation Error Handle
+class StockReservationError(Exception):
+    pass
+
+
+# Expiry of a reservation made now
+def reservation_deadline():
+    return timezone.now() + timedelta(minutes=getattr(settings, "STOCK_RESERVATION_MINUTES", 15))
+
+
+# Quantity per order and product of some orders, sorted by product id (the lock order)
+def _order_quantities(order_ids):
+    return list(
+        OrderItem.objects
+        .filter(order_id__in=order_ids)
+        .values("order_id", "product_id")
+        .annotate(quantity=Sum("quantity"))
+        .order_by("product_id", "order_id")
+        .values_list("order_id", "product_id", "quantity")
+    )
+
+
+# Quantity per product of order lines, keeping the product id order
+def _product_totals(lines):
+    totals = {}
+    for _, product_id, quantity in lines:
+        totals[product_id] = totals.get(product_id, 0) + quantity
+    return totals
+
+
+# Product cache entries still hold the old stock after a commit
+def _invalidate_stock(product_ids):
+    def invalidate():
+        for product_id in product_ids:
+            product_service.invalidate_product_cache(product_id)
+    transaction.on_commit(invalidate)
+
+
+# Take the stock of an order's items, one conditional UPDATE per product in product id order.
+# Product.stock stays the source of availability: every reservation still updates (and row-locks)
+# the product, so checkouts of the same product queue on that row as before the ledger existed.
+# The InventoryMovement rows are an audit trail written alongside, not a replacement counter.
+def _take_stock(order):
+    lines = _order_quantities([order.id])
+    totals = _product_totals(lines)
+    for product_id, quantity in totals.items():
+        taken = Product.objects.filter(
+            id=product_id, is_active=True, stock__gte=quantity
+        ).update(stock=F("stock") - quantity)
+        if not taken:
+            name = Product.objects.filter(id=product_id).values_list("name", flat=True).first()
+            raise StockReservationError(f"Not enough stock for {name or 'a product in your cart'}.")
+    inventory_service.record_movements(
+        (product_id, -quantity, MovementReason.RESERVATION, order_id)
+        for order_id, product_id, quantity in lines
+    )
+    _invalidate_stock(list(totals))
+
+
+# Put the stock of some orders back, one UPDATE per product in product id order
+def _return_stock(order_ids, reason):
+    lines = _order_quantities(order_ids)
+    totals = _product_totals(lines)
+    for product_id, quantity in totals.items():
+        Product.objects.filter(id=product_id).update(stock=F("stock") + quantity)
+    inventory_service.record_movements(
+        (product_id, quantity, reason, order_id)
+        for order_id, product_id, quantity in lines
+    )
+    _invalidate_stock(list(totals))
+
+
+# Reserve the stock of a new order; must run inside the order's transaction
+def reserve_stock(order):
+    _take_stock(order)
+    return StockReservation.objects.create(order=order, expires_at=reservation_deadline())
+
+
+# Make sure an unpaid order holds its stock for a fresh window, taking it again after a release
+def ensure_reservation(order):
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_for_update().filter(order=order).first()
+        if reservation and reservation.status == ReservationStatus.COMMITTED:
+            return reservation
+        if reservation and reservation.status == ReservationStatus.HELD:
+            reservation.expires_at = reservation_deadline()
+            reservation.save(update_fields=["expires_at"])
+            return reservation
+        _take_stock(order)
+        reservation, _ = StockReservation.objects.update_or_create(
+            order=order,
+            defaults={"status": ReservationStatus.HELD, "expires_at": reservation_deadline(), "released_at": None},
+        )
+        return reservation
+
+
+# Keep the stock of a paid order for good, taking it again if the sweeper released it meanwhile
+def commit_reservation(order):
+    committed = StockReservation.objects.filter(
+        order=order, status=ReservationStatus.HELD
+    ).update(status=ReservationStatus.COMMITTED)
+    if committed:
+        return True
+    try:
+        reservation = ensure_reservation(order)
+    except StockReservationError as e:
+        print(f"commit_reservation: Order {order.id} was paid without stock: {e}")
+        return False
+    if reservation.status == ReservationStatus.COMMITTED:
+        return True
+    return bool(StockReservation.objects.filter(
+        id=reservation.id, status=ReservationStatus.HELD
+    ).update(status=ReservationStatus.COMMITTED))
+
+
+# Give back the stock of one unpaid order when it is cancelled
+def release_reservation(order):
+    with transaction.atomic(savepoint=False):
+        released = StockReservation.objects.filter(
+            order=order, status=ReservationStatus.HELD
+        ).update(status=ReservationStatus.RELEASED, released_at=timezone.now())
+        if released:
+            _return_stock([order.id], MovementReason.CANCELLATION)
+        return bool(released)
+
+
+# Release expired reservations in batches; returns the number of orders released
+def release_expired_reservations(batch_size=RELEASE_BATCH_SIZE, now=None):
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=ReservationStatus.HELD, expires_at__lte=now)
+                .order_by("id")
+                .values_list("id", "order_id")[:batch_size]
+            )
+            if not reservations:
+                return released
+            order_ids = [order_id for _, order_id in reservations]
+            StockReservation.objects.filter(
+                id__in=[reservation_id for reservation_id, _ in reservations]
+            ).update(status=ReservationStatus.RELEASED, released_at=now)
+            _return_stock(order_ids, MovementReason.RELEASE)
+            # Unpaid orders that lost their stock are no longer reused at checkout
+            Order.objects.filter(
+                id__in=order_ids, is_paid=False, payment_status="pending"
+            ).update(payment_status="expired")
+        released += len(reservations)
+        if len(reservations) < batch_size:
+            return released
@@ -1,5 +1,8 @@
+from decimal import Decimal, ROUND_HALF_UP
 from django.db import transaction
+from django.db.models import Count, Q
 from shop.models import Review, Product
+from shop.services import product_service
 from constants import Role
 
 
@@ -13,20 +16,60 @@ def get_product_reviews(product_id):
     return Review.objects.filter(product_id=product_id).select_related("user").order_by("-created_at")
 
 
+# Load the reviews of a product once and pick the user's own review from them
+def get_reviews_with_user_review(product_id, user=None):
+    reviews = list(get_product_reviews(product_id))
+    user_id = getattr(user, "id", None)
+    user_review = next((review for review in reviews if user_id and review.user_id == user_id), None)
+    return reviews, user_review
+
+
+# Rating aggregate columns stored on Product
+RATING_FIELDS = ["avg_rating", "review_count"] + [f"rating_count_{stars}" for stars in range(1, 6)]
+
+
+# Average rating derived from the stored star histogram
+def compute_average(counts):
+    total = sum(counts.values())
+    if not total:
+        return Decimal("0.00")
+    weighted = sum(stars * count for stars, count in counts.items())
+    return (Decimal(weighted) / Decimal(total)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+# Apply a rating change to the locked product row
+def _apply_rating_delta(product, added=None, removed=None):
+    for stars, delta in ((removed, -1), (added, 1)):
+        if stars is None:
+            continue
+        field = f"rating_count_{int(stars)}"
+        setattr(product, field, max(0, getattr(product, field) + delta))
+    counts = {stars: getattr(product, f"rating_count_{stars}") for stars in range(1, 6)}
+    product.review_count = sum(counts.values())
+    product.avg_rating = compute_average(counts)
+    product.save(update_fields=RATING_FIELDS)
+    transaction.on_commit(lambda: product_service.invalidate_product_cache(product.pk))
+
+
 # Create or update a review
 def create_or_update_review(user, product_id, rating, comment):
     if not _is_customer(user):
         return None
-    try:
-        product = Product.objects.get(pk=product_id)
-    except Product.DoesNotExist:
-        return None
     with transaction.atomic():
+        try:
+            product = Product.objects.select_for_update().only("id", *RATING_FIELDS).get(pk=product_id)
+        except Product.DoesNotExist:
+            return None
+        previous = Review.objects.filter(user=user, product=product).values_list("rating", flat=True).first()
         review, created = Review.objects.update_or_create(
             user=user,
             product=product,
             defaults={"rating": rating, "comment": comment}
         )
+        if created:
+            _apply_rating_delta(product, added=rating)
+        elif previous != int(rating):
+            _apply_rating_delta(product, added=rating, removed=previous)
         return review
 
 
@@ -34,12 +77,47 @@ def create_or_update_review(user, product_id, rating, comment):
 def delete_review(user, product_id):
     print(f"🧩 delete_review() called for user={user.id}, product={product_id}")
     try:
-        review = Review.objects.get(user=user, product_id=product_id)
-        review.delete()
+        with transaction.atomic():
+            product = Product.objects.select_for_update().only("id", *RATING_FIELDS).get(pk=product_id)
+            review = Review.objects.get(user=user, product=product)
+            rating = review.rating
+            review.delete()
+            _apply_rating_delta(product, removed=rating)
         return True
-    except Review.DoesNotExist:
+    except (Review.DoesNotExist, Product.DoesNotExist):
         print("Product review deleting fail")
         return False
     except Exception as e:
         return False
 
+
+# Recompute the rating aggregates of every product in primary-key chunks
+def rebuild_rating_aggregates(chunk_size=1000):
+    updated = 0
+    last_id = 0
+    histogram = {f"rating_count_{stars}": Count("id", filter=Q(rating=stars)) for stars in range(1, 6)}
+    while True:
+        ids = list(
+            Product.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        rows = {
+            row["product_id"]: row
+            for row in Review.objects.filter(product_id__in=ids).values("product_id").annotate(**histogram)
+        }
+        products = []
+        for product_id in ids:
+            row = rows.get(product_id, {})
+            product = Product(id=product_id)
+            counts = {stars: row.get(f"rating_count_{stars}", 0) for stars in range(1, 6)}
+            for stars, count in counts.items():
+                setattr(product, f"rating_count_{stars}", count)
+            product.review_count = sum(counts.values())
+            product.avg_rating = compute_average(counts)
+            products.append(product)
+        with transaction.atomic():
+            Product.objects.bulk_update(products, RATING_FIELDS)
+        updated += len(products)
+        last_id = ids[-1]
+    return updated
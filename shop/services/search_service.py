@@ -0,0 +1,210 @@
+import re
+import difflib
+from hashlib import md5
+from itertools import chain
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity, TrigramWordSimilarity,
+)
+from shop.models import Product, Category, Tag
+from shop.utils import cache_util
+
+
+# Text search configuration shared by the stored vectors and the queries
+SEARCH_CONFIG = "english"
+
+# Ordering applied on top of the rank for each search filter
+SEARCH_ORDERING = {
+    "manual": ("-rank", "-created_at"),
+    "cheap": ("price", "-rank"),
+    "expensive": ("-price", "-rank"),
+    "rating": ("-avg_rating", "-review_count", "-rank"),
+}
+
+
+# Maximum number of ranked results rendered on the search page
+SEARCH_RESULT_LIMIT = 60
+
+# Autocomplete tuning
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_CACHE_TIMEOUT = 300
+SPELLING_MAX_TERMS = 4
+SPELLING_CANDIDATE_LIMIT = 5
+
+
+# Weighted vector for a product row (name/sku > tags > category > description)
+def build_search_vector(category_name):
+    return (
+        SearchVector("name", "sku", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("tags", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Value(category_name or ""), weight="C", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+# Build a prefix-matching tsquery from the raw user input
+def build_search_query(query):
+    terms = re.findall(r"\w+", (query or "").lower())
+    if not terms:
+        return None
+    raw = " & ".join(f"{term}:*" for term in terms)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+# Refresh the stored vector of a single product
+def refresh_product_search_vector(product):
+    category_name = product.category.name if product.category_id else ""
+    return Product.objects.filter(pk=product.pk).update(
+        search_vector=build_search_vector(category_name)
+    )
+
+
+# Refresh the stored vectors of many products, one UPDATE per category
+def refresh_search_vectors(product_ids):
+    rows = (
+        Product.objects
+        .filter(id__in=product_ids)
+        .values_list("category_id", "category__name")
+        .distinct()
+    )
+    updated = 0
+    for category_id, category_name in rows:
+        updated += Product.objects.filter(id__in=product_ids, category_id=category_id).update(
+            search_vector=build_search_vector(category_name)
+        )
+    return updated
+
+
+# Refresh the stored vectors of every product in a category
+def refresh_category_search_vectors(category):
+    return Product.objects.filter(category_id=category.id).update(
+        search_vector=build_search_vector(category.name)
+    )
+
+
+# Backfill the stored vectors in primary-key chunks
+def rebuild_search_vectors(chunk_size=1000):
+    updated = 0
+    for category in Category.objects.only("id", "name").order_by("id").iterator():
+        last_id = 0
+        while True:
+            ids = list(
+                Product.objects
+                .filter(category_id=category.id, id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Product.objects.filter(id__in=ids).update(
+                    search_vector=build_search_vector(category.name)
+                )
+            last_id = ids[-1]
+    return updated
+
+
+# Ranked full-text search over active products
+def rank_products(query, sort="manual"):
+    search_query = build_search_query(query)
+    if search_query is None:
+        return Product.objects.none()
+    ordering = SEARCH_ORDERING.get(sort, SEARCH_ORDERING["manual"])
+    return (
+        Product.objects
+        .filter(is_active=True, search_vector=search_query)
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .select_related("category")
+        .order_by(*ordering)
+    )
+
+
+# Normalize the search box input used as the suggestion cache key
+def normalize_prefix(prefix):
+    return re.sub(r"\s+", " ", (prefix or "").strip().lower())
+
+
+# Catalog words close to one term, read from a few rows found through the trigram indexes
+def _spelling_candidates(term):
+    names = (
+        Product.objects
+        .filter(is_active=True, name__trigram_word_similar=term)
+        .annotate(score=TrigramWordSimilarity(term, "name"))
+        .order_by("-score")
+        .values_list("name", flat=True)[:SPELLING_CANDIDATE_LIMIT]
+    )
+    tags = (
+        Tag.objects
+        .filter(name__trigram_similar=term)
+        .annotate(score=TrigramSimilarity("name", term))
+        .order_by("-score")
+        .values_list("name", flat=True)[:SPELLING_CANDIDATE_LIMIT]
+    )
+    words = set()
+    for text in chain(names, tags):
+        words.update(re.findall(r"[a-z0-9]{3,}", text.lower()))
+    return words
+
+
+# Spelling correction of each input term against the closest catalog words
+def did_you_mean(prefix):
+    terms = prefix.split()
+    if not terms:
+        return None
+    corrected = []
+    for position, term in enumerate(terms):
+        if position >= SPELLING_MAX_TERMS or len(term) < 3:
+            corrected.append(term)
+            continue
+        matches = difflib.get_close_matches(term, _spelling_candidates(term), n=1, cutoff=0.75)
+        corrected.append(matches[0] if matches else term)
+    suggestion = " ".join(corrected)
+    return suggestion if suggestion != prefix else None
+
+
+# Typo-tolerant autocomplete backed by the trigram indexes
+def suggest(prefix, limit=8):
+    prefix = normalize_prefix(prefix)
+    limit = max(1, min(int(limit), SUGGEST_MAX_LIMIT))
+    if len(prefix) < SUGGEST_MIN_LENGTH:
+        return {"query": prefix, "products": [], "categories": [], "did_you_mean": None}
+    cache_key = cache_util.versioned_key(
+        cache_util.CATALOG_NAMESPACE, "suggest", limit, md5(prefix.encode()).hexdigest()
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    products = list(
+        Product.objects
+        .filter(is_active=True)
+        .filter(Q(name__trigram_word_similar=prefix) | Q(sku__trigram_word_similar=prefix))
+        .annotate(score=Greatest(
+            TrigramWordSimilarity(prefix, "name"),
+            TrigramWordSimilarity(prefix, "sku"),
+        ))
+        .order_by("-score", "name")
+        .values("id", "name", "sku", "price", "score")[:limit]
+    )
+    categories = list(
+        Category.objects
+        .filter(name__trigram_word_similar=prefix)
+        .annotate(score=TrigramWordSimilarity(prefix, "name"))
+        .order_by("-score", "name")
+        .values("id", "name", "slug")[:3]
+    )
+    for product in products:
+        product["price"] = str(product["price"])
+        product["score"] = round(product["score"], 3)
+    exact = any(product["name"].lower().startswith(prefix) for product in products)
+    result = {
+        "query": prefix,
+        "products": products,
+        "categories": categories,
+        "did_you_mean": None if exact else did_you_mean(prefix),
+    }
+    cache.set(cache_key, result, cache_util.shared_timeout(SUGGEST_CACHE_TIMEOUT))
+    return result
@@ -10,9 +10,14 @@ from django.core.exceptions import ValidationError
 
 
 # Fetch all shipment details for customer
-def get_shipment():
+def get_shipment(user):
     try:
-        return Shipment.objects.all()
+        return (
+            Shipment.objects
+            .filter(customer=user)
+            .select_related("assigned_staff")
+            .order_by("-created_at")
+        )
     except ValueError:
         print("Shipment was invalid")
 
@@ -52,7 +57,7 @@ def generate_unique_tracking_number():
 def assign_staff_to_shipment(*, shipment: Shipment, staff_user):
     if staff_user.role != Role.ENDUSER_STAFF:
         raise ValueError("Only staff users can be assigned.")
-    if shipment.assigned_staff:
+    if shipment.assigned_staff_id:
         raise ValueError("Shipment already assigned.")
     shipment.assigned_staff = staff_user
     shipment.tracking_number = generate_unique_tracking_number()
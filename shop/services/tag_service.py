@@ -0,0 +1,102 @@
+import re
+from hashlib import md5
+from django.db import transaction
+from django.db.models import Count
+from django.utils.text import slugify
+from shop.models import Product, Tag, ProductTag
+
+
+# Longest tag name stored in the Tag table
+TAG_MAX_LENGTH = 50
+
+
+# Normalize one tag name (lower case, single spaces)
+def normalize_tag(name):
+    return re.sub(r"\s+", " ", (name or "").strip().lower())[:TAG_MAX_LENGTH].strip()
+
+
+# Split the comma separated tags input into unique normalized names, keeping their order
+def split_tags(raw):
+    names = []
+    for part in (raw or "").split(","):
+        name = normalize_tag(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+# Deterministic URL slug of a tag name, suffixed when slugify would drop characters
+def tag_slug(name):
+    base = slugify(name)
+    if base == name:
+        return base
+    return f"{base or 'tag'}-{md5(name.encode()).hexdigest()[:6]}"
+
+
+# Fetch the Tag rows of the given names, creating the missing ones in one insert
+def get_or_create_tags(names):
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=tag_slug(name)) for name in names],
+        ignore_conflicts=True,
+    )
+    return {tag.name: tag.id for tag in Tag.objects.filter(name__in=names).only("id", "name")}
+
+
+# Replace the tag links of several products from their tags strings
+def link_product_tags(products):
+    names_by_product = {product.id: split_tags(product.tags) for product in products}
+    tag_ids = get_or_create_tags(sorted({name for names in names_by_product.values() for name in names}))
+    ProductTag.objects.filter(product_id__in=list(names_by_product)).delete()
+    links = ProductTag.objects.bulk_create(
+        [
+            ProductTag(product_id=product_id, tag_id=tag_ids[name])
+            for product_id, names in names_by_product.items()
+            for name in names
+        ],
+        ignore_conflicts=True,
+    )
+    return len(links)
+
+
+# Sync the tag links of a single product after it was saved
+def sync_product_tags(product):
+    with transaction.atomic():
+        return link_product_tags([product])
+
+
+# Backfill the tag links of every product in primary-key chunks
+def rebuild_product_tags(chunk_size=1000):
+    linked = 0
+    last_id = 0
+    while True:
+        products = list(
+            Product.objects
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "tags")[:chunk_size]
+        )
+        if not products:
+            break
+        with transaction.atomic():
+            linked += link_product_tags(products)
+        last_id = products[-1].id
+    return linked
+
+
+# Fetch a Tag by its slug
+def get_tag_by_slug(slug):
+    return Tag.objects.filter(slug=slug).first()
+
+
+# Most used tags of a product queryset, counted on the link table
+def count_tags(queryset, limit):
+    rows = (
+        ProductTag.objects
+        .filter(product_id__in=queryset.order_by().values("id"))
+        .values("tag__name", "tag__slug")
+        .annotate(count=Count("product_id"))
+        .order_by("-count", "tag__name")[:limit]
+    )
+    return [{"name": row["tag__name"], "slug": row["tag__slug"], "count": row["count"]} for row in rows]
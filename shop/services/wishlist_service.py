@@ -1,7 +1,7 @@
 from django.db import transaction, IntegrityError
-from shop.models import Wishlist, Product
+from shop.models import Wishlist
 from constants import Role
-from shop.services import cart_service
+from shop.services import cart_service, product_service
 
 # Check if user is a customer
 def _is_customer(user) -> bool:
@@ -12,16 +12,15 @@ def _is_customer(user) -> bool:
 def get_user_wishlist(user):
     if not _is_customer(user):
         return Wishlist.objects.none()
-    return Wishlist.objects.filter(user=user).select_related("product").order_by("-added_at")
+    return Wishlist.objects.filter(user=user).select_related("product__category").order_by("-added_at")
 
 
 # Add a product to the wishlist
 def add_to_wishlist(user, product_id):
     if not _is_customer(user):
         return None
-    try:
-        product = Product.objects.get(pk=product_id)
-    except Product.DoesNotExist:
+    product = product_service.get_product_by_id(product_id)
+    if not product:
         return None
     try:
         with transaction.atomic():
@@ -48,19 +47,17 @@ def is_product_in_wishlist(user, product_id):
 
 # Get the specific product
 def get_product(product_id):
-    try:
-        return Product.objects.filter(pk=product_id).first()
-    except Product.DoesNotExist:
+    product = product_service.get_product_by_id(product_id)
+    if not product:
         print("Product was not found")
+    return product
 
 
 # Move item from Wishlist to Cart
 def move_to_cart(user, product_id):
     if not _is_customer(user):
         return False
-    try:
-        product = Product.objects.get(pk=product_id)
-    except Product.DoesNotExist:
+    if not product_service.get_product_by_id(product_id):
         print(f"move_to_cart: Product {product_id} does not exist.")
         return False
     try:
@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from shop.services import image_service
+
+register = template.Library()
+
+
+# Layout widths handed to the browser for each derivative size
+IMAGE_SIZES = {
+    "thumb": "160px",
+    "card": "(min-width: 992px) 25vw, (min-width: 576px) 50vw, 100vw",
+    "detail": "(min-width: 992px) 50vw, 100vw",
+}
+
+
+# <picture> with WebP and JPEG srcsets, or a plain <img> until the derivatives exist
+@register.simple_tag
+def picture(image, variants, size="card", **attrs):
+    if not image:
+        return ""
+    variants = image_service.current_variants(image, variants)
+    src = image_service.variant_url(image, variants, size, "jpeg")
+    attrs.setdefault("loading", "lazy")
+    attributes = format_html_join(" ", '{}="{}"', sorted(attrs.items()))
+    if not variants:
+        return format_html('<img src="{}" {}>', src, attributes)
+    sizes = IMAGE_SIZES.get(size, IMAGE_SIZES["card"])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        image_service.build_srcset(variants, "webp"), sizes,
+        src, image_service.build_srcset(variants, "jpeg"), sizes, attributes,
+    )
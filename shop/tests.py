@@ -1,3 +1,1228 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipIf
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from constants.enums import Role
+from payment.models import Payment, PaymentStatus
+from shop.models import (
+    Cart, CartItem, Category, Coupon, CouponAssignment, InventoryMovement, InventorySnapshot, MovementReason,
+    Order, OrderItem, Product,
+    ReservationStatus, Review, Shipment, ShipmentStatus, StockReservation, Wishlist,
+)
+from shop.services import (
+    cart_service, cart_store_service, checkout_service, coupon_service, inventory_service, order_service,
+    product_io_service, product_service, reservation_service, review_service, search_service, tag_service,
+)
+from shop.utils import cache_util, guest_cart_util, pagination_util, slug_util
+from user.models import Address, User
+from user.models.otp_model import EmailOTP
 
-# Create your tests here.
+
+# Verified user of the given role
+def create_user(email, role):
+    user = User.objects.create(
+        email=email, first_name=email.split("@")[0].title(), last_name="Tester",
+        dob=datetime.date(1995, 5, 5), role=role,
+    )
+    user.set_password("secret-pass-123")
+    user.save(update_fields=["password"])
+    EmailOTP.objects.create(user=user, code="123456", is_verified=True)
+    return user
+
+
+# A small but complete store: every list holds several rows so N+1 queries show up
+def seed_store(product_count=12, order_count=3):
+    admin = create_user("admin@example.com", Role.ADMIN)
+    customer = create_user("customer@example.com", Role.ENDUSER_CUSTOMER)
+    staff = create_user("staff@example.com", Role.ENDUSER_STAFF)
+    for user in (customer, staff):
+        Address.objects.create(
+            user=user, address_line1="1 Main Street", city="Pune", state="MH",
+            postal_code="411001", country="India", is_default=True,
+        )
+    categories = [
+        Category.objects.create(name=name, slug=name.lower(), description=name)
+        for name in ("Phones", "Laptops")
+    ]
+    products = [
+        Product.objects.create(
+            name=f"Product {i}", sku=f"sku-{i}", description="Description", price=Decimal("100.00") + i,
+            stock=50, category=categories[i % 2], created_by=admin, tags="smart, fast",
+        )
+        for i in range(product_count)
+    ]
+    tag_service.link_product_tags(products)
+    for product in products[:5]:
+        Review.objects.create(user=customer, product=product, rating=4, comment="Good")
+    cart = Cart.objects.create(user=customer)
+    for product in products[:3]:
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        Wishlist.objects.create(user=customer, product=product)
+    now = timezone.now()
+    coupons = [
+        Coupon.objects.create(
+            code=code, discount_percent=Decimal("10"), valid_from=now - datetime.timedelta(days=1),
+            valid_to=now + datetime.timedelta(days=30), usage_limit=10, created_by=admin,
+        )
+        for code in ("SAVE10", "SAVE20", "SAVE30")
+    ]
+    for coupon in coupons:
+        CouponAssignment.objects.create(coupon=coupon, user=customer)
+    orders = []
+    for n in range(order_count):
+        order = Order.objects.create(user=customer, total_amount=Decimal("300.00"), is_paid=n == 0, payment_status="paid" if n == 0 else "pending")
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for product in products[n:n + 2]
+        ])
+        orders.append(order)
+    payment = Payment.objects.create(
+        user=customer, order_id=orders[0].id, amount=Decimal("300.00"),
+        status=PaymentStatus.SUCCESS.value, transaction_id="ZPAY-TEST-1",
+    )
+    Order.objects.filter(id=orders[0].id).update(payment=payment)
+    order_service.backfill_order_summaries()
+    shipments = [
+        Shipment.objects.create(
+            order=order, customer=customer, address_snapshot="1 Main Street",
+            assigned_staff=staff, status=ShipmentStatus.ASSIGNED,
+        )
+        for order in orders[:-1]
+    ]
+    shipments.append(Shipment.objects.create(order=orders[-1], customer=customer, address_snapshot="1 Main Street"))
+    return {
+        "admin": admin, "customer": customer, "staff": staff, "categories": categories,
+        "products": products, "coupons": coupons, "orders": orders, "payment": payment,
+        "shipments": shipments,
+    }
+
+
+# Pins the number of queries a request may run
+class QueryBudgetMixin:
+    def reset_caches(self):
+        cache.clear()
+        for product_id, sku in Product.objects.values_list("id", "sku"):
+            product_service.invalidate_product_cache(product_id, sku)
+
+    def client_for(self, user=None):
+        client = Client()
+        if user:
+            session = client.session
+            session.update({"user_id": user.id, "user_role": user.role, "is_authenticated": True})
+            session.save()
+        return client
+
+    def assertQueryBudget(self, budget, url, user=None, method="get", data=None, status=200, **extra):
+        client = self.client_for(user)
+        self.reset_caches()
+        with self.assertNumQueries(budget):
+            response = getattr(client, method)(url, data, **extra)
+        self.assertEqual(response.status_code, status, url)
+        return response
+
+    def assertBudgets(self, budgets):
+        for budget, url, user, status in budgets:
+            with self.subTest(url=url):
+                self.assertQueryBudget(budget, url, user=user, status=status)
+
+
+# A cache shared between processes, as production setups use
+SHARED_CACHES = {"default": {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+    "LOCATION": os.path.join(tempfile.gettempdir(), "zenova-test-cache"),
+}}
+
+
+# Shared fixtures for the cart tests
+def create_cart_product(stock):
+    user = User.objects.create(email="cart@example.com", first_name="Cart", last_name="Tester", dob=datetime.date(2000, 1, 1))
+    category = Category.objects.create(name="Phones", slug="phones")
+    product = Product.objects.create(
+        name="Phone", sku="phone", price=Decimal("10.00"), stock=stock,
+        category=category, created_by=user,
+    )
+    Cart.objects.create(user=user)
+    return user, product
+
+
+# Ranked full-text product search
+@skipIf(connection.vendor == "sqlite", "Product search uses PostgreSQL full-text search.")
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        user = create_user("search@example.com", Role.ADMIN)
+        category = Category.objects.create(name="Audio", slug="audio")
+        self.products = [
+            Product.objects.create(
+                name=name, sku=sku, description=description, price=Decimal("50.00"), stock=5,
+                category=category, created_by=user, is_active=active,
+            )
+            for name, sku, description, active in (
+                ("Wireless Headphones", "wh-1", "Over-ear sound", True),
+                ("Phone Stand", "ps-1", "Holds headphones and phones", True),
+                ("Wired Headphones", "wh-2", "Old stock", False),
+            )
+        ]
+        search_service.refresh_search_vectors([product.id for product in self.products])
+
+    def test_prefix_query_ranks_name_matches_first(self):
+        names = [product.name for product in product_service.search_products("headph")]
+        self.assertEqual(names, ["Wireless Headphones", "Phone Stand"])
+
+    def test_category_name_is_searchable(self):
+        self.assertEqual(product_service.search_products("audio").count(), 2)
+
+    def test_blank_query_returns_nothing(self):
+        self.assertFalse(product_service.search_products("   ").exists())
+
+
+# Typo-tolerant autocomplete
+@skipIf(connection.vendor == "sqlite", "Suggestions use PostgreSQL trigram similarity.")
+class SuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = create_user("suggest@example.com", Role.ADMIN)
+        category = Category.objects.create(name="Audio", slug="audio")
+        product = Product.objects.create(
+            name="Wireless Headphones", sku="wh-1", price=Decimal("50.00"), stock=5,
+            category=category, created_by=user, tags="bluetooth",
+        )
+        tag_service.link_product_tags([product])
+
+    def test_misspelt_prefix_still_finds_the_product(self):
+        result = search_service.suggest("headphnes")
+        self.assertEqual([product["sku"] for product in result["products"]], ["wh-1"])
+
+    def test_did_you_mean_reads_a_bounded_number_of_rows(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(search_service.did_you_mean("headphnes"), "headphones")
+        with self.assertNumQueries(2):
+            self.assertEqual(search_service.did_you_mean("bluetoth"), "bluetooth")
+
+    def test_short_prefix_is_ignored(self):
+        self.assertEqual(search_service.suggest("h")["products"], [])
+
+
+# Keyset pages of the product listing
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = create_user("pages@example.com", Role.ADMIN)
+        category = Category.objects.create(name="Phones", slug="phones")
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}", sku=f"sku-{i}", price=Decimal("10.00"), stock=1,
+                category=category, created_by=user,
+            )
+            for i in range(7)
+        ]
+        # Equal timestamps across page boundaries: only the id breaks the tie
+        moment = timezone.now()
+        Product.objects.update(created_at=moment)
+        self.newest_first = [product.id for product in reversed(self.products)]
+
+    def page(self, **cursor):
+        return pagination_util.keyset_paginate(Product.objects.all(), page_size=3, **cursor)
+
+    def test_after_walks_ties_without_gaps_or_repeats(self):
+        seen = []
+        page = self.page()
+        while True:
+            seen.extend(product.id for product in page["items"])
+            if not page["has_next"]:
+                break
+            page = self.page(after=page["next_cursor"])
+        self.assertEqual(seen, self.newest_first)
+
+    def test_before_returns_to_the_previous_page(self):
+        first = self.page()
+        second = self.page(after=first["next_cursor"])
+        self.assertTrue(second["has_prev"])
+        back = self.page(before=second["prev_cursor"])
+        self.assertEqual([product.id for product in back["items"]], [product.id for product in first["items"]])
+        self.assertFalse(back["has_prev"])
+        self.assertEqual(back["next_cursor"], first["next_cursor"])
+
+    def test_malformed_cursor_starts_over(self):
+        self.assertEqual([product.id for product in self.page(after="not-a-cursor")["items"]], self.newest_first[:3])
+
+
+# Facet counts of the catalog sidebar
+class FacetCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = create_user("facets@example.com", Role.ADMIN)
+        self.phones = Category.objects.create(name="Phones", slug="phones")
+        self.laptops = Category.objects.create(name="Laptops", slug="laptops")
+        products = [
+            Product.objects.create(
+                name=name, sku=name.lower(), price=Decimal(price), stock=stock,
+                category=category, created_by=user, tags=tags,
+            )
+            for name, price, stock, category, tags in (
+                ("Basic", "100", 5, self.phones, "smart"),
+                ("Plus", "700", 5, self.phones, "smart, fast"),
+                ("Book", "800", 0, self.laptops, "fast"),
+            )
+        ]
+        tag_service.link_product_tags(products)
+
+    def facets(self, **filters):
+        return product_service.get_product_facets(filters)
+
+    def counts(self, facets, facet, key):
+        return {row[key]: row["count"] for row in facets[facet]}
+
+    def test_unfiltered_counts(self):
+        facets = self.facets()
+        self.assertEqual((facets["total"], facets["in_stock"]), (3, 2))
+        self.assertEqual(self.counts(facets, "categories", "name"), {"Laptops": 1, "Phones": 2})
+        self.assertEqual(self.counts(facets, "price", "key")["500-1000"], 2)
+        self.assertEqual(self.counts(facets, "tags", "name"), {"fast": 2, "smart": 2})
+
+    def test_selected_facet_keeps_its_other_options(self):
+        facets = self.facets(category=self.phones.id)
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual(self.counts(facets, "categories", "name"), {"Laptops": 1, "Phones": 2})
+        prices = self.counts(facets, "price", "key")
+        self.assertEqual((prices["0-500"], prices["500-1000"]), (1, 1))
+        self.assertEqual(len(prices), 5)
+
+    def test_each_facet_is_counted_under_the_other_filters(self):
+        facets = self.facets(category=self.phones.id, price="500-1000", in_stock=True)
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual(self.counts(facets, "categories", "name"), {"Phones": 1})
+        self.assertEqual(self.counts(facets, "price", "key")["0-500"], 1)
+        self.assertEqual(facets["in_stock"], 1)
+        facets = self.facets(price="500-1000")
+        self.assertEqual(self.counts(facets, "categories", "name"), {"Laptops": 1, "Phones": 1})
+
+    def test_cached_in_stock_count_follows_stock_changes(self):
+        self.assertEqual(self.facets()["in_stock"], 2)
+        # A reservation changes stock without bumping the catalog version
+        Product.objects.filter(sku="basic").update(stock=0)
+        key = cache_util.versioned_key(cache_util.CATALOG_NAMESPACE, "facets", "active")
+        cache.delete(f"{key}:in_stock")
+        with self.assertNumQueries(1):
+            facets = self.facets()
+        self.assertEqual((facets["total"], facets["in_stock"]), (3, 1))
+        self.assertEqual(self.counts(facets, "categories", "name"), {"Laptops": 1, "Phones": 2})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facets()["in_stock"], 1)
+
+
+# Rating aggregates kept up to date by review writes
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.customers = [create_user(f"rater{i}@example.com", Role.ENDUSER_CUSTOMER) for i in range(3)]
+        category = Category.objects.create(name="Phones", slug="phones")
+        self.product = Product.objects.create(
+            name="Phone", sku="phone", price=Decimal("10.00"), stock=5,
+            category=category, created_by=self.customers[0],
+        )
+
+    def aggregates(self):
+        return Product.objects.values(*review_service.RATING_FIELDS).get(id=self.product.id)
+
+    def test_incremental_aggregates_match_a_rebuild(self):
+        for customer, rating in zip(self.customers, (5, 4, 1)):
+            review_service.create_or_update_review(customer, self.product.id, rating, "Nice")
+        self.assertEqual(self.aggregates()["avg_rating"], Decimal("3.33"))
+        review_service.create_or_update_review(self.customers[1], self.product.id, 2, "Changed my mind")
+        review_service.delete_review(self.customers[2], self.product.id)
+        incremental = self.aggregates()
+        self.assertEqual(
+            (incremental["review_count"], incremental["avg_rating"], incremental["rating_count_2"], incremental["rating_count_4"]),
+            (2, Decimal("3.50"), 1, 0),
+        )
+        Product.objects.filter(id=self.product.id).update(avg_rating=0, review_count=0, rating_count_5=0)
+        review_service.rebuild_rating_aggregates()
+        self.assertEqual(self.aggregates(), incremental)
+
+    def test_last_review_deleted_resets_the_average(self):
+        review_service.create_or_update_review(self.customers[0], self.product.id, 4, "Good")
+        review_service.delete_review(self.customers[0], self.product.id)
+        self.assertEqual((self.aggregates()["review_count"], self.aggregates()["avg_rating"]), (0, Decimal("0.00")))
+
+
+# Read-through product cache by id and SKU
+class ProductCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product_service._local_products.clear()
+        self.user, self.product = create_cart_product(stock=5)
+
+    def test_reads_are_served_from_the_cache(self):
+        product_service.get_product_by_sku("phone")
+        with self.assertNumQueries(0):
+            self.assertEqual(product_service.get_product_by_id(self.product.id).name, "Phone")
+            self.assertEqual(product_service.get_product_by_sku("phone").id, self.product.id)
+
+    def test_invalidation_drops_both_tiers(self):
+        product_service.get_product_by_id(self.product.id)
+        Product.objects.filter(id=self.product.id).update(price=Decimal("12.00"))
+        product_service.invalidate_product_cache(self.product.id)
+        self.assertEqual(product_service.get_product_by_id(self.product.id).price, Decimal("12.00"))
+
+    def test_sku_rename_moves_the_lookup(self):
+        product_service.get_product_by_sku("phone")
+        Product.objects.filter(id=self.product.id).update(sku="phone-2")
+        product_service.invalidate_product_cache(self.product.id, "phone")
+        self.assertIsNone(product_service.get_product_by_sku("phone"))
+        self.assertEqual(product_service.get_product_by_sku("phone-2").id, self.product.id)
+
+    def test_process_local_cache_caps_entry_lifetimes(self):
+        self.assertEqual(cache_util.shared_timeout(product_service.PRODUCT_CACHE_TIMEOUT), cache_util.LOCAL_CACHE_TIMEOUT)
+        self.assertEqual(cache_util.shared_timeout(None), cache_util.LOCAL_CACHE_TIMEOUT)
+        with override_settings(DEBUG=False):
+            self.assertEqual([w.id for w in cache_util.check_shared_cache()], ["shop.W002"])
+        with override_settings(CACHES=SHARED_CACHES, DEBUG=False):
+            self.assertEqual(cache_util.shared_timeout(product_service.PRODUCT_CACHE_TIMEOUT), product_service.PRODUCT_CACHE_TIMEOUT)
+            self.assertEqual(cache_util.check_shared_cache(), [])
+
+    def test_stale_sku_entry_is_not_trusted(self):
+        product_service.get_product_by_sku("phone")
+        Product.objects.filter(id=self.product.id).update(sku="phone-2")
+        # Only the id entry is dropped, as a stock change would do
+        product_service.invalidate_product_cache(self.product.id)
+        self.assertIsNone(product_service.get_product_by_sku("phone"))
+
+
+# Unique slugs and SKUs reserved for a batch of names
+class UniqueValueTests(TestCase):
+    def test_collisions_within_a_batch_get_suffixes(self):
+        values = slug_util.generate_unique_values(Category, "slug", ["Phones", "phones", "Phones!"])
+        self.assertEqual(values, ["phones", "phones-2", "phones-3"])
+
+    def test_existing_rows_are_skipped(self):
+        Category.objects.create(name="Phones", slug="phones")
+        Category.objects.create(name="Phones 2", slug="phones-2")
+        values = slug_util.generate_unique_values(Category, "slug", ["Phones", "Laptops"])
+        self.assertEqual(values, ["phones-3", "laptops"])
+
+    def test_provided_values_win_and_stay_unique(self):
+        Category.objects.create(name="Phones", slug="phones")
+        values = slug_util.generate_unique_values(Category, "slug", ["Mobiles", "Tablets"], ["phones", None])
+        self.assertEqual(values, ["phones-2", "tablets"])
+
+    def test_other_constraint_is_not_retried(self):
+        Category.objects.create(name="Phones", slug="phones")
+        with mock.patch.object(slug_util, "generate_unique_values", wraps=slug_util.generate_unique_values) as generate:
+            with self.assertRaises(IntegrityError):
+                slug_util.create_unique(Category, "slug", "Other", name="Phones")
+        self.assertEqual(generate.call_count, 1)
+
+    def test_slug_race_is_retried(self):
+        Category.objects.create(name="Phones", slug="phones")
+        # The first reservation loses to a row that already holds the slug
+        values = iter([["phones"], ["phones-2"]])
+        with mock.patch.object(slug_util, "generate_unique_values", side_effect=lambda *a, **k: next(values)):
+            category = slug_util.create_unique(Category, "slug", "Phones", name="Mobiles")
+        self.assertEqual(category.slug, "phones-2")
+
+
+# Cart writes in a single request
+class CartItemUpsertTests(TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=5)
+
+    def test_add_item_accumulates_quantity(self):
+        cart_service.add_item(self.user, self.product.id, 2)
+        item = cart_service.add_item(self.user, self.product.id, 3)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_add_item_rejects_quantity_above_stock(self):
+        self.assertIsNone(cart_service.add_item(self.user, self.product.id, 6))
+        cart_service.add_item(self.user, self.product.id, 4)
+        self.assertIsNone(cart_service.add_item(self.user, self.product.id, 2))
+        self.assertEqual(CartItem.objects.get().quantity, 4)
+
+    def test_add_item_rejects_inactive_product(self):
+        Product.objects.filter(id=self.product.id).update(is_active=False)
+        self.assertIsNone(cart_service.add_item(self.user, self.product.id, 1))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_update_item_respects_stock(self):
+        cart_service.add_item(self.user, self.product.id, 1)
+        self.assertIsNone(cart_service.update_item(self.user, self.product.sku, 6))
+        self.assertTrue(cart_service.update_item(self.user, self.product.sku, 5))
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+
+# Cart totals computed in the database in one pass
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=20)
+        for name, price in (("Case", "2.49"), ("Charger", "13.35")):
+            product = Product.objects.create(
+                name=name, sku=name.lower(), price=Decimal(price), stock=20,
+                category=self.product.category, created_by=self.user,
+            )
+            cart_service.add_item(self.user, product.id, 3)
+        cart_service.add_item(self.user, self.product.id, 2)
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(
+            code="SAVE15", discount_percent=Decimal("15"), valid_from=now - datetime.timedelta(days=1),
+            valid_to=now + datetime.timedelta(days=1), usage_limit=10, created_by=self.user,
+        )
+        CouponAssignment.objects.create(coupon=self.coupon, user=self.user)
+
+    def request_with_coupon(self):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        coupon_service.store_coupon_in_session(request, self.coupon)
+        return request
+
+    def test_totals_match_the_per_line_computation(self):
+        lines = CartItem.objects.filter(cart__user=self.user).select_related("product")
+        subtotal = sum(item.product.price * item.quantity for item in lines)
+        discount = subtotal * self.coupon.discount_percent / Decimal("100")
+        with self.assertNumQueries(2):
+            summary = cart_service.get_cart_summary(self.user, self.request_with_coupon())
+        self.assertEqual(summary["subtotal"], subtotal)
+        self.assertEqual(summary["item_count"], 8)
+        self.assertEqual(summary["discount"], discount)
+        self.assertEqual(summary["grand_total"], subtotal - discount)
+        self.assertEqual(summary["coupon"], self.coupon)
+        self.assertEqual(
+            {item.product.sku: item.line_total for item in summary["items"]},
+            {item.product.sku: item.product.price * item.quantity for item in lines},
+        )
+
+    def test_invalid_coupon_is_dropped(self):
+        request = self.request_with_coupon()
+        Coupon.objects.filter(id=self.coupon.id).update(active=False)
+        summary = cart_service.get_cart_summary(self.user, request)
+        self.assertIsNone(summary["coupon"])
+        self.assertEqual(summary["discount"], Decimal("0.00"))
+        self.assertEqual(summary["grand_total"], summary["subtotal"])
+        self.assertNotIn("applied_coupon", request.session)
+
+    def test_empty_cart(self):
+        CartItem.objects.all().delete()
+        summary = cart_service.get_cart_summary(self.user)
+        self.assertEqual((summary["subtotal"], summary["item_count"], summary["items"]), (Decimal("0.00"), 0, []))
+
+
+# Cart of a visitor who is not signed in, kept in a signed cookie
+class GuestCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = create_user("guest@example.com", Role.ENDUSER_CUSTOMER)
+        _, self.product = create_cart_product(stock=5)
+        self.other = Product.objects.create(
+            name="Case", sku="case", price=Decimal("2.50"), stock=10,
+            category=self.product.category, created_by=self.product.created_by,
+        )
+        product_service.invalidate_product_cache(self.product.id, self.product.sku)
+
+    def guest_add(self, product, quantity):
+        return self.client.post(reverse("cart_add"), {"product_id": product.id, "quantity": quantity})
+
+    def test_guest_add_writes_no_rows(self):
+        self.guest_add(self.product, 2)
+        with self.assertNumQueries(0):
+            response = self.guest_add(self.product, 1)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+        self.assertFalse(CartItem.objects.exists())
+        response = self.client.get(reverse("cart_detail"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["item_count"], 3)
+        self.assertEqual(response.context["subtotal"], Decimal("30.00"))
+
+    def test_guest_add_respects_stock(self):
+        self.guest_add(self.product, 4)
+        self.guest_add(self.product, 2)
+        self.assertEqual(self.client.get(reverse("cart_detail")).context["item_count"], 4)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies[guest_cart_util.GUEST_CART_COOKIE] = f"{self.product.id}-5"
+        self.assertEqual(self.client.get(reverse("cart_detail")).context["items"], [])
+
+    def test_guest_batch_update(self):
+        self.guest_add(self.product, 1)
+        self.guest_add(self.other, 1)
+        response = self.client.post(
+            reverse("cart_update_batch"),
+            json.dumps({"items": [{"sku": "phone", "quantity": 3}, {"sku": "case", "quantity": 0}]}),
+            content_type="application/json",
+        )
+        data = response.json()
+        self.assertEqual((data["updated"], data["removed"]), (["phone"], ["case"]))
+        self.assertEqual(data["subtotal"], "30.00")
+
+    def test_login_merges_guest_cart(self):
+        cart_service.add_item(self.customer, self.product.id, 3)
+        self.guest_add(self.product, 4)
+        self.guest_add(self.other, 2)
+        response = self.client.post(reverse("user_login"), {"email": "guest@example.com", "password": "secret-pass-123"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[guest_cart_util.GUEST_CART_COOKIE].value, "")
+        quantities = dict(CartItem.objects.filter(cart__user=self.customer).values_list("product__sku", "quantity"))
+        self.assertEqual(quantities, {"phone": 5, "case": 2})
+
+
+# Cart writes kept in the cache and written back in batches
+@override_settings(CART_STORE="cache", CACHES=SHARED_CACHES)
+class CartStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.product = create_cart_product(stock=5)
+        self.other = Product.objects.create(
+            name="Case", sku="case", price=Decimal("2.50"), stock=10,
+            category=self.product.category, created_by=self.user,
+        )
+
+    def stored_quantities(self):
+        return dict(CartItem.objects.filter(cart__user=self.user).values_list("product__sku", "quantity"))
+
+    def test_writes_stay_in_the_cache_until_flushed(self):
+        cart_service.add_item(self.user, self.product.id, 2)
+        cart_service.add_item(self.user, self.other.id, 4)
+        self.assertTrue(cart_service.update_item(self.user, "phone", 3))
+        self.assertTrue(cart_service.remove_item(self.user, "case"))
+        self.assertEqual(self.stored_quantities(), {})
+        summary = cart_service.get_cart_summary(self.user)
+        self.assertEqual(summary["item_count"], 3)
+        self.assertEqual(summary["subtotal"], Decimal("30.00"))
+        self.assertEqual(cart_store_service.flush_carts(), 1)
+        self.assertEqual(self.stored_quantities(), {"phone": 3})
+        self.assertEqual(cart_store_service.flush_carts(), 0)
+
+    def test_stock_limits_apply(self):
+        cart_service.add_item(self.user, self.product.id, 4)
+        self.assertIsNone(cart_service.add_item(self.user, self.product.id, 2))
+        result = cart_service.update_items(self.user, [("phone", 6), ("case", 1)])
+        self.assertEqual(result["errors"], [("phone", "Only 5 in stock."), ("case", "Item is not in the cart.")])
+
+    def test_flush_removes_lines_deleted_from_the_cache(self):
+        CartItem.objects.create(cart=self.user.cart, product=self.other, quantity=1)
+        cart_service.add_item(self.user, self.product.id, 1)
+        cart_service.update_items(self.user, [("case", 0)])
+        cart_store_service.flush_carts()
+        self.assertEqual(self.stored_quantities(), {"phone": 1})
+
+    def test_carts_rebuild_from_the_last_flush(self):
+        cart_service.add_item(self.user, self.product.id, 2)
+        cart_store_service.flush_carts()
+        cart_service.add_item(self.user, self.product.id, 1)
+        cache.clear()
+        self.assertEqual(cart_service.get_cart_summary(self.user)["item_count"], 2)
+
+    def test_clear_cart_flushes_as_empty(self):
+        cart_service.add_item(self.user, self.product.id, 2)
+        cart_store_service.flush_carts()
+        cart_service.clear_cart(self.user)
+        cart_store_service.flush_cart(self.user.id)
+        self.assertEqual(self.stored_quantities(), {})
+
+    def test_process_local_cache_keeps_carts_in_the_database(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertFalse(cart_store_service.is_enabled())
+            self.assertEqual([w.id for w in cart_store_service.check_cart_store()], ["shop.W001"])
+            cart_service.add_item(self.user, self.product.id, 2)
+            self.assertEqual(self.stored_quantities(), {"phone": 2})
+        self.assertTrue(cart_store_service.is_enabled())
+        self.assertEqual(cart_store_service.check_cart_store(), [])
+
+
+# Stock held by unpaid orders
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=5)
+
+    def place_order(self, quantity):
+        cart_service.add_item(self.user, self.product.id, quantity)
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        cart_service.clear_cart(self.user)
+        return order
+
+    def stock(self):
+        return Product.objects.values_list("stock", flat=True).get(id=self.product.id)
+
+    def test_order_takes_stock(self):
+        order = self.place_order(3)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(order.reservation.status, ReservationStatus.HELD)
+
+    def test_order_fails_without_stock(self):
+        Product.objects.filter(id=self.product.id).update(stock=5)
+        cart_service.add_item(self.user, self.product.id, 4)
+        Product.objects.filter(id=self.product.id).update(stock=3)
+        totals = cart_service.get_cart_summary(self.user)
+        with self.assertRaises(order_service.OrderCreationError):
+            order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_sweeper_releases_expired_reservations(self):
+        paid = self.place_order(1)
+        reservation_service.commit_reservation(paid)
+        Order.objects.filter(id=paid.id).update(is_paid=True, payment_status="paid")
+        expired = self.place_order(2)
+        StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(reservation_service.release_expired_reservations(batch_size=1), 1)
+        self.assertEqual(self.stock(), 4)
+        expired.refresh_from_db()
+        self.assertEqual(expired.payment_status, "expired")
+        self.assertEqual(reservation_service.release_expired_reservations(), 0)
+
+    def test_payment_retakes_released_stock(self):
+        order = self.place_order(2)
+        self.assertTrue(reservation_service.release_reservation(order))
+        self.assertEqual(self.stock(), 5)
+        self.assertTrue(reservation_service.commit_reservation(order))
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(reservation_service.release_reservation(order))
+
+
+# Retried order forms and repeated checkouts of one cart
+class OrderIdempotencyTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=10)
+        cart_service.add_item(self.user, self.product.id, 2)
+        self.client = self.client_for(self.user)
+
+    def test_order_form_carries_a_key(self):
+        response = self.client.get(reverse("order_create"))
+        self.assertContains(response, 'name="idempotency_key"')
+        self.assertEqual(len(response.context["idempotency_key"]), 32)
+
+    def test_resubmitted_form_returns_the_original_order(self):
+        url = reverse("order_create")
+        first = self.client.post(url, {"idempotency_key": "form-1"})
+        order = Order.objects.get()
+        self.assertRedirects(first, reverse("payment:choose_method", args=[order.id]), fetch_redirect_response=False)
+        with self.assertNumQueries(3):
+            second = self.client.post(url, {"idempotency_key": "form-1"})
+        self.assertRedirects(second, reverse("payment:choose_method", args=[order.id]), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+    def test_pending_order_is_reused_only_for_the_same_cart(self):
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        totals = cart_service.get_cart_summary(self.user)
+        self.assertEqual(
+            order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals), order
+        )
+        cart_service.add_item(self.user, self.product.id, 1)
+        totals = cart_service.get_cart_summary(self.user)
+        changed = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        self.assertNotEqual(changed, order)
+        self.assertEqual(changed.total_amount, Decimal("30.00"))
+
+
+# A customer with an address, a coupon and a cart ready for checkout
+class CheckoutMixin:
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=10)
+        self.address = Address.objects.create(
+            user=self.user, address_line1="1 Main Street", city="Pune", state="MH",
+            postal_code="411001", country="India", is_default=True,
+        )
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(
+            code="SAVE10", discount_percent=Decimal("10"), valid_from=now - datetime.timedelta(days=1),
+            valid_to=now + datetime.timedelta(days=1), usage_limit=10, created_by=self.user,
+        )
+
+    def place_order(self, product_count=1):
+        for n in range(1, product_count):
+            product = Product.objects.create(
+                name=f"Case {n}", sku=f"case-{n}", price=Decimal("2.00"), stock=10,
+                category=self.product.category, created_by=self.user,
+            )
+            cart_service.add_item(self.user, product.id, 1)
+        cart_service.add_item(self.user, self.product.id, 1)
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        Order.objects.filter(id=order.id).update(coupon=self.coupon)
+        return order
+
+    def checkout(self, order):
+        request = RequestFactory().post("/")
+        request.session = SessionStore()
+        request.session["applied_coupon"] = {"id": self.coupon.id}
+        return checkout_service.complete_zpay_checkout(user=self.user, order_id=order.id, request=request)
+
+
+# Payment completion in one transaction; the gateway's simulated delay is skipped
+@mock.patch("payment.utils.simulate_gateway_delay", lambda: None)
+class CheckoutTests(CheckoutMixin, TestCase):
+    def test_checkout_completes_the_order(self):
+        order = self.place_order()
+        result = self.checkout(order)
+        self.assertTrue(result["paid"])
+        self.assertEqual(set(result["timings"]), {"total", "validate", "reserve", "gateway", "commit"})
+        order.refresh_from_db()
+        self.assertEqual((order.is_paid, order.payment_status), (True, "paid"))
+        self.assertEqual(order.reservation.status, ReservationStatus.COMMITTED)
+        self.assertEqual(Shipment.objects.get(order=order).address_snapshot, str(self.address))
+        self.assertEqual(Coupon.objects.get(id=self.coupon.id).used_count, 1)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+        self.assertTrue(self.checkout(order)["already_paid"])
+        self.assertEqual(Shipment.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        for product_count in (1, 4):
+            with self.subTest(product_count=product_count):
+                order = self.place_order(product_count)
+                with self.assertNumQueries(19):
+                    self.checkout(order)
+                Product.objects.exclude(id=self.product.id).delete()
+
+    def test_stock_sold_during_payment_does_not_complete_the_order(self):
+        order = self.place_order()
+
+        # The sweeper releases the order while the gateway runs and another customer buys the stock
+        def sell_out():
+            reservation_service.release_reservation(order)
+            Product.objects.filter(id=self.product.id).update(stock=0)
+
+        with mock.patch("payment.utils.simulate_gateway_delay", sell_out):
+            result = self.checkout(order)
+        self.assertEqual((result["paid"], result["refunding"]), (False, True))
+        order.refresh_from_db()
+        self.assertEqual((order.is_paid, order.payment_status), (False, "refunding"))
+        self.assertEqual(order.payment.status, PaymentStatus.SUCCESS)
+        self.assertEqual(order.reservation.status, ReservationStatus.RELEASED)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 0)
+        self.assertFalse(Shipment.objects.exists())
+        self.assertEqual(Coupon.objects.get(id=self.coupon.id).used_count, 0)
+        self.assertTrue(CartItem.objects.filter(cart__user=self.user).exists())
+        with self.assertRaises(checkout_service.CheckoutError):
+            self.checkout(order)
+
+    def test_cancelled_order_cannot_be_paid(self):
+        order = self.place_order()
+        request = RequestFactory().post("/")
+        request.session = SessionStore()
+        order_service.cancel_order(order=order, request=request)
+        with self.assertRaises(checkout_service.CheckoutError):
+            self.checkout(order)
+        order.refresh_from_db()
+        self.assertEqual((order.is_paid, order.payment_status), (False, "cancelled"))
+        self.assertEqual(order.reservation.status, ReservationStatus.RELEASED)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 10)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_missing_address_stops_before_payment(self):
+        order = self.place_order()
+        self.address.delete()
+        with self.assertRaises(checkout_service.CheckoutError):
+            self.checkout(order)
+        order.refresh_from_db()
+        self.assertFalse(order.is_paid)
+        self.assertFalse(Payment.objects.exists())
+
+
+# A declined payment outside a test transaction, as in autocommit production requests
+@mock.patch("payment.utils.simulate_gateway_delay", lambda: None)
+@mock.patch("payment.utils.simulate_payment_result", lambda: "failed")
+class CheckoutFailureTests(CheckoutMixin, TransactionTestCase):
+    def test_failed_payment_leaves_the_order_pending(self):
+        order = self.place_order()
+        result = self.checkout(order)
+        self.assertFalse(result["paid"])
+        order.refresh_from_db()
+        self.assertEqual((order.is_paid, order.payment_status), (False, "pending"))
+        self.assertEqual(Payment.objects.get(order_id=order.id).status, PaymentStatus.FAILED)
+        self.assertEqual(order.reservation.status, ReservationStatus.HELD)
+        self.assertFalse(Shipment.objects.exists())
+        self.assertTrue(CartItem.objects.filter(cart__user=self.user).exists())
+        # A retry after the decline reuses the failed payment row
+        self.checkout(order)
+        self.assertEqual(Payment.objects.filter(order_id=order.id).count(), 1)
+
+
+# Customer order history pages
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=50)
+
+    def place_order(self, quantity):
+        cart_service.add_item(self.user, self.product.id, quantity)
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        cart_service.clear_cart(self.user)
+        return order
+
+    def test_order_stores_its_item_summary(self):
+        order = self.place_order(3)
+        self.assertEqual((order.item_count, order.first_item_name), (3, "Phone"))
+
+    def test_pages_walk_every_order_once(self):
+        orders = [self.place_order(quantity) for quantity in range(1, 6)]
+        seen = []
+        after = None
+        while True:
+            page = order_service.get_order_page(user=self.user, after=after, page_size=2)
+            seen.extend(order.id for order in page["items"])
+            if not page["has_next"]:
+                break
+            after = page["next_cursor"]
+        self.assertEqual(seen, [order.id for order in reversed(orders)])
+
+    def test_backfill_fills_old_orders(self):
+        order = self.place_order(2)
+        Order.objects.filter(id=order.id).update(item_count=0, first_item_name="")
+        self.assertEqual(order_service.backfill_order_summaries(chunk_size=1), 1)
+        order.refresh_from_db()
+        self.assertEqual((order.item_count, order.first_item_name), (2, "Phone"))
+
+
+# Admin order console filters and export
+class AdminOrderConsoleTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = seed_store(order_count=4)
+
+    def filtered_ids(self, **params):
+        filters = order_service.parse_admin_filters(params)
+        return [order.id for order in order_service.get_admin_order_page(filters)["items"]]
+
+    def test_filters_narrow_the_orders(self):
+        orders = self.store["orders"]
+        Order.objects.filter(id=orders[1].id).update(coupon=self.store["coupons"][0])
+        self.assertEqual(self.filtered_ids(paid="yes"), [orders[0].id])
+        self.assertEqual(self.filtered_ids(status="pending", coupon="save10"), [orders[1].id])
+        self.assertEqual(len(self.filtered_ids(customer=str(self.store["customer"].id))), 4)
+        self.assertEqual(self.filtered_ids(customer="nobody@example.com"), [])
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.filtered_ids(date_from=today, date_to=today)), 4)
+        self.assertEqual(self.filtered_ids(date_to="2000-01-01"), [])
+        self.assertEqual(order_service.parse_admin_filters({"status": "shipped", "date_from": "soon"}), {})
+
+    def test_export_streams_filtered_orders(self):
+        client = self.client_for(self.store["admin"])
+        response = client.get(reverse("order_adminexport"), {"status": "pending"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "created_at", "customer_email"])
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(",pending," in line for line in lines[1:]))
+
+    def test_export_neutralises_spreadsheet_formulas(self):
+        customer = self.store["customer"]
+        User.objects.filter(id=customer.id).update(first_name="=HYPERLINK(1)", last_name="@SUM(A1)")
+        Order.objects.filter(user=customer).update(first_item_name="-2+3")
+        rows = list(csv.reader(io.StringIO("".join(order_service.export_orders()))))
+        self.assertEqual(rows[1][3:5], ["'=HYPERLINK(1)", "'@SUM(A1)"])
+        self.assertEqual(rows[1][-1], "'-2+3")
+        self.assertEqual(rows[1][7], "300.00")
+
+    def test_product_csv_round_trips_escaped_names(self):
+        Product.objects.filter(id=self.store["products"][0].id).update(name="+Phone")
+        exported = "".join(product_io_service.export_products("csv"))
+        self.assertIn(",'+Phone,", exported)
+        names = [row["name"] for _, row in product_io_service.iter_rows(io.StringIO(exported), "csv")]
+        self.assertIn("+Phone", names)
+
+
+# Every stock change lands in the inventory ledger
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        self.user, self.product = create_cart_product(stock=5)
+        inventory_service.backfill_movements()
+
+    def stock(self):
+        return Product.objects.values_list("stock", flat=True).get(id=self.product.id)
+
+    def test_reservations_and_cancellations_are_recorded(self):
+        cart_service.add_item(self.user, self.product.id, 3)
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        reservation_service.release_reservation(order)
+        reasons = list(InventoryMovement.objects.order_by("id").values_list("reason", "delta"))
+        self.assertEqual(reasons, [
+            (MovementReason.CREATED, 5), (MovementReason.RESERVATION, -3), (MovementReason.CANCELLATION, 3),
+        ])
+        self.assertEqual(inventory_service.stock_at(self.product.id), self.stock())
+
+    @skipIf(connection.vendor == "sqlite", "Product updates refresh PostgreSQL search vectors.")
+    def test_admin_edit_keeps_reservations_made_after_the_form_opened(self):
+        admin = create_user("stock-admin@example.com", Role.ADMIN)
+        client = Client()
+        session = client.session
+        session.update({"user_id": admin.id, "user_role": admin.role, "is_authenticated": True})
+        session.save()
+        url = reverse("product_update", args=[self.product.id])
+        self.assertContains(client.get(url), 'name="original_stock" value="5"')
+        # An order reserves 3 units while the admin is still editing
+        cart_service.add_item(self.user, self.product.id, 3)
+        totals = cart_service.get_cart_summary(self.user)
+        order = order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        client.post(url, {
+            "name": "Phone", "price": "10.00", "stock": "8", "original_stock": "5",
+            "category": self.product.category_id, "is_active": "on",
+        })
+        self.assertEqual(self.stock(), 5)
+        adjustment = InventoryMovement.objects.get(reason=MovementReason.ADJUSTMENT)
+        self.assertEqual(adjustment.delta, 3)
+        reservation_service.release_reservation(order)
+        self.assertEqual(self.stock(), 8)
+        self.assertEqual(inventory_service.stock_at(self.product.id), 8)
+
+    def test_admin_edit_cannot_take_stock_below_zero(self):
+        Product.objects.filter(id=self.product.id).update(stock=1)
+        request = RequestFactory().post("/")
+        request.session = SessionStore()
+        data = {"name": "Phone", "stock": "0", "original_stock": "5", "is_active": "on"}
+        self.assertIsNone(product_service.update_product(self.product.id, data, request))
+        self.assertEqual(self.stock(), 1)
+
+    def test_stock_at_reads_one_snapshot_and_the_rows_after_it(self):
+        inventory_service.record_movement(self.product.id, -2, MovementReason.ADJUSTMENT)
+        self.assertEqual(inventory_service.take_snapshots(), 1)
+        self.assertEqual(inventory_service.take_snapshots(), 0)
+        before = timezone.now()
+        InventoryMovement.objects.create(product=self.product, delta=4, reason=MovementReason.ADJUSTMENT)
+        with self.assertNumQueries(2):
+            self.assertEqual(inventory_service.stock_at(self.product.id), 7)
+        self.assertEqual(inventory_service.stock_at(self.product.id, at=before), 3)
+        InventoryMovement.objects.update(created_at=before - datetime.timedelta(days=1))
+        InventorySnapshot.objects.update(taken_at=before - datetime.timedelta(days=1))
+        self.assertEqual(inventory_service.stock_at(self.product.id, at=before - datetime.timedelta(days=2)), 0)
+
+    @skipIf(connection.vendor == "sqlite", "The importer refreshes PostgreSQL search vectors.")
+    def test_import_records_stock_changes(self):
+        rows = "sku,name,description,price,stock,category,tags,is_active\nphone,Phone,,10.00,9,Phones,,true\nnew,New,,1.00,2,Phones,,true\n"
+        product_io_service.import_products(io.StringIO(rows), "csv", self.user, overwrite_stock=True)
+        deltas = dict(
+            InventoryMovement.objects.filter(reason=MovementReason.IMPORT).values_list("product__sku", "delta")
+        )
+        self.assertEqual(deltas, {"phone": 4, "new": 2})
+
+    @skipIf(connection.vendor == "sqlite", "The importer refreshes PostgreSQL search vectors.")
+    def test_reimported_export_keeps_reservations(self):
+        exported = "".join(product_io_service.export_products("csv"))
+        cart_service.add_item(self.user, self.product.id, 3)
+        totals = cart_service.get_cart_summary(self.user)
+        order_service.create_order_from_cart(user=self.user, cart=totals["cart"], cart_totals=totals)
+        result = product_io_service.import_products(io.StringIO(exported.replace(",Phone,", ",Phone X,")), "csv", self.user)
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(Product.objects.get(id=self.product.id).name, "Phone X")
+        self.assertEqual(self.stock(), 2)
+        self.assertFalse(InventoryMovement.objects.filter(reason=MovementReason.IMPORT).exists())
+
+
+# Stock status of many products in one lookup
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.product = create_cart_product(stock=3)
+        self.other = Product.objects.create(
+            name="Case", sku="case", price=Decimal("2.50"), stock=40,
+            category=self.product.category, created_by=self.user,
+        )
+
+    def test_endpoint_answers_many_products_in_one_query(self):
+        url = reverse("product_availability")
+        query = {"sku": "phone,missing", "id": str(self.other.id)}
+        with self.assertNumQueries(1):
+            items = self.client.get(url, query).json()["items"]
+        self.assertEqual([item["status"] for item in items], ["low_stock", "not_found", "in_stock"])
+        self.assertEqual(items[0]["label"], "Only 3 left")
+        with self.assertNumQueries(0):
+            self.client.get(url, query)
+
+    def test_endpoint_rejects_bad_ids(self):
+        self.assertEqual(self.client.get(reverse("product_availability"), {"id": "x"}).status_code, 400)
+
+    def test_cart_lines_carry_labels(self):
+        cart_service.add_item(self.user, self.product.id, 1)
+        Product.objects.filter(id=self.product.id).update(is_active=False)
+        summary = cart_service.get_cart_summary(self.user)
+        self.assertEqual(summary["items"][0].availability["status"], "unavailable")
+
+
+# Cart writes racing from many connections
+@skipIf(connection.vendor == "sqlite", "The shared in-memory SQLite test database fails concurrent writers instead of queueing them.")
+class CartConcurrencyTests(TransactionTestCase):
+    WORKERS = 20
+    ADDS = 300
+
+    def add_in_parallel(self, user, product):
+        def add(_):
+            try:
+                return cart_service.add_item(user, product.id, 1) is not None
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            return list(pool.map(add, range(self.ADDS)))
+
+    def test_parallel_adds_lose_no_updates(self):
+        user, product = create_cart_product(stock=self.ADDS)
+        results = self.add_in_parallel(user, product)
+        self.assertTrue(all(results))
+        self.assertEqual(CartItem.objects.get(product=product).quantity, self.ADDS)
+
+    def test_parallel_adds_stop_at_stock(self):
+        user, product = create_cart_product(stock=50)
+        results = self.add_in_parallel(user, product)
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(CartItem.objects.get(product=product).quantity, 50)
+
+
+# Query budgets of every shop page
+class ShopQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = seed_store()
+
+    def test_catalog_pages(self):
+        product = self.store["products"][0]
+        self.assertBudgets([
+            (2, reverse("home"), None, 200),
+            (4, reverse("product_list"), None, 200),
+            (5, reverse("product_tag_list", args=["smart"]), None, 200),
+            (3, reverse("product_detail", args=[product.id]), None, 200),
+            (1, reverse("review_list", args=[product.id]), None, 200),
+            (1, reverse("category_list"), None, 200),
+        ])
+
+    @skipIf(connection.vendor == "sqlite", "Search ranking and suggestions use PostgreSQL full-text search.")
+    def test_search_pages(self):
+        customer = self.store["customer"]
+        self.assertBudgets([
+            (6, reverse("product_search") + "?q=product", customer, 200),
+            (2, reverse("product_suggest") + "?q=prod", None, 200),
+        ])
+
+    def test_admin_catalog_pages(self):
+        admin = self.store["admin"]
+        product = self.store["products"][0]
+        category = self.store["categories"][0]
+        self.assertBudgets([
+            (3, reverse("product_create"), admin, 200),
+            (4, reverse("product_update", args=[product.id]), admin, 200),
+            (3, reverse("product_delete", args=[product.id]), admin, 200),
+            (3, reverse("product_list_admin"), admin, 200),
+            (2, reverse("product_import"), admin, 200),
+            (2, reverse("product_export"), admin, 200),
+            (2, reverse("category_create"), admin, 200),
+            (3, reverse("category_update", args=[category.id]), admin, 200),
+            (3, reverse("category_delete", args=[category.id]), admin, 200),
+        ])
+
+    def test_cart_pages(self):
+        customer = self.store["customer"]
+        self.assertBudgets([
+            (3, reverse("cart_detail"), customer, 200),
+            (3, reverse("cart_add"), customer, 200),
+            (2, reverse("cart_clear"), customer, 200),
+            (3, reverse("wishlist"), customer, 200),
+        ])
+
+    def test_cart_writes(self):
+        customer = self.store["customer"]
+        product = self.store["products"][5]
+        self.assertQueryBudget(
+            4, reverse("cart_add"), customer, method="post",
+            data={"product_id": product.id, "quantity": 1}, status=302,
+        )
+        self.assertQueryBudget(
+            8, reverse("cart_update_batch"), customer, method="post",
+            data=json.dumps({"items": [{"sku": "sku-0", "quantity": 3}, {"sku": "sku-1", "quantity": 0}]}),
+            content_type="application/json",
+        )
+        self.assertQueryBudget(
+            5, reverse("cart_update"), customer, method="post",
+            data={"product_sku": "sku-0", "expected_sku": "sku-0", "quantity": 3}, status=302,
+        )
+        self.assertQueryBudget(
+            5, reverse("cart_remove"), customer, method="post",
+            data={"product_sku": "sku-1", "expected_sku": "sku-1"}, status=302,
+        )
+
+    # The GET form of wishlist_add, like those of cart_update and cart_remove, has no template in the tree
+    def test_wishlist_writes(self):
+        customer = self.store["customer"]
+        products = self.store["products"]
+        self.assertQueryBudget(3, reverse("wishlist_remove", args=[products[0].id]), customer)
+        self.assertQueryBudget(9, reverse("wishlist_add", args=[products[6].id]), customer, method="post", status=302)
+        self.assertQueryBudget(3, reverse("wishlist_remove", args=[products[1].id]), customer, method="post", status=302)
+        self.assertQueryBudget(8, reverse("wishlist_cart", args=[products[2].id]), customer, method="post", status=302)
+
+    def test_coupon_apply(self):
+        self.assertQueryBudget(
+            6, reverse("coupon_apply", args=[self.store["coupons"][0].id]), self.store["customer"], method="post",
+        )
+
+    def test_post_only_endpoints(self):
+        customer = self.store["customer"]
+        admin = self.store["admin"]
+        self.assertQueryBudget(
+            10, reverse("order_cancel", args=[self.store["orders"][2].id]), customer, method="post", status=302,
+        )
+        self.assertQueryBudget(
+            8, reverse("review_delete", args=[self.store["products"][0].id]), customer, method="post", status=302,
+        )
+        self.assertQueryBudget(
+            5, reverse("assign_coupon_to_user", args=[self.store["coupons"][0].id]), admin, method="post",
+            data={"user_id": self.store["customer"].id}, status=302,
+        )
+        self.assertQueryBudget(
+            8, reverse("shipment_assign", args=[self.store["shipments"][-1].id]), admin, method="post",
+            data={"staff_id": self.store["staff"].id}, status=302,
+        )
+
+    def test_order_pages(self):
+        customer = self.store["customer"]
+        self.assertBudgets([
+            (3, reverse("order_preview"), customer, 200),
+            (3, reverse("order_create"), customer, 200),
+            (3, reverse("order_list"), customer, 200),
+            (4, reverse("order_list") + f"?expand={self.store['orders'][0].id}", customer, 200),
+            (3, reverse("order_adminlist"), self.store["admin"], 200),
+            (3, reverse("order_adminlist") + "?status=pending&paid=no&customer=customer@example.com", self.store["admin"], 200),
+            (3, reverse("shipment_detail"), customer, 200),
+        ])
+
+    def test_review_pages(self):
+        customer = self.store["customer"]
+        product = self.store["products"][0]
+        self.assertBudgets([
+            (3, reverse("review_create", args=[product.id]), customer, 200),
+            (3, reverse("review_update", args=[product.id]), customer, 200),
+        ])
+
+    def test_coupon_pages(self):
+        admin = self.store["admin"]
+        coupon = self.store["coupons"][0]
+        self.assertBudgets([
+            (4, reverse("coupon_list"), admin, 200),
+            (2, reverse("coupon_create"), admin, 200),
+            (3, reverse("coupon_update", args=[coupon.id]), admin, 200),
+            (3, reverse("coupon_delete", args=[coupon.id]), admin, 200),
+            (3, reverse("customer_coupon_list"), self.store["customer"], 200),
+        ])
+
+    def test_shipment_pages(self):
+        staff = self.store["staff"]
+        shipment = self.store["shipments"][0]
+        self.assertBudgets([
+            (4, reverse("shipment_admin_list"), self.store["admin"], 200),
+            (3, reverse("staff_shipments"), staff, 200),
+            (3, reverse("shipment_shipped", args=[shipment.id]), staff, 200),
+            (3, reverse("shipment_delivered", args=[shipment.id]), staff, 200),
+        ])
+
+    def test_policy_pages(self):
+        self.assertBudgets([
+            (0, reverse(name), None, 200)
+            for name in ("terms_of_use", "privacy_policy", "payment_policy", "warranty_service")
+        ])
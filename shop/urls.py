@@ -14,7 +14,10 @@ urlpatterns = [
     path('zenova.com/products/<int:product_id>/', views.ProductDetailView.as_view(), name='product_detail'),
     path('zenova.com/products/<int:product_id>/edit/', views.ProductUpdateView.as_view(), name='product_update'),
     path('zenova.com/products/<int:product_id>/delete/', views.ProductDeleteView.as_view(), name='product_delete'),
+    path('zenova.com/products/tags/<slug:tag_slug>/', views.ProductListView.as_view(), name='product_tag_list'),
     path('zenova.com/products/list',views.ProductLListAdminView.as_view(),name= 'product_list_admin'),
+    path('zenova.com/products/import/', views.ProductImportView.as_view(), name='product_import'),
+    path('zenova.com/products/export/', views.ProductExportView.as_view(), name='product_export'),
 
     # Product Category Routes
     path('zenova.com/categories/', views.CategoryListView.as_view(), name='category_list'),
@@ -27,6 +30,7 @@ urlpatterns = [
     path("zenova.com/order/preview/", views.OrderPreviewView.as_view(), name="order_preview"),
     path("zenova.com/order/create", views.OrderCreateView.as_view(), name="order_create"),
     path('zenova.com/orders/',views.OrderListAdminView.as_view(), name='order_adminlist'),
+    path('zenova.com/orders/export/',views.OrderExportAdminView.as_view(), name='order_adminexport'),
     path("zenova.com/my-orders/",views.OrderListCustomerView.as_view(),name="order_list"),
     path("zenova.com/order/<int:order_id>/cancel/",views.OrderCancelView.as_view(),name="order_cancel"),
 
@@ -34,6 +38,7 @@ urlpatterns = [
     path('zenova.com/cart/', views.CartDetailView.as_view(), name='cart_detail'),
     path('zenova.com/cart/add/', views.CartAddItemView.as_view(), name='cart_add'),
     path('zenova.com/cart/update/', views.CartUpdateItemView.as_view(), name='cart_update'),
+    path('zenova.com/cart/update/batch/', views.CartBatchUpdateView.as_view(), name='cart_update_batch'),
     path('zenova.com/cart/remove/', views.CartRemoveItemView.as_view(), name='cart_remove'),
     path('zenova.com/cart/clear/', views.CartClearView.as_view(), name='cart_clear'),
 
@@ -66,6 +71,8 @@ urlpatterns = [
 
     # Product Search Routes
     path('zenova.com/products/search/', views.ProductSearchView.as_view(), name='product_search'),
+    path('zenova.com/products/suggest/', views.ProductSuggestView.as_view(), name='product_suggest'),
+    path('zenova.com/products/availability/', views.ProductAvailabilityView.as_view(), name='product_availability'),
 
     # Assign Coupon to User
     path('zenova.com/coupons/<int:coupon_id>/assign/', views.AssignCouponToUserView.as_view(), name='assign_coupon_to_user'),
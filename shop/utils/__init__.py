@@ -1,2 +1,4 @@
 from .slug_util import *
-from .validation_utils import *
\ No newline at end of file
+from .validation_utils import *
+from .pagination_util import *
+from .cache_util import *
\ No newline at end of file
@@ -0,0 +1,71 @@
+import time
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+
+# Catalog namespace, bumped on every product or category write
+CATALOG_NAMESPACE = "catalog"
+
+
+# Cache backends private to one process: a delete or version bump made by one
+# worker is never seen by the others
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Longest life of an invalidated entry on such a cache, so edits reach every worker soon
+LOCAL_CACHE_TIMEOUT = 15
+
+
+# Whether the default cache is shared between processes
+def is_cache_shared():
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+# Timeout of an entry that writes invalidate, capped when the cache is local to the process
+def shared_timeout(timeout):
+    if is_cache_shared():
+        return timeout
+    return LOCAL_CACHE_TIMEOUT if timeout is None else min(timeout, LOCAL_CACHE_TIMEOUT)
+
+
+# System check: a production setup on a process-local cache serves stale catalog data
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DEBUG or is_cache_shared():
+        return []
+    return [checks.Warning(
+        "The default cache is local to each process.",
+        hint=(
+            "Point CACHE_URL at a shared cache (Redis, Memcached, database). Until then product, "
+            f"homepage, facet and suggestion entries are kept for at most {LOCAL_CACHE_TIMEOUT} seconds."
+        ),
+        id="shop.W002",
+    )]
+
+
+# Current version number of a cache namespace
+def get_cache_version(namespace):
+    key = f"version:{namespace}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key, 1)
+    return version
+
+
+# Invalidate every key of a namespace by moving to a new version
+def bump_cache_version(namespace):
+    key = f"version:{namespace}"
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time())
+        cache.set(key, version, None)
+        return version
+
+
+# Build a cache key tied to the current namespace version
+def versioned_key(namespace, *parts):
+    return ":".join([namespace, f"v{get_cache_version(namespace)}", *[str(part) for part in parts]])
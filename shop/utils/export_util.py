@@ -0,0 +1,55 @@
+import csv
+from decimal import Decimal
+
+
+# Export value of one field
+def export_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+# Leading characters a spreadsheet reads as the start of a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+# Export value of one CSV cell; text that would run as a formula is prefixed with '
+def csv_value(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return export_value(value)
+
+
+# Text of a CSV cell written by csv_value
+def csv_import_value(value):
+    if isinstance(value, str) and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+# Minimal file object that hands each written CSV line back to the caller
+class LineBuffer:
+    def __init__(self):
+        self.value = ""
+
+    def write(self, text):
+        self.value += text
+
+    def pop(self):
+        value, self.value = self.value, ""
+        return value
+
+
+# Stream a header and rows as CSV text, one chunk per line
+def csv_lines(header, rows):
+    buffer = LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.pop()
+    for row in rows:
+        writer.writerow([csv_value(value) for value in row])
+        yield buffer.pop()
@@ -0,0 +1,57 @@
+from django.conf import settings
+
+
+# Signed cookie holding the cart of a visitor who is not signed in
+GUEST_CART_COOKIE = "zenova_cart"
+GUEST_CART_SALT = "shop.guest_cart"
+GUEST_CART_MAX_AGE = 60 * 60 * 24 * 30
+
+# Keeps the cookie far below the 4 KB browser limit
+GUEST_CART_MAX_LINES = 50
+GUEST_CART_MAX_QUANTITY = 99
+
+
+# Compact "product_id-quantity" pairs joined by dots, e.g. "12-2.40-1"
+def encode_lines(lines):
+    return ".".join(f"{product_id}-{quantity}" for product_id, quantity in lines.items())
+
+
+# Parse an encoded cart, dropping malformed or out-of-range pairs
+def decode_lines(value):
+    lines = {}
+    for pair in (value or "").split("."):
+        product_id, _, quantity = pair.partition("-")
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except ValueError:
+            continue
+        if product_id > 0 and 0 < quantity <= GUEST_CART_MAX_QUANTITY:
+            lines[product_id] = quantity
+        if len(lines) >= GUEST_CART_MAX_LINES:
+            break
+    return lines
+
+
+# Guest cart lines of the request ({product_id: quantity}, empty when missing or tampered)
+def read_guest_cart(request):
+    value = request.get_signed_cookie(
+        GUEST_CART_COOKIE, default="", salt=GUEST_CART_SALT, max_age=GUEST_CART_MAX_AGE
+    )
+    return decode_lines(value)
+
+
+# Store the guest cart lines on the response, deleting the cookie once empty
+def write_guest_cart(response, lines):
+    if not lines:
+        response.delete_cookie(GUEST_CART_COOKIE)
+        return response
+    response.set_signed_cookie(
+        GUEST_CART_COOKIE,
+        encode_lines(lines),
+        salt=GUEST_CART_SALT,
+        max_age=GUEST_CART_MAX_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
@@ -0,0 +1,93 @@
+import json
+import base64
+from django.db.models import Q
+
+
+# JSON-friendly form of a single key value
+def _cursor_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (int, str)) or value is None:
+        return value
+    return str(value)
+
+
+# Encode the key values of a row into an opaque URL-safe cursor
+def encode_cursor(values):
+    raw = json.dumps([_cursor_value(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+# Decode a cursor back into typed key values, None when it is malformed
+def decode_cursor(cursor, model, fields):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(raw, list) or len(raw) != len(fields):
+            return None
+        return [model._meta.get_field(field).to_python(value) for field, value in zip(fields, raw)]
+    except Exception:
+        return None
+
+
+# Build the "strictly after this key" filter for a descending (a, b) ordering
+def _keyset_filter(fields, values, descending):
+    first, second = fields
+    first_value, second_value = values
+    if descending:
+        return Q(**{f"{first}__lte": first_value}) & (
+            Q(**{f"{first}__lt": first_value}) | Q(**{first: first_value, f"{second}__lt": second_value})
+        )
+    return Q(**{f"{first}__gte": first_value}) & (
+        Q(**{f"{first}__gt": first_value}) | Q(**{first: first_value, f"{second}__gt": second_value})
+    )
+
+
+# Clamp a requested page size to the allowed range
+def clamp_page_size(value, default, maximum=100):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+# Keyset pagination over a newest-first (first, second) ordering
+def keyset_paginate(queryset, *, after=None, before=None, page_size=20, fields=("created_at", "id")):
+    model = queryset.model
+    first, second = fields
+    newest_first = (f"-{first}", f"-{second}")
+    oldest_first = (first, second)
+
+    before_values = decode_cursor(before, model, fields) if before else None
+    after_values = decode_cursor(after, model, fields) if not before_values else None
+
+    if before_values:
+        rows = list(
+            queryset.filter(_keyset_filter(fields, before_values, descending=False))
+            .order_by(*oldest_first)[:page_size + 1]
+        )
+        has_prev = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        has_next = True
+    else:
+        if after_values:
+            queryset = queryset.filter(_keyset_filter(fields, after_values, descending=True))
+        rows = list(queryset.order_by(*newest_first)[:page_size + 1])
+        has_next = len(rows) > page_size
+        items = rows[:page_size]
+        has_prev = after_values is not None
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, first), getattr(row, second)])
+
+    return {
+        "items": items,
+        "page_size": page_size,
+        "has_next": has_next and bool(items),
+        "has_prev": has_prev and bool(items),
+        "next_cursor": cursor_for(items[-1]) if items and has_next else None,
+        "prev_cursor": cursor_for(items[0]) if items and has_prev else None,
+    }
@@ -1,39 +1,95 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils.text import slugify
-import random
-import string
 
 
-# Auto generate slug 
-def generate_unique_slug(model, name, provided_slug=None):
-    base_slug = slugify(provided_slug or name)
-    slug = base_slug
-    counter = 1
+# Names resolved per prefix query
+UNIQUE_BATCH_SIZE = 500
 
-    # Ensure uniqueness
-    while model.objects.filter(slug=slug).exists():
-        random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4))
-        slug = f"{base_slug}-{random_suffix}"
-        counter += 1
-        if counter > 20:
-            raise ValueError("Unable to generate a unique slug after 20 attempts.")
+# Attempts made when a concurrent insert takes a reserved value
+UNIQUE_RETRIES = 3
 
-    return slug
+
+# Slug base of a name, shortened so a "-<n>" suffix still fits the column
+def _base_value(value, max_length, fallback):
+    base = slugify(value or "") or fallback
+    return base[:max(1, max_length - 7)].rstrip("-") or fallback
+
+
+# Taken values of a field that start with any of the given bases, in one query
+def _taken_values(model, field, bases, exclude_pk=None):
+    prefix = Q()
+    for base in bases:
+        prefix |= Q(**{f"{field}__startswith": base})
+    queryset = model.objects.filter(prefix)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return set(queryset.values_list(field, flat=True))
+
+
+# Reserve unique slug-style values for many names (provided values win over names)
+def generate_unique_values(model, field, names, provided=None, exclude_pk=None, reserved=()):
+    provided = provided or [None] * len(names)
+    max_length = model._meta.get_field(field).max_length or 50
+    fallback = model._meta.model_name
+    bases = [_base_value(given or name, max_length, fallback) for name, given in zip(names, provided)]
+    values = []
+    for start in range(0, len(bases), UNIQUE_BATCH_SIZE):
+        chunk = bases[start:start + UNIQUE_BATCH_SIZE]
+        taken = _taken_values(model, field, set(chunk), exclude_pk) | set(values) | set(reserved)
+        for base in chunk:
+            value = base
+            counter = 2
+            while value in taken:
+                value = f"{base}-{counter}"
+                counter += 1
+            taken.add(value)
+            values.append(value)
+    return values
+
+
+# Auto generate slug
+def generate_unique_slug(model, name, provided_slug=None, exclude_pk=None):
+    return generate_unique_values(model, "slug", [name], [provided_slug], exclude_pk)[0]
 
 
 # Auto generate skg
-def generate_unique_skg(model, name, provided_sku=None):
-    base_sku = slugify(provided_sku or name).lower() 
-    sku = base_sku
-    counter = 1
+def generate_unique_skg(model, name, provided_sku=None, exclude_pk=None):
+    return generate_unique_values(model, "sku", [name], [provided_sku], exclude_pk)[0]
+
+
+# True when an IntegrityError comes from the field's own unique index, the only one worth retrying
+def _is_value_conflict(model, field, error):
+    table = model._meta.db_table
+    column = model._meta.get_field(field).column
+    constraint = getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+    if constraint:
+        return constraint.startswith(f"{table}_{column}_")
+    # SQLite names the column instead of the constraint
+    return f"UNIQUE constraint failed: {table}.{column}" in str(error)
 
-    # Ensure uniqueness using the 'sku' field
-    while model.objects.filter(sku=sku).exists():
-        random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        sku = f"{base_sku}-{random_suffix}"
-        counter += 1
-        if counter > 20:
-            raise ValueError("Unable to generate a unique SKU after 20 attempts.")
 
-    return sku
+# Bulk insert objects with unique values of a field, retrying when a race takes one
+def bulk_create_unique(model, objects, field, names, provided=None, **options):
+    for attempt in range(UNIQUE_RETRIES):
+        values = generate_unique_values(model, field, names, provided)
+        for obj, value in zip(objects, values):
+            setattr(obj, field, value)
+        try:
+            with transaction.atomic():
+                return model.objects.bulk_create(objects, **options)
+        except IntegrityError as e:
+            if attempt == UNIQUE_RETRIES - 1 or not _is_value_conflict(model, field, e):
+                raise
 
 
+# Create one object with a unique value of a field, retrying when a race takes it
+def create_unique(model, field, source, provided=None, /, **fields):
+    for attempt in range(UNIQUE_RETRIES):
+        value = generate_unique_values(model, field, [source], [provided])[0]
+        try:
+            with transaction.atomic():
+                return model.objects.create(**{field: value}, **fields)
+        except IntegrityError as e:
+            if attempt == UNIQUE_RETRIES - 1 or not _is_value_conflict(model, field, e):
+                raise
@@ -1,26 +1,59 @@
+import json
 from django.views import View
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import HttpResponseServerError
+from django.http import HttpResponseServerError, JsonResponse
 from shop.services import cart_service
+from shop.utils import guest_cart_util
 from decorators import signin_required,customer_required,inject_authenticated_user
 from shop.models import Product
 
 
+# Visitors who are not signed in keep their cart in a signed cookie
+def is_guest(request):
+    return not request.session.get('is_authenticated')
+
+
+# Redirect to the cart, storing the guest cart lines when they changed
+def redirect_guest_cart(lines):
+    response = redirect('cart_detail')
+    if lines is not None:
+        guest_cart_util.write_guest_cart(response, lines)
+    return response
+
+
+# JSON body of a batch cart update
+def batch_update_response(result, summary):
+    return {
+        "updated": result["updated"],
+        "removed": result["removed"],
+        "errors": [{"sku": sku, "error": message} for sku, message in result["errors"]],
+        "items": [
+            {"sku": item.product.sku, "quantity": item.quantity, "line_total": f"{item.line_total:.2f}"}
+            for item in summary["items"]
+        ],
+        "item_count": summary["item_count"],
+        "subtotal": f"{summary['subtotal']:.2f}",
+        "discount": f"{summary['discount']:.2f}",
+        "grand_total": f"{summary['grand_total']:.2f}",
+    }
+
+
 
 # Cart Detail View
 class CartDetailView(View):
+    def get(self, request):
+        if is_guest(request):
+            summary = cart_service.get_guest_cart_summary(guest_cart_util.read_guest_cart(request))
+            return render(request, "cart/cart_detail.html", {"guest": True, **summary})
+        return self.customer_get(request)
+
     @signin_required
     @customer_required
     @inject_authenticated_user
-    def get(self, request):
-        cart = cart_service.get_cart(request.user)
-        items = cart_service.get_cart_items(request.user)
-        totals = cart_service.calculate_cart_total(cart, request)
-        return render(request, "cart/cart_detail.html", {
-            "items": items,
-            **totals
-        })
+    def customer_get(self, request):
+        summary = cart_service.get_cart_summary(request.user, request)
+        return render(request, "cart/cart_detail.html", summary)
 
 
 # Add Item to Cart
@@ -30,12 +63,9 @@ class CartAddItemView(View):
     @inject_authenticated_user
     def get(self, request):
         products = Product.objects.all()
-        items = cart_service.get_cart_items(request.user)
-        return render(request, 'cart/cart_detail.html', {'products': products , 'items':items})
+        summary = cart_service.get_cart_summary(request.user, request)
+        return render(request, 'cart/cart_detail.html', {'products': products, **summary})
 
-    @signin_required
-    @customer_required
-    @inject_authenticated_user
     def post(self, request):
         product_id = request.POST.get('product_id')
         quantity_raw = request.POST.get('quantity')
@@ -45,6 +75,19 @@ class CartAddItemView(View):
                 quantity = 1
         except (TypeError, ValueError):
             quantity = 1
+        if is_guest(request):
+            lines = cart_service.add_guest_item(guest_cart_util.read_guest_cart(request), product_id, quantity)
+            if lines:
+                messages.success(request, "Item added to cart.")
+            else:
+                messages.error(request, "Failed to add item to cart.")
+            return redirect_guest_cart(lines)
+        return self.customer_post(request, product_id, quantity)
+
+    @signin_required
+    @customer_required
+    @inject_authenticated_user
+    def customer_post(self, request, product_id, quantity):
         try:
             item = cart_service.add_item(request.user, product_id, quantity)
             if item:
@@ -65,13 +108,25 @@ class CartUpdateItemView(View):
     def get(self, request):
         return render(request, 'cart/cart_updateitem.html')
 
-    @signin_required
-    @customer_required
-    @inject_authenticated_user
     def post(self, request):
         product_sku = (request.POST.get('product_sku') or '').strip()
         expected_sku = (request.POST.get('expected_sku') or '').strip()
         quantity = request.POST.get('quantity')
+        if is_guest(request):
+            lines = cart_service.update_guest_item(
+                guest_cart_util.read_guest_cart(request), product_sku, quantity, expected_sku=expected_sku
+            )
+            if lines is not None:
+                messages.success(request, "Cart updated.")
+            else:
+                messages.error(request, "Failed to update cart. SKU mismatch or invalid quantity.")
+            return redirect_guest_cart(lines)
+        return self.customer_post(request, product_sku, expected_sku, quantity)
+
+    @signin_required
+    @customer_required
+    @inject_authenticated_user
+    def customer_post(self, request, product_sku, expected_sku, quantity):
         try:
             item = cart_service.update_item(request.user, product_sku, quantity, expected_sku=expected_sku)
             if item:
@@ -84,6 +139,32 @@ class CartUpdateItemView(View):
         return redirect('cart_detail')
 
 
+# Update many Items in Cart (JSON)
+class CartBatchUpdateView(View):
+    def post(self, request):
+        try:
+            payload = json.loads(request.body or b"{}")
+            changes = [(line.get("sku"), line.get("quantity")) for line in payload.get("items", [])]
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({"error": "Invalid request body."}, status=400)
+        if is_guest(request):
+            lines, result = cart_service.update_guest_items(guest_cart_util.read_guest_cart(request), changes)
+            summary = cart_service.get_guest_cart_summary(lines)
+            response = JsonResponse(batch_update_response(result, summary))
+            return guest_cart_util.write_guest_cart(response, lines)
+        return self.customer_post(request, changes)
+
+    @signin_required
+    @customer_required
+    @inject_authenticated_user
+    def customer_post(self, request, changes):
+        result = cart_service.update_items(request.user, changes)
+        if result is None:
+            return JsonResponse({"error": "Unable to update the cart."}, status=500)
+        summary = cart_service.get_cart_summary(request.user, request)
+        return JsonResponse(batch_update_response(result, summary))
+
+
 # Remove Item from Cart
 class CartRemoveItemView(View):
     @signin_required
@@ -92,12 +173,24 @@ class CartRemoveItemView(View):
     def get(self, request):
         return render(request, 'cart/cart_removeitem.html')
 
-    @signin_required
-    @customer_required
-    @inject_authenticated_user
     def post(self, request):
         product_sku = (request.POST.get('product_sku') or '').strip()
         expected_sku = (request.POST.get('expected_sku') or '').strip()
+        if is_guest(request):
+            lines = cart_service.remove_guest_item(
+                guest_cart_util.read_guest_cart(request), product_sku, expected_sku=expected_sku
+            )
+            if lines is not None:
+                messages.success(request, "Item removed from cart.")
+            else:
+                messages.error(request, "Failed to remove item. SKU mismatch or item not found.")
+            return redirect_guest_cart(lines)
+        return self.customer_post(request, product_sku, expected_sku)
+
+    @signin_required
+    @customer_required
+    @inject_authenticated_user
+    def customer_post(self, request, product_sku, expected_sku):
         try:
             success = cart_service.remove_item(request.user, product_sku, expected_sku=expected_sku)
             if success:
@@ -118,10 +211,16 @@ class CartClearView(View):
     def get(self, request):
         return render(request, 'cart/cart_clear.html')
 
+    def post(self, request):
+        if is_guest(request):
+            messages.success(request, "Cart cleared.")
+            return redirect_guest_cart({})
+        return self.customer_post(request)
+
     @signin_required
     @customer_required
     @inject_authenticated_user
-    def post(self, request):
+    def customer_post(self, request):
         try:
             success = cart_service.clear_cart(request.user)
             if success:
@@ -79,7 +79,7 @@ class CouponDeleteView(View):
     @login_admin_required_with_user
     def get(self, request, coupon_id):
         try:
-            coupon = Coupon.objects.get(id=coupon_id)
+            coupon = Coupon.objects.select_related("created_by").get(id=coupon_id)
             return render(request, 'coupon/coupon_delete.html', {'coupon': coupon})
         except Coupon.DoesNotExist:
             messages.error(request, "Coupon not found.")
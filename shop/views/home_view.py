@@ -9,7 +9,7 @@ class HomeView(TemplateView):
     template_name = "home_page.html"  
 
     def get(self, request, *args, **kwargs):
-        context = get_homepage_context(request.user)
+        context = get_homepage_context(request.session.get("user_id"))
         if request.session.get("show_welcome", False):
             messages.success(request, f"Welcome back, {request.user.first_name} 👋")
             request.session["show_welcome"] = False
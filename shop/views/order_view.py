@@ -1,4 +1,5 @@
 from django.views import View
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from decorators import signin_required,customer_required,inject_authenticated_user,login_admin_required
@@ -13,12 +14,11 @@ class OrderPreviewView(View):
     @customer_required
     @inject_authenticated_user
     def get(self, request):
-        cart = request.user.cart
-        if not cart.items.exists():
+        cart_totals = cart_service.get_cart_summary(request.user, request)
+        if not cart_totals["items"]:
             messages.warning(request, "Your cart is empty.")
             return redirect("cart_detail")
-        cart_totals = cart_service.calculate_cart_total(cart, request)
-        return render(request,"order/order_detail.html",{"cart": cart, "cart_totals": cart_totals})
+        return render(request,"order/order_detail.html",{"cart": cart_totals["cart"], "items": cart_totals["items"], "cart_totals": cart_totals})
 
     @signin_required
     @customer_required
@@ -33,24 +33,33 @@ class OrderCreateView(View):
     @customer_required
     @inject_authenticated_user
     def get(self, request):
-        cart = request.user.cart
-        if not cart.items.exists():
+        cart_totals = cart_service.get_cart_summary(request.user, request)
+        if not cart_totals["items"]:
             messages.error(request, "Cart is empty.")
             return redirect("cart_detail")
-        cart_totals = cart_service.calculate_cart_total(cart, request)
-        return render(request,"order/order_create.html",{"cart": cart, "cart_totals": cart_totals})
+        return render(request,"order/order_create.html",{
+            "cart": cart_totals["cart"],
+            "items": cart_totals["items"],
+            "cart_totals": cart_totals,
+            "idempotency_key": order_service.new_idempotency_key(),
+        })
 
     @signin_required
     @customer_required
     @inject_authenticated_user
     def post(self, request):
         try:
-            cart = request.user.cart
-            cart_totals = cart_service.calculate_cart_total(cart, request)
+            # A retried or double-clicked form returns the order it already created
+            idempotency_key = order_service.clean_idempotency_key(request.POST.get("idempotency_key"))
+            order = order_service.get_order_for_key(user=request.user, idempotency_key=idempotency_key)
+            if order:
+                return redirect("payment:choose_method", order_id=order.id)
+            cart_totals = cart_service.get_cart_summary(request.user, request)
             order = order_service.create_order_from_cart(
                 user=request.user,
-                cart=cart,
+                cart=cart_totals["cart"],
                 cart_totals=cart_totals,
+                idempotency_key=idempotency_key,
             )
             messages.success(request, "Order created successfully.")
             return redirect("payment:choose_method", order_id=order.id)
@@ -67,11 +76,22 @@ class OrderListAdminView(View):
     @login_admin_required
     def get(self, request):
         try:
-            orders = order_service.get_all_orders_for_admin()
+            filters = order_service.parse_admin_filters(request.GET)
+            page = order_service.get_admin_order_page(
+                filters,
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+                page_size=request.GET.get("page_size"),
+            )
             return render(
                 request,
                 "order/order_listadmin.html",
-                {"orders": orders}
+                {
+                    "orders": page["items"],
+                    "page": page,
+                    "filters": filters,
+                    "statuses": order_service.ORDER_STATUSES,
+                }
             )
         except Exception as e:
             print(f"[OrderListAdminView] Error: {e}")
@@ -79,6 +99,16 @@ class OrderListAdminView(View):
             return redirect("admin_dashboard")
 
 
+# Order Export for Admin (CSV of the filtered orders, streamed)
+class OrderExportAdminView(View):
+    @login_admin_required
+    def get(self, request):
+        filters = order_service.parse_admin_filters(request.GET)
+        response = StreamingHttpResponse(order_service.export_orders(filters), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="orders.csv"'
+        return response
+
+
 # Order Cancelation
 class OrderCancelView(View):
     @signin_required
@@ -106,11 +136,27 @@ class OrderListCustomerView(View):
     @inject_authenticated_user
     def get(self, request):
         try:
-            orders = order_service.get_orders_for_user(user=request.user)
+            page = order_service.get_order_page(
+                user=request.user,
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+                page_size=request.GET.get("page_size"),
+            )
+            # Only the expanded order reads its items
+            expanded_id = request.GET.get("expand")
+            expanded_items = []
+            if expanded_id and expanded_id.isdigit():
+                expanded_id = int(expanded_id)
+                expanded_items = order_service.get_order_items(user=request.user, order_id=expanded_id)
             return render(
                 request,
                 "order/order_list.html",
-                {"orders": orders}
+                {
+                    "orders": page["items"],
+                    "page": page,
+                    "expanded_id": expanded_id,
+                    "expanded_items": expanded_items,
+                }
             )
         except Exception as e:
             print(f"[OrderListCustomerView] Error: {e}")
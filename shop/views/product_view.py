@@ -1,9 +1,12 @@
+import io
 from django.views import View
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import  HttpResponseNotFound
-from shop.services import product_service,review_service
+from django.http import  HttpResponseNotFound, JsonResponse, StreamingHttpResponse
+from shop.services import product_service,review_service,search_service,facet_service,tag_service,product_io_service,availability_service
 from shop.models import Category
+from shop.utils import validation_utils
+from user.models import User
 from decorators.auth_decorators import login_admin_required,signin_required,customer_required
 from user.utils.auth_status import get_user_login_status
 
@@ -11,16 +14,40 @@ from user.utils.auth_status import get_user_login_status
 
 # Product List View
 class ProductListView(View):
-    def get(self, request):
+    def get(self, request, tag_slug=None):
         products = []
+        page = None
+        facets = None
+        filters = facet_service.parse_filters(request.GET)
+        tag = None
+        if tag_slug:
+            tag = tag_service.get_tag_by_slug(tag_slug)
+            if not tag:
+                return HttpResponseNotFound("Tag not found.")
+            filters["tag"] = tag.name
         try:
-            products = product_service.get_all_products()
+            page = product_service.get_product_page(
+                after=request.GET.get('after'),
+                before=request.GET.get('before'),
+                page_size=request.GET.get('page_size'),
+                filters=filters,
+                sort=request.GET.get('sort', 'newest'),
+            )
+            products = page["items"]
+            facets = product_service.get_product_facets(filters)
             print(f"[ProductListView] Loaded {len(products)} products")
         except Exception as e:
             print(f"[ProductListView] Error: {e}")
             messages.error(request, "Failed to load products.")
         
-        return render(request, 'product/product_list.html', {'products': products})
+        return render(request, 'product/product_list.html', {
+            'products': products,
+            'page': page,
+            'facets': facets,
+            'filters': filters,
+            'current_tag': tag,
+            'sort': request.GET.get('sort', 'newest'),
+        })
 
 
 
@@ -30,13 +57,13 @@ class ProductDetailView(View):
         product = product_service.get_product_by_id(product_id)
         if not product:
             return HttpResponseNotFound("Product not found.")
-        reviews = review_service.get_product_reviews(product_id)
         is_logged_in, active_user, user_role = get_user_login_status(request)
-        user_review = None
-        if is_logged_in and active_user:
-            user_review = reviews.filter(user=active_user).first()
+        reviews, user_review = review_service.get_reviews_with_user_review(
+            product_id, active_user if is_logged_in else None
+        )
         context = {
             "product": product,
+            "product_tags": product.tag_items.order_by("name"),
             "reviews": reviews,
             "user_review": user_review,
             "is_logged_in": is_logged_in,
@@ -129,14 +156,61 @@ class ProductLListAdminView(View):
     @login_admin_required
     def get(self, request):
         try:
-            products = product_service.get_all_products(active_only=False)
-            return render(request, 'product/product_listadmin.html', {'products': products})
+            page = product_service.get_product_page(
+                active_only=False,
+                after=request.GET.get('after'),
+                before=request.GET.get('before'),
+                page_size=request.GET.get('page_size'),
+            )
+            return render(request, 'product/product_listadmin.html', {'products': page["items"], 'page': page})
         except Exception as e:
             print(f"[ProductLListAdminView] Error: {e}")
             messages.error(request, "Failed to load admin product list.")
             return redirect('admin_dashboard')
 
 
+# Product Bulk Import View
+class ProductImportView(View):
+    @login_admin_required
+    def get(self, request):
+        return render(request, 'product/product_import.html')
+
+    @login_admin_required
+    def post(self, request):
+        upload = request.FILES.get('file')
+        fmt = product_io_service.detect_format(upload.name if upload else None, request.POST.get('format') or None)
+        if not upload or not fmt:
+            messages.error(request, "Upload a .csv or .jsonl file.")
+            return redirect('product_import')
+        try:
+            created_by = User.objects.get(id=request.session.get('user_id'))
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            overwrite_stock = validation_utils.parse_boolean(request.POST.get('overwrite_stock'))
+            result = product_io_service.import_products(stream, fmt, created_by, overwrite_stock=overwrite_stock)
+        except Exception as e:
+            print(f"[ProductImportView] Error: {e}")
+            messages.error(request, "Failed to import products.")
+            return redirect('product_import')
+        if result["created"] or result["updated"]:
+            messages.success(request, f"Imported {result['created']} new and {result['updated']} updated products.")
+        if result["error_count"]:
+            messages.warning(request, f"{result['error_count']} rows were rejected.")
+        return render(request, 'product/product_import.html', {'result': result})
+
+
+# Product Bulk Export View
+class ProductExportView(View):
+    @login_admin_required
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in product_io_service.IMPORT_FORMATS:
+            fmt = 'csv'
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(product_io_service.export_products(fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+
 # Product Search View
 class ProductSearchView(View):
     @signin_required
@@ -144,16 +218,16 @@ class ProductSearchView(View):
     def get(self, request):
         query = request.GET.get('q', '').strip()
         filter_type = request.GET.get('filter', 'manual') 
+        filters = facet_service.parse_filters(request.GET)
         try:
-            results = product_service.search_products(query)
-            if filter_type == "cheap":
-                results = results.order_by("price")  
-            elif filter_type == "expensive":
-                results = results.order_by("-price")
+            results = product_service.search_products(query, sort=filter_type, filters=filters)
+            facets = product_service.get_product_facets(filters, query=query) if query else None
             return render(request, 'product/product_search.html', {
                 'query': query,
-                'results': results,
-                'filter_type': filter_type
+                'results': results[:search_service.SEARCH_RESULT_LIMIT],
+                'filter_type': filter_type,
+                'facets': facets,
+                'filters': filters,
             })
         except Exception as e:
             print(f"[ProductSearchView] Error: {e}")
@@ -165,3 +239,30 @@ class ProductSearchView(View):
             })
 
 
+# Product Suggest View (search box autocomplete)
+class ProductSuggestView(View):
+    def get(self, request):
+        query = request.GET.get('q', '')
+        try:
+            limit = int(request.GET.get('limit', 8))
+        except (TypeError, ValueError):
+            limit = 8
+        try:
+            return JsonResponse(search_service.suggest(query, limit=limit))
+        except Exception as e:
+            print(f"[ProductSuggestView] Error: {e}")
+            return JsonResponse({"query": query, "products": [], "categories": [], "did_you_mean": None}, status=500)
+
+
+# Product Availability View (stock status of many SKUs and ids)
+class ProductAvailabilityView(View):
+    def get(self, request):
+        skus = [sku for value in request.GET.getlist('sku') for sku in value.split(',')]
+        ids = [product_id for value in request.GET.getlist('id') for product_id in value.split(',') if product_id.strip()]
+        if len(skus) + len(ids) > availability_service.MAX_AVAILABILITY_LOOKUPS:
+            return JsonResponse({"error": f"At most {availability_service.MAX_AVAILABILITY_LOOKUPS} products per request."}, status=400)
+        try:
+            items = availability_service.get_availability(skus=skus, product_ids=[int(product_id) for product_id in ids])
+        except ValueError:
+            return JsonResponse({"error": "Product ids must be integers."}, status=400)
+        return JsonResponse({"items": items})
@@ -10,11 +10,10 @@ from constants.enums import Role
 # Product Review List
 class ProductReviewListView(View):
     def get(self, request, product_id):
-        reviews = review_service.get_product_reviews(product_id)
         is_logged_in, active_user, user_role = get_user_login_status(request)
-        user_review = None
-        if is_logged_in and active_user:
-            user_review = reviews.filter(user=active_user).first()
+        reviews, user_review = review_service.get_reviews_with_user_review(
+            product_id, active_user if is_logged_in else None
+        )
         return render(request, "review/review_list.html", {
             "reviews": reviews,
             "product_id": product_id,
@@ -4,7 +4,7 @@ from django.contrib import messages
 from constants.enums import Role
 from shop.services import shipment_service
 from shop.models import Shipment
-from decorators import signin_required,staff_view_required,customer_required,login_admin_required
+from decorators import signin_required,staff_view_required,customer_required,login_admin_required,inject_authenticated_user
 from django.utils.decorators import method_decorator
 
 
@@ -52,7 +52,7 @@ class StaffShipmentListView(View):
 @method_decorator(staff_view_required, name='dispatch')
 class StaffMarkShipmentShippedView(View):
     def get(self, request, shipment_id):
-        shipment = get_object_or_404(Shipment, id=shipment_id)
+        shipment = get_object_or_404(Shipment.objects.select_related("order"), id=shipment_id)
         return render(request, 'shipment/staff_mark_shipped.html', {'shipment': shipment})
 
     def post(self, request, shipment_id):
@@ -85,7 +85,7 @@ class StaffMarkShipmentShippedView(View):
 @method_decorator(staff_view_required, name='dispatch')
 class StaffMarkShipmentDeliveredView(View):
     def get(self, request, shipment_id):
-        shipment = get_object_or_404(Shipment, id=shipment_id)
+        shipment = get_object_or_404(Shipment.objects.select_related("order"), id=shipment_id)
         return render(request, "shipment/staff_mark_delivered.html", {'shipment': shipment})
     
     def post(self, request, shipment_id):
@@ -118,8 +118,9 @@ class StaffMarkShipmentDeliveredView(View):
 class ShipmentDetailView(View):
     @signin_required
     @customer_required
+    @inject_authenticated_user
     def get(self,request):
-        shipment = shipment_service.get_shipment()
+        shipment = shipment_service.get_shipment(request.user)
         return render(request,'shipment/detail.html',{'shipment':shipment})
 
  
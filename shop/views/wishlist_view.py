@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect
 from django.views import View
 from decorators import signin_required, customer_required, inject_authenticated_user
-from shop.services import wishlist_service 
+from shop.services import wishlist_service, availability_service
 
 
 
@@ -11,7 +11,7 @@ class WishlistListView(View):
     @customer_required
     @inject_authenticated_user
     def get(self, request):
-        wishlist_items = wishlist_service.get_user_wishlist(request.user)
+        wishlist_items = availability_service.annotate_items(list(wishlist_service.get_user_wishlist(request.user)))
         return render(request, "wishlist/wishlist.html", {"wishlist": wishlist_items})
 
 
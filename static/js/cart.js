@@ -92,3 +92,74 @@ document.getElementById('removeSKUInput').addEventListener('input', function(){
 });
 
 
+// Quantity edits are collected and sent together once typing pauses
+(function() {
+    var table = document.getElementById('cartTable');
+    if (!table) return;
+    var csrf = document.querySelector('[name=csrfmiddlewaretoken]').value;
+    var message = document.getElementById('cartBatchMessage');
+    var pending = {};
+    var timer = null;
+
+    table.querySelectorAll('.cart-qty').forEach(function(input) {
+        input.addEventListener('input', function() {
+            var quantity = parseInt(input.value, 10);
+            if (isNaN(quantity) || quantity < 0) return;
+            pending[input.dataset.sku] = quantity;
+            clearTimeout(timer);
+            timer = setTimeout(flushCartEdits, 600);
+        });
+    });
+
+    function flushCartEdits() {
+        var items = Object.keys(pending).map(function(sku) {
+            return {sku: sku, quantity: pending[sku]};
+        });
+        pending = {};
+        if (!items.length) return;
+        fetch(table.dataset.batchUrl, {
+            method: 'POST',
+            headers: {'X-CSRFToken': csrf, 'Content-Type': 'application/json'},
+            body: JSON.stringify({items: items})
+        })
+        .then(function(res) { return res.json(); })
+        .then(renderCartUpdate)
+        .catch(function() {
+            message.className = 'small mb-3 text-danger';
+            message.textContent = 'Could not update the cart. Please reload the page.';
+        });
+    }
+
+    function renderCartUpdate(data) {
+        if (data.error) {
+            message.className = 'small mb-3 text-danger';
+            message.textContent = data.error;
+            return;
+        }
+        if (!data.items.length) {
+            window.location.reload();
+            return;
+        }
+        var lines = {};
+        data.items.forEach(function(item) { lines[item.sku] = item; });
+        table.querySelectorAll('tbody tr[data-sku]').forEach(function(row) {
+            var line = lines[row.dataset.sku];
+            if (!line) {
+                row.remove();
+                return;
+            }
+            row.querySelector('.line-total').textContent = line.line_total;
+            var input = row.querySelector('.cart-qty');
+            if (document.activeElement !== input) input.value = line.quantity;
+        });
+        table.querySelectorAll('.cart-subtotal').forEach(function(el) { el.textContent = data.subtotal; });
+        table.querySelectorAll('.cart-grand-total').forEach(function(el) { el.textContent = data.grand_total; });
+        if (data.errors.length) {
+            message.className = 'small mb-3 text-danger';
+            message.textContent = data.errors.map(function(e) { return e.sku + ': ' + e.error; }).join(' ');
+        } else {
+            message.className = 'small mb-3 text-success';
+            message.textContent = 'Cart updated.';
+        }
+    }
+})();
@@ -6,4 +6,37 @@
         } else {
             nav.classList.remove('scrolled');
         }
-    });
\ No newline at end of file
+    });
+
+    // Search box autocomplete
+    (function() {
+        const input = document.querySelector('input[data-suggest-url]');
+        if (!input) return;
+        const list = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                list.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(function() {
+                fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(query))
+                    .then(res => res.json())
+                    .then(data => {
+                        list.innerHTML = '';
+                        const values = [];
+                        if (data.did_you_mean) values.push(data.did_you_mean);
+                        data.products.forEach(p => values.push(p.name));
+                        data.categories.forEach(c => values.push(c.name));
+                        [...new Set(values)].forEach(value => {
+                            const option = document.createElement('option');
+                            option.value = value;
+                            list.appendChild(option);
+                        });
+                    })
+                    .catch(() => {});
+            }, 150);
+        });
+    })();
@@ -1,6 +1,7 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from user.models.otp_model import EmailOTP as OTP
+from user.utils.auth_status import get_session_user
 
 
 # Middleware to enforce OTP verification before accessing certain views
@@ -11,10 +12,10 @@ class OTPVerificationMiddleware:
     def __call__(self, request):
         if request.path.startswith("/admin/") or request.path.startswith("/static/"):
             return self.get_response(request)
-        user_id = request.session.get("user_id")
-        if user_id:
+        user = get_session_user(request)
+        if user:
             try:
-                otp_obj = OTP.objects.get(user_id=user_id)
+                otp_obj = user.otps
                 if not otp_obj.is_verified:
                     if not request.path.startswith(reverse("otp_verify")) and not request.path.startswith(reverse("otp_resend")):
                         return redirect("otp_verify")
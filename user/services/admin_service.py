@@ -2,8 +2,12 @@ from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth import logout
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
+from django.db.models import Count, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404
 from user.models import User
 from constants.enums import Role
+from user.utils.auth_status import get_session_user
 from shop.models import Product, Category, Review, Shipment,Order,Wishlist
 
 
@@ -76,26 +80,37 @@ def delete_admin(pk: int):
         return False, str(e)
 
 
+# Row count of a queryset as a scalar subquery
+def _count_of(queryset):
+    return Coalesce(
+        Subquery(queryset.order_by().values(one=Value(1)).annotate(total=Count("*")).values("total")[:1]),
+        0,
+    )
+
+
 # Admin Dashboard
 def get_dashboard_data(request):
     try:
-        user_id = request.session.get('user_id')
-        if not user_id:
+        admin = get_session_user(request)
+        if not admin:
             return None, "User not authenticated."
+        if admin.role != Role.ADMIN:
+            raise Http404("Admin not found.")
 
-        admin = get_object_or_404(User, pk=user_id, role=Role.ADMIN)
-        return {
-            "admin": admin,
-            "total_admins": User.objects.filter(role=Role.ADMIN).count(),
-            "total_staff": User.objects.filter(role=Role.ENDUSER_STAFF).count(),
-            "total_customers": User.objects.filter(role=Role.ENDUSER_CUSTOMER).count(),
-            "total_products": Product.objects.count(),
-            "total_categories": Category.objects.count(),
-            "total_reviews": Review.objects.count(),
-            "total_shipments": Shipment.objects.count(),
-            "total_orders": Order.objects.count(),
-            "total_wishlists": Wishlist.objects.count(),
-        }, None
+        counts = {
+            "total_admins": _count_of(User.objects.filter(role=Role.ADMIN)),
+            "total_staff": _count_of(User.objects.filter(role=Role.ENDUSER_STAFF)),
+            "total_customers": _count_of(User.objects.filter(role=Role.ENDUSER_CUSTOMER)),
+            "total_products": _count_of(Product.objects.all()),
+            "total_categories": _count_of(Category.objects.all()),
+            "total_reviews": _count_of(Review.objects.all()),
+            "total_shipments": _count_of(Shipment.objects.all()),
+            "total_orders": _count_of(Order.objects.all()),
+            "total_wishlists": _count_of(Wishlist.objects.all()),
+        }
+        # Every total in a single query
+        stats = User.objects.filter(pk=admin.pk).annotate(**counts).values(*counts).get()
+        return {"admin": admin, **stats}, None
     except Exception as e:
         return None, str(e)
 
@@ -0,0 +1,87 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from shop.tests import QueryBudgetMixin, seed_store
+from user.models.otp_model import EmailOTP
+from user.services import otp_service
+
+
+# Query budgets of every user page
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = seed_store()
+
+    def test_anonymous_pages(self):
+        self.assertBudgets([
+            (0, reverse("user_login"), None, 200),
+            (0, reverse("user_profile_creation"), None, 200),
+            (0, reverse("admin_login"), None, 200),
+            (0, reverse("admin_signup"), None, 200),
+            (0, reverse("help"), None, 302),
+        ])
+
+    def test_admin_pages(self):
+        admin = self.store["admin"]
+        self.assertBudgets([
+            (3, reverse("admin_dashboard"), admin, 200),
+            (3, reverse("admin_update", args=[admin.id]), admin, 200),
+        ])
+
+    def test_customer_pages(self):
+        customer = self.store["customer"]
+        address = customer.addresses.first()
+        self.assertBudgets([
+            (3, reverse("customer_dashboard"), customer, 200),
+            (3, reverse("user_profile", args=[customer.id]), customer, 200),
+            (2, reverse("user_profile_update", args=[customer.id]), customer, 200),
+            (2, reverse("user_delete", args=[customer.id]), customer, 200),
+            (3, reverse("user_address_create", args=[customer.id]), customer, 302),
+            (3, reverse("user_address_update", args=[customer.id, address.id]), customer, 200),
+            (2, reverse("help"), customer, 200),
+        ])
+
+    def test_staff_pages(self):
+        staff = self.store["staff"]
+        self.assertBudgets([
+            (3, reverse("staff_dashboard"), staff, 200),
+        ])
+
+    def test_sign_out(self):
+        self.assertQueryBudget(4, reverse("user_logout"), self.store["customer"], status=302)
+        self.assertQueryBudget(4, reverse("admin_logout"), self.store["admin"], status=302)
+
+    def test_admin_delete(self):
+        admin = self.store["admin"]
+        self.assertQueryBudget(2, reverse("admin_delete", args=[admin.id]), admin)
+        # The cascade runs one query per related table, however many rows the admin owns
+        self.assertQueryBudget(31, reverse("admin_delete", args=[admin.id]), admin, method="post", status=302)
+
+
+# Query budgets of the OTP pages; sending the mail is the locmem backend's job
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OTPQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = seed_store()
+
+    def test_forms(self):
+        self.assertBudgets([
+            (0, reverse(name), None, 200)
+            for name in ("otp_request", "otp_verify", "otp_resend")
+        ])
+
+    def test_request_and_resend(self):
+        email = {"email": self.store["staff"].email}
+        self.assertQueryBudget(5, reverse("otp_request"), method="post", data=email, status=302)
+        self.assertQueryBudget(6, reverse("otp_resend"), method="post", data=email, status=302)
+
+    def test_verify(self):
+        staff = self.store["staff"]
+        EmailOTP.objects.filter(user=staff).update(
+            code=otp_service._hash_otp("654321"), created_at=timezone.now(), is_verified=False,
+        )
+        self.assertQueryBudget(
+            3, reverse("otp_verify"), method="post",
+            data={"email": staff.email, "otp_code": "654321"}, status=302,
+        )
@@ -2,9 +2,37 @@ from django.contrib.auth import get_user_model
 from user.utils.session_utils import get_user_role
 
 
-# User Login Status
+# Session user with its OTP record (loaded once per request)
+def get_session_user(request):
+    user_id = request.session.get("user_id")
+    cached = getattr(request, "_session_user", None)
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
+    user = None
+    if user_id:
+        user = get_user_model().objects.select_related("otps").filter(id=user_id).first()
+    try:
+        request._session_user = (user_id, user)
+    except AttributeError:
+        pass
+    return user
+
+
+# User Login Status (resolved once per request)
 def get_user_login_status(request):
-    User = get_user_model()
+    cached = getattr(request, "_login_status", None)
+    if cached is not None:
+        return cached
+    status = _resolve_login_status(request)
+    try:
+        request._login_status = status
+    except AttributeError:
+        pass
+    return status
+
+
+# Resolve the login status from request.user or the session
+def _resolve_login_status(request):
     user_obj = None
     user_role = None
     is_logged_in = False
@@ -16,16 +44,10 @@ def get_user_login_status(request):
             user_obj = user
             user_role = getattr(user, "role", None)
             return is_logged_in, user_obj, user_role
-        user_id = request.session.get("user_id")
-        if user_id:
-            try:
-                user_obj = User.objects.get(id=user_id)
-                is_logged_in = True
-                user_role = get_user_role(request)
-            except User.DoesNotExist:
-                user_obj = None
-                is_logged_in = False
-                user_role = None
+        user_obj = get_session_user(request)
+        if user_obj:
+            is_logged_in = True
+            user_role = get_user_role(request)
 
     except Exception as e:
         print(f"[AuthStatus] Error checking login status: {e}")
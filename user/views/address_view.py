@@ -2,7 +2,8 @@ from django.views import View
 from django.shortcuts import render, redirect
 from decorators.auth_decorators import signin_required
 from user.forms import AddressForm
-from user.services import enduser_service, address_service
+from user.services import address_service
+from user.utils.auth_status import get_session_user
 from constants import Role
 from django.urls import reverse
 from django.contrib import messages
@@ -15,10 +16,9 @@ class AddressCreateView(View):
     def get(self, request, user_id):
         if request.session.get('user_id') != user_id:
             return redirect('user_login')
-        user = enduser_service.get_user_by_id(user_id)
-        existing_addresses = address_service.get_user_addresses(user)
-        if existing_addresses.exists():
-            address = existing_addresses.first()
+        user = get_session_user(request)
+        address = address_service.get_user_addresses(user).first()
+        if address:
             return redirect(reverse('user_address_update', args=[user_id, address.id]))
         form = AddressForm()
         return render(request, 'address/address_form.html', {'form': form, 'user': user})
@@ -27,10 +27,9 @@ class AddressCreateView(View):
     def post(self, request, user_id):
         if request.session.get('user_id') != user_id:
             return redirect('user_login')
-        user = enduser_service.get_user_by_id(user_id)
-        existing_addresses = address_service.get_user_addresses(user)
-        if existing_addresses.exists():
-            address = existing_addresses.first()
+        user = get_session_user(request)
+        address = address_service.get_user_addresses(user).first()
+        if address:
             return redirect(reverse('user_address_update', args=[user_id, address.id]))
         form = AddressForm(request.POST)
         if form.is_valid():
@@ -46,9 +45,9 @@ class AddressUpdateView(View):
     def get(self, request, user_id, address_id):
         if request.session.get('user_id') != user_id:
             return redirect('user_login')
-        user = enduser_service.get_user_by_id(user_id)
+        user = get_session_user(request)
         address = address_service.get_address_by_id(address_id)
-        if address.user.id != user_id:
+        if address.user_id != user_id:
             return redirect('user_login')
         form = AddressForm(instance=address)
         return render(request, 'address/address_update.html', {'form': form, 'address': address,'user':user})
@@ -58,7 +57,7 @@ class AddressUpdateView(View):
         if request.session.get('user_id') != user_id:
             return redirect('user_login')
         address = address_service.get_address_by_id(address_id)
-        if address.user.id != user_id:
+        if address.user_id != user_id:
             return redirect('user_login')
         form = AddressForm(request.POST, instance=address)
         if form.is_valid():
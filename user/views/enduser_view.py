@@ -6,6 +6,9 @@ from user.forms import UserRegistrationForm, UserUpdateForm
 from constants.enums import Role
 from user.services import enduser_service, address_service
 from decorators.auth_decorators import signin_required, customer_required, staff_required
+from user.utils.auth_status import get_session_user
+from shop.services import cart_service
+from shop.utils import guest_cart_util
 
 
 
@@ -41,7 +44,12 @@ class EndUserLoginView(View):
                     request.session['is_authenticated'] = True
                     if user.role == Role.ENDUSER_CUSTOMER:
                         messages.success(request, f"Welcome {user.first_name}! You are logged in as Customer.")
-                        return redirect('customer_dashboard')
+                        response = redirect('customer_dashboard')
+                        guest_lines = guest_cart_util.read_guest_cart(request)
+                        if guest_lines:
+                            cart_service.merge_guest_cart(user, guest_lines)
+                            guest_cart_util.write_guest_cart(response, {})
+                        return response
                     elif user.role == Role.ENDUSER_STAFF:
                         messages.success(request, f"Welcome {user.first_name}! You are logged in as Staff.")
                         return redirect('staff_dashboard')
@@ -70,8 +78,7 @@ class CustomerDashboardView(View):
     @customer_required
     def get(self, request):
         try:
-            user_id = request.session.get('user_id')
-            user = enduser_service.get_user_by_id(user_id)
+            user = get_session_user(request)
             addresses = address_service.get_user_addresses(user)
             default_address = addresses.first()
             messages.success(request, f"Welcome {user.first_name}! You are logged in as Customer.")
@@ -91,8 +98,7 @@ class StaffDashboardView(View):
     @staff_required
     def get(self, request):
         try:
-            user_id = request.session.get('user_id')
-            user = enduser_service.get_user_by_id(user_id)
+            user = get_session_user(request)
             addresses = address_service.get_user_addresses(user)
             default_address = addresses.first()
             messages.success(request, f"Welcome {user.first_name}! You are logged in as Staff.")
@@ -142,7 +148,7 @@ class EndUserProfileView(View):
         try:
             if request.session.get('user_id') != user_id:
                 return redirect('user_login')
-            user = enduser_service.get_user_by_id(user_id)
+            user = get_session_user(request)
             address = address_service.get_user_addresses(user)
             context = {
                 'user': user,
@@ -161,7 +167,7 @@ class EndUserProfileUpdateView(View):
         try:
             if request.session.get('user_id') != user_id:
                 return redirect('user_login')
-            user = enduser_service.get_user_by_id(user_id)
+            user = get_session_user(request)
             form = UserUpdateForm(instance=user)
             return render(request, 'enduser/profile_updation.html', {'form': form, 'user': user})
         except Exception as e:
@@ -173,7 +179,7 @@ class EndUserProfileUpdateView(View):
         try:
             if request.session.get('user_id') != user_id:
                 return redirect('user_login')
-            user = enduser_service.get_user_by_id(user_id)
+            user = get_session_user(request)
             form = UserUpdateForm(request.POST, request.FILES, instance=user)
             if form.is_valid():
                 enduser_service.update_user(user, form.cleaned_data)
@@ -215,5 +221,5 @@ class EndUserDeleteView(View):
 class EnduserHelpView(View):
     @signin_required
     def get(self, request):
-        user = enduser_service.get_user_by_id(request.session.get('user_id'))
+        user = get_session_user(request)
         return render(request, 'help/help.html', {'user': user})
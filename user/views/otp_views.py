@@ -67,8 +67,6 @@ class OTPVerifyView(View):
                 user = User.objects.get(email=email)
                 success, message = otp_service.verify_otp(user, code)
                 if success:
-                    user.otps.is_verified = True
-                    user.otps.save()
                     if user.role == Role.ADMIN:
                         messages.success(request, "OTP verified! Please log in as Admin.")
                         return redirect("admin_login")